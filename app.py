@@ -47,7 +47,7 @@ st.markdown("""
 # 初始化session state
 if 'initialized' not in st.session_state:
     st.session_state.initialized = True
-    st.session_state.data_source = 'akshare'
+    st.session_state.data_source = 'auto'
     st.session_state.selected_stock = '000001'
 
 # 侧边栏
@@ -59,10 +59,11 @@ with st.sidebar:
     st.subheader("📊 数据源")
     data_source = st.radio(
         "选择数据源",
-        ["AKShare (推荐)", "TuShare"],
-        key="data_source_radio"
+        ["自动 (推荐)", "AKShare", "TuShare"],
+        key="data_source_radio",
+        help="自动：优先使用当前最快最稳定的数据源，响应慢或失败时切换到备用数据源"
     )
-    st.session_state.data_source = 'akshare' if data_source == "AKShare (推荐)" else 'tushare'
+    st.session_state.data_source = {"自动 (推荐)": 'auto', "AKShare": 'akshare', "TuShare": 'tushare'}[data_source]
     
     if st.session_state.data_source == 'tushare':
         st.info("💡 使用TuShare需要配置Token")
@@ -85,8 +85,11 @@ with tab2:
         ak_data = AKShareData()
         
         with st.spinner("正在获取涨跌排行..."):
-            # 获取实时行情
-            df = ak_data.get_stock_list()
+            from src.data.universe_store import get_universe_store
+            
+            universe = get_universe_store(refresh=True)
+            if universe is not None and len(universe):
+                st.caption(f"股票池: {len(universe.load())} 只在市股票（{universe.snapshot_date:%Y-%m-%d}）")
             
             # 这里应该获取真实的涨跌数据
             # 由于API限制，这里使用示例数据
@@ -7,6 +7,8 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 
+from src.data.symbol_master import get_symbol_master
+
 st.set_page_config(page_title="投资组合", page_icon="💼", layout="wide")
 
 st.title("💼 投资组合管理")
@@ -20,8 +22,9 @@ if 'portfolio' not in st.session_state:
 with st.sidebar:
     st.header("➕ 添加持仓")
     
-    stock_code = st.text_input("股票代码", value="000001")
-    stock_name = st.text_input("股票名称", value="平安银行")
+    symbol_master = get_symbol_master(refresh=True)
+    stock_code = symbol_master.resolve(st.text_input("股票代码", value="000001", help="代码、名称或拼音首字母"))
+    stock_name = st.text_input("股票名称", value=symbol_master.name_of(stock_code, default=''))
     quantity = st.number_input("持有数量", min_value=1, value=1000, step=100)
     cost_price = st.number_input("成本价", min_value=0.01, value=12.0, step=0.1)
     
@@ -51,10 +54,13 @@ if len(st.session_state.portfolio) > 0:
         # 获取当前价格
         current_prices = {}
         with st.spinner("正在获取最新价格..."):
+            # 一次全市场快照为所有持仓定价
+            quotes = ak_data.get_realtime_quotes([pos['code'] for pos in st.session_state.portfolio])
+            prices = quotes['price'] if 'price' in quotes.columns else pd.Series(dtype=float)
             for pos in st.session_state.portfolio:
-                quote = ak_data.get_realtime_quote(pos['code'])
-                if not quote.empty and 'price' in quote.columns:
-                    current_prices[pos['code']] = quote['price'].iloc[0]
+                price = prices.get(pos['code'])
+                if price is not None and pd.notna(price):
+                    current_prices[pos['code']] = price
                 else:
                     # 如果没有实时数据，使用成本价
                     current_prices[pos['code']] = pos['cost_price']
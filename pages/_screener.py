@@ -4,7 +4,6 @@
 """
 
 import streamlit as st
-import pandas as pd
 
 st.set_page_config(page_title="股票筛选", page_icon="🔍", layout="wide")
 
@@ -18,10 +17,18 @@ with st.sidebar:
     # 交易所选择
     exchange = st.selectbox(
         "交易所",
-        ["所有", "深圳交易所", "上海交易所"],
+        ["所有", "深圳交易所", "上海交易所", "北京交易所"],
         index=0
     )
     
+    # 板块选择
+    boards = st.multiselect(
+        "板块",
+        ["深市主板", "沪市主板", "创业板", "科创板", "北交所"],
+        default=[]
+    )
+    include_st = st.checkbox("包含ST股票", value=True)
+    
     # 市值筛选
     st.subheader("💼 市值筛选")
     market_cap_min = st.number_input("最小市值（万元）", min_value=0, value=0, step=1000)
@@ -42,19 +49,22 @@ with st.sidebar:
 # 主内容区域
 if screen_btn:
     try:
-        from src.data.akshare_data import AKShareData
-        
-        ak_data = AKShareData()
+        from src.data.universe_store import get_universe_store
         
-        with st.spinner("正在获取股票列表..."):
-            # 根据交易所获取股票列表
-            if exchange == "所有":
-                df = ak_data.get_stock_list("深圳交易所")
-                df_sh = ak_data.get_stock_list("上海交易所")
-                df = pd.concat([df, df_sh], ignore_index=True)
+        with st.spinner("正在加载股票池..."):
+            # 每日物化的本地股票池，按交易所/板块分区读取
+            universe = get_universe_store(refresh=True)
+            if universe is not None and len(universe):
+                df = universe.load(
+                    exchange=None if exchange == "所有" else exchange,
+                    board=boards or None
+                )
             else:
-                exchange_type = "深圳交易所" if exchange == "深圳交易所" else "上海交易所"
-                df = ak_data.get_stock_list(exchange_type)
+                # 未启用本地存储或股票池尚未生成（首次刷新失败）时直接请求
+                from src.data.akshare_data import AKShareData
+                df = AKShareData().get_stock_list(None if exchange == "所有" else exchange)
+            if not include_st and 'is_st' in df.columns:
+                df = df[~df['is_st']].reset_index(drop=True)
         
         if not df.empty:
             st.success(f"✓ 获取到 {len(df)} 只股票")
@@ -105,7 +115,7 @@ else:
         st.markdown("""
         ### 🎯 筛选维度
         
-        - **交易所**: 选择深圳或上海交易所
+        - **交易所/板块**: 选择交易所和板块（主板、创业板、科创板、北交所）
         - **市值**: 按市值范围筛选
         - **涨跌幅**: 按涨幅筛选
         - **成交量**: 按成交量筛选
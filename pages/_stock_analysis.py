@@ -4,9 +4,10 @@
 """
 
 import streamlit as st
-import pandas as pd
 from datetime import datetime, timedelta
 
+from src.data.symbol_master import get_symbol_master
+
 st.set_page_config(page_title="股票分析", page_icon="📈", layout="wide")
 
 st.title("📈 股票分析")
@@ -17,17 +18,22 @@ with st.sidebar:
     st.header("📊 分析配置")
     
     # 股票选择
-    stock_code = st.text_input(
+    stock_query = st.text_input(
         "股票代码",
         value="000001",
-        help="输入6位股票代码，如：000001（平安银行）"
+        help="输入6位代码、名称或拼音首字母，如：000001 / 平安银行 / payh"
     )
+    symbol_master = get_symbol_master(refresh=True)
+    stock_code = symbol_master.resolve(stock_query)
+    st.caption(f"{stock_code} {symbol_master.name_of(stock_code, default='')}")
     
     # 数据源选择
+    # 默认沿用首页侧边栏选择的数据源
     data_source = st.radio(
         "数据源",
-        ["AKShare", "TuShare"],
-        index=0
+        ["自动", "AKShare", "TuShare"],
+        index=['auto', 'akshare', 'tushare'].index(st.session_state.get('data_source', 'auto')),
+        help="自动：优先使用当前最快最稳定的数据源，响应慢时同时请求备用数据源"
     )
     
     # 时间范围
@@ -70,11 +76,19 @@ if analyze_btn or 'show_analysis' in st.session_state:
     try:
         from src.data.akshare_data import AKShareData
         from src.data.tushare_data import TuShareData
-        from src.analysis.technical import TechnicalAnalyzer
+        from src.data.hedged_source import get_hedged_source
+        from src.data.prefetch import cached_indicators, get_prefetcher
         from src.visualization.charts import PlotlyChartGenerator
         
+        # 记录访问，热门股票由后台预取
+        prefetcher = get_prefetcher()
+        if prefetcher:
+            prefetcher.record(stock_code)
+        
         # 选择数据源
-        if data_source == "AKShare":
+        if data_source == "自动":
+            data_obj = get_hedged_source()
+        elif data_source == "AKShare":
             data_obj = AKShareData()
         else:
             data_obj = TuShareData()
@@ -85,50 +99,37 @@ if analyze_btn or 'show_analysis' in st.session_state:
         
         with st.spinner("正在获取数据..."):
             # 获取历史数据
-            hist_data = data_obj.get_history_data(
-                stock_code,
-                start_date.strftime('%Y%m%d'),
-                end_date.strftime('%Y%m%d')
-            )
-        
-        # 调试信息
-        if not hist_data.empty:
-            st.success(f"✓ 成功获取 {len(hist_data)} 条数据")
-            with st.expander("🔍 调试信息（点击查看数据列名）"):
-                st.write("数据列名:", list(hist_data.columns))
-                st.write("前5行数据:")
-                st.dataframe(hist_data.head())
+            if data_source == "自动":
+                hist_data, winner = data_obj.get_history_with_source(
+                    stock_code,
+                    start_date.strftime('%Y%m%d'),
+                    end_date.strftime('%Y%m%d')
+                )
+                if winner:
+                    data_source = f"自动 - {winner}"
+            else:
+                hist_data = data_obj.get_history_data(
+                    stock_code,
+                    start_date.strftime('%Y%m%d'),
+                    end_date.strftime('%Y%m%d')
+                )
         
         if not hist_data.empty:
-            # 转换日期格式
-            if 'date' in hist_data.columns:
-                hist_data['date'] = pd.to_datetime(hist_data['date'])
-            
-            # 检查必要的列是否存在
-            required_cols = ['open', 'close', 'high', 'low', 'volume']
-            missing_cols = [col for col in required_cols if col not in hist_data.columns]
-            
-            if missing_cols:
-                st.error(f"❌ 数据缺少必要的列: {missing_cols}")
-                st.info(f"当前数据的列: {list(hist_data.columns)}")
-                st.stop()
+            # 数据层已统一列名、日期类型和排序
+            st.success(f"✓ 成功获取 {len(hist_data)} 条数据（{data_source}）")
+            if data_source.startswith("自动"):
+                with st.expander("数据源状态"):
+                    st.dataframe(data_obj.stats(), use_container_width=True)
             
-            # 计算技术指标
+            # 计算技术指标（同一股票、区间和指标组合只计算一次）
             if indicators:
-                analyzer = TechnicalAnalyzer(hist_data)
-                
-                if 'MA' in indicators:
-                    analyzer.calculate_ma([5, 10, 20, 60])
-                if 'MACD' in indicators:
-                    analyzer.calculate_macd()
-                if 'RSI' in indicators:
-                    analyzer.calculate_rsi()
-                if 'BOLL' in indicators:
-                    analyzer.calculate_bollinger()
-                if 'KDJ' in indicators:
-                    analyzer.calculate_kdj()
-                
-                hist_data = analyzer.get_data()
+                hist_data = cached_indicators(
+                    stock_code,
+                    start_date.strftime('%Y%m%d'),
+                    end_date.strftime('%Y%m%d'),
+                    hist_data,
+                    indicators
+                )
             
             # 显示基本统计
             st.subheader("📊 基本统计")
@@ -8,7 +8,6 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from datetime import datetime, timedelta
 import numpy as np
 
 st.set_page_config(page_title="交易决策", page_icon="📊", layout="wide")
@@ -31,7 +30,7 @@ with st.sidebar:
     # 时间周期
     st.subheader("📅 时间周期")
     period = st.select_slider(
-        "回看周期",
+        "回看周期（交易日）",
         options=[30, 60, 90, 120, 180, 365],
         value=120
     )
@@ -87,12 +86,13 @@ with st.sidebar:
     # 推荐股票
     st.markdown("---")
     st.subheader("📌 热门股票")
-    popular_stocks = {
-        "000001": "平安银行",
-        "600519": "贵州茅台", 
-        "000002": "万科A",
-        "600000": "浦发银行"
-    }
+    from src.data.prefetch import get_prefetcher
+    from src.data.symbol_master import get_symbol_master
+    
+    # 按访问次数学习的热门股票，后台预取后点击即命中缓存
+    prefetcher = get_prefetcher()
+    hot_codes = prefetcher.hot_codes(6) if prefetcher else ["000001", "600519", "000002", "600000"]
+    popular_stocks = {code: get_symbol_master().name_of(code, default='') for code in hot_codes}
     for code, name in popular_stocks.items():
         if st.button(f"{code} - {name}", key=f"stock_{code}", use_container_width=True):
             st.session_state.stock_code = code
@@ -108,34 +108,22 @@ if analyze_btn or 'analyze' in st.session_state:
         from src.analysis.trading_signals import TradingSignalAnalyzer
         from src.analysis.trading_signals_optimized import OptimizedTradingSignalAnalyzer
         from src.analysis.advanced_trading import AdvancedTradingAnalyzer
-        from src.analysis.technical import TechnicalAnalyzer
+        from src.data.prefetch import cached_indicators, lookback_window
         from src.visualization.charts import PlotlyChartGenerator
         
         # 获取数据
         with st.spinner("正在获取数据..."):
             ak_data = AKShareData()
+            if prefetcher:
+                prefetcher.record(stock_code)
             
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=period)
-            
-            hist_data = ak_data.get_history_data(
-                stock_code,
-                start_date.strftime('%Y%m%d'),
-                end_date.strftime('%Y%m%d')
-            )
+            # 按交易日历精确回看N个交易日
+            start_date, end_date = lookback_window(sessions=period)
+            hist_data = ak_data.get_history_data(stock_code, start_date, end_date)
         
         if not hist_data.empty:
-            # 标准化数据
-            if 'date' in hist_data.columns:
-                hist_data['date'] = pd.to_datetime(hist_data['date'])
-            
-            # 技术分析
-            tech_analyzer = TechnicalAnalyzer(hist_data)
-            hist_data = (tech_analyzer
-                        .calculate_ma([5, 10, 20, 60])
-                        .calculate_macd()
-                        .calculate_rsi()
-                        .get_data())
+            # 技术分析（热门股票由后台预取，直接命中缓存）
+            hist_data = cached_indicators(stock_code, start_date, end_date, hist_data, ['MA', 'MACD', 'RSI'])
             
             # 选择分析引擎
             use_optimized = '优化版' in analysis_mode
@@ -5,7 +5,13 @@ from .fundamental import FundamentalAnalyzer
 from .portfolio import PortfolioAnalyzer
 from .trading_signals import TradingSignalAnalyzer
 from .advanced_trading import AdvancedTradingAnalyzer
+from .portfolio_backtest import PortfolioBacktester
+from .result_store import BacktestResultStore
+from .signal_stats import SignalEffectivenessEngine
+from .stop_simulation import StopLossSimulator
 
 __all__ = ['TechnicalAnalyzer', 'FundamentalAnalyzer', 'PortfolioAnalyzer', 
-           'TradingSignalAnalyzer', 'AdvancedTradingAnalyzer']
+           'TradingSignalAnalyzer', 'AdvancedTradingAnalyzer', 'PortfolioBacktester',
+           'BacktestResultStore', 'SignalEffectivenessEngine',
+           'StopLossSimulator']
 
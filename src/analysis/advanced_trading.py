@@ -9,6 +9,8 @@ from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
+from ..utils.schema import is_validated
+
 
 class AdvancedTradingAnalyzer:
     """高级交易分析器 - 专业版"""
@@ -21,12 +23,14 @@ class AdvancedTradingAnalyzer:
             df: K线数据
             stock_code: 股票代码
         """
-        self.df = df.copy()
+        self.df = df.copy(deep=not is_validated(df))
         self.stock_code = stock_code
         self._validate_data()
     
     def _validate_data(self):
         """验证数据格式"""
+        if is_validated(self.df):
+            return
         required_cols = ['open', 'close', 'high', 'low', 'volume']
         for col in required_cols:
             if col not in self.df.columns:
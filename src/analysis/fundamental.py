@@ -45,18 +45,24 @@ class FundamentalAnalyzer:
             'revenue_growth': revenue_growth
         }
     
-    def calculate_financial_ratios(self, data):
+    def calculate_financial_ratios(self, data, as_of=None):
         """
         计算财务比率
         
         Args:
-            data: 财务数据DataFrame
+            data: 财务数据DataFrame（可由 FundamentalStore.asof_join 按时点关联得到）
+            as_of: 计算日期，只使用该日期及之前的行（需要 date 列），默认使用最后一行
             
         Returns:
             dict: 财务比率
         """
         ratios = {}
         
+        if as_of is not None and 'date' in data.columns:
+            data = data[pd.to_datetime(data['date']) <= pd.Timestamp(as_of)]
+        if data.empty:
+            return ratios
+        
         # PE比率（需要额外数据）
         if 'pe' in data.columns:
             ratios['pe'] = data['pe'].iloc[-1] if not data['pe'].isna().iloc[-1] else None
@@ -0,0 +1,315 @@
+"""
+投资组合回测模块
+按固定周期（月/季）用PortfolioAnalyzer重新估计权重并调仓，跟踪组合净值
+"""
+
+import pandas as pd
+import numpy as np
+
+from .portfolio import PortfolioAnalyzer
+
+
+class RollingCovariance:
+    """
+    滚动窗口协方差（增量更新）
+
+    维护窗口内收益率的一阶、二阶累加量，窗口移动时只加入新行、减去移出的行，
+    避免每次调仓都对整个窗口重新计算协方差矩阵。缺失值按成对有效样本处理。
+    """
+
+    def __init__(self, returns):
+        """
+        初始化滚动协方差
+
+        Args:
+            returns: 收益率矩阵 ndarray (日期 × 股票)，允许NaN
+        """
+        self.returns = returns
+        n = returns.shape[1]
+        self.start = 0
+        self.end = 0
+        self._sum_xy = np.zeros((n, n))   # Σ x_i * x_j
+        self._sum_x = np.zeros((n, n))    # Σ x_i (仅统计 j 同时有效的样本)
+        self._count = np.zeros((n, n))    # 成对有效样本数
+
+    def _accumulate(self, start, end, sign):
+        """累加/扣减 [start, end) 行"""
+        if end <= start:
+            return
+        block = self.returns[start:end]
+        valid = (~np.isnan(block)).astype(float)
+        filled = np.nan_to_num(block)
+        self._sum_xy += sign * (filled.T @ filled)
+        self._sum_x += sign * (filled.T @ valid)
+        self._count += sign * (valid.T @ valid)
+
+    def move_to(self, start, end):
+        """
+        将窗口移动到 [start, end)
+
+        窗口重叠时增量更新，否则整体重算
+        """
+        if start >= self.end or end <= self.start or start < self.start:
+            self._sum_xy[:] = 0
+            self._sum_x[:] = 0
+            self._count[:] = 0
+            self._accumulate(start, end, 1)
+        else:
+            self._accumulate(self.start, start, -1)
+            self._accumulate(self.end, end, 1)
+        self.start, self.end = start, end
+
+    def get(self, idx=None):
+        """
+        获取当前窗口的协方差矩阵与均值
+
+        Args:
+            idx: 股票列索引，None表示全部
+
+        Returns:
+            tuple: (均值向量, 协方差矩阵, 样本数向量)
+        """
+        if idx is None:
+            idx = np.arange(self._count.shape[0])
+        count = self._count[np.ix_(idx, idx)]
+        sum_xy = self._sum_xy[np.ix_(idx, idx)]
+        sum_x = self._sum_x[np.ix_(idx, idx)]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = (sum_xy - sum_x * sum_x.T / count) / (count - 1)
+            obs = np.diag(count)
+            mean = np.diag(sum_x) / obs
+        cov = np.nan_to_num(cov)
+        return mean, cov, obs
+
+
+class PortfolioBacktester:
+    """投资组合定期调仓回测器"""
+
+    REBALANCE_FREQS = {'M': 'M', 'monthly': 'M', 'Q': 'Q', 'quarterly': 'Q'}
+
+    def __init__(self, prices, initial_capital=1000000, rebalance_freq='M',
+                 lookback=120, min_periods=60, risk_aversion=3, lot_size=100,
+                 commission_rate=0.0003, min_commission=5, stamp_tax_rate=0.0005,
+                 weight_func=None):
+        """
+        初始化组合回测器
+
+        Args:
+            prices: 收盘价矩阵DataFrame，索引为日期，列为股票代码（已对齐）
+            initial_capital: 初始资金
+            rebalance_freq: 调仓频率，'M'(月) 或 'Q'(季)
+            lookback: 估计收益率/协方差的回看交易日数
+            min_periods: 参与优化所需的最少有效样本数
+            risk_aversion: 风险厌恶系数，传给 optimize_portfolio
+            lot_size: 每手股数，A股为100
+            commission_rate: 佣金费率（双边）
+            min_commission: 单笔最低佣金
+            stamp_tax_rate: 印花税率（仅卖出）
+            weight_func: 自定义权重函数 f(expected_returns, cov_matrix) -> 权重数组，
+                         默认使用 PortfolioAnalyzer.optimize_portfolio
+        """
+        if rebalance_freq not in self.REBALANCE_FREQS:
+            raise ValueError(f"不支持的调仓频率: {rebalance_freq}")
+
+        self.prices = prices.sort_index()
+        self.initial_capital = initial_capital
+        self.rebalance_freq = self.REBALANCE_FREQS[rebalance_freq]
+        self.lookback = lookback
+        self.min_periods = min_periods
+        self.risk_aversion = risk_aversion
+        self.lot_size = lot_size
+        self.commission_rate = commission_rate
+        self.min_commission = min_commission
+        self.stamp_tax_rate = stamp_tax_rate
+        self.weight_func = weight_func
+        self.analyzer = PortfolioAnalyzer()
+
+        self.returns = self.prices.pct_change(fill_method=None)
+
+    def get_rebalance_dates(self):
+        """
+        获取调仓日（每个周期的最后一个交易日）
+
+        Returns:
+            ndarray: 调仓日在价格矩阵中的行号
+        """
+        dates = pd.DatetimeIndex(self.prices.index)
+        periods = dates.to_period(self.rebalance_freq)
+        last_rows = pd.Series(np.arange(len(dates))).groupby(np.asarray(periods)).max()
+        rows = last_rows.values
+        # 回看窗口不足时不调仓
+        return rows[rows >= self.min_periods]
+
+    def _estimate_weights(self, expected_returns, cov_matrix):
+        """估计目标权重"""
+        if self.weight_func is not None:
+            weights = np.asarray(self.weight_func(expected_returns, cov_matrix), dtype=float)
+        else:
+            result = self.analyzer.optimize_portfolio(expected_returns, cov_matrix, self.risk_aversion)
+            weights = result.get('optimal_weights') if result else None
+            if weights is None:
+                # 无scipy时退化为等权
+                weights = np.full(len(expected_returns), 1 / len(expected_returns))
+        weights = np.clip(weights, 0, None)
+        total = weights.sum()
+        return weights / total if total > 0 else weights
+
+    def _trade_cost(self, trade_values):
+        """
+        计算交易费用
+
+        Args:
+            trade_values: 各股票成交金额（买入为正，卖出为负）
+
+        Returns:
+            float: 佣金 + 印花税
+        """
+        traded = trade_values != 0
+        commission = np.maximum(np.abs(trade_values[traded]) * self.commission_rate,
+                                self.min_commission).sum()
+        stamp_tax = -trade_values[trade_values < 0].sum() * self.stamp_tax_rate
+        return commission + stamp_tax
+
+    def run(self):
+        """
+        运行回测
+
+        Returns:
+            dict: 回测结果
+                - nav: 组合净值序列
+                - weights: 各调仓日目标权重 DataFrame
+                - holdings: 各调仓日持仓股数 DataFrame
+                - trades: 调仓成交明细 DataFrame
+                - total_fees: 总交易费用
+                - turnover: 平均单边换手率
+                - metrics: 风险收益指标（PortfolioAnalyzer.calculate_risk_metrics）
+        """
+        price_values = self.prices.values.astype(float)
+        n_days, n_symbols = price_values.shape
+        symbols = np.asarray(self.prices.columns)
+        rebalance_rows = self.get_rebalance_dates()
+
+        rolling_cov = RollingCovariance(self.returns.values)
+
+        shares = np.zeros(n_symbols)
+        cash = float(self.initial_capital)
+        nav = np.full(n_days, np.nan)
+        total_fees = 0.0
+        turnovers = []
+        weight_records = {}
+        holding_records = {}
+        trade_records = []
+
+        # 持仓市值按最近有效价格计算（停牌日沿用前值）
+        marked_prices = self.prices.ffill().fillna(0).values
+
+        segment_start = 0
+        for row in rebalance_rows:
+            # 上一调仓日到本调仓日之间持仓不变，整段向量化计算净值
+            nav[segment_start:row + 1] = cash + marked_prices[segment_start:row + 1] @ shares
+
+            rolling_cov.move_to(max(1, row + 1 - self.lookback), row + 1)
+            tradable = ~np.isnan(price_values[row])
+            mean, cov, obs = rolling_cov.get()
+            eligible = np.where(tradable & (obs >= self.min_periods))[0]
+
+            portfolio_value = nav[row]
+            target_weights = np.zeros(n_symbols)
+            if len(eligible) > 0:
+                sub_cov = cov[np.ix_(eligible, eligible)] * 252
+                target_weights[eligible] = self._estimate_weights(mean[eligible] * 252, sub_cov)
+
+            # 按手数取整，停牌股票保持原持仓
+            target_shares = shares.copy()
+            row_prices = marked_prices[row]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                lots = np.floor(target_weights * portfolio_value / row_prices / self.lot_size)
+            target_shares[tradable] = np.nan_to_num(lots[tradable]) * self.lot_size
+
+            trade_shares = target_shares - shares
+            trade_values = trade_shares * row_prices
+            fees = self._trade_cost(trade_values)
+
+            # 现金不足时按比例缩减买入
+            buy_value = trade_values[trade_values > 0].sum()
+            available = cash - trade_values[trade_values < 0].sum() - fees
+            if buy_value > available > 0:
+                scale = available / buy_value
+                buys = trade_shares > 0
+                target_shares[buys] = shares[buys] + np.floor(
+                    trade_shares[buys] * scale / self.lot_size) * self.lot_size
+                trade_shares = target_shares - shares
+                trade_values = trade_shares * row_prices
+                fees = self._trade_cost(trade_values)
+
+            cash -= trade_values.sum() + fees
+            total_fees += fees
+            shares = target_shares
+            if portfolio_value > 0:
+                turnovers.append(np.abs(trade_values).sum() / 2 / portfolio_value)
+
+            date = self.prices.index[row]
+            weight_records[date] = target_weights
+            holding_records[date] = shares.copy()
+            for i in np.nonzero(trade_shares)[0]:
+                trade_records.append({
+                    'date': date,
+                    'code': symbols[i],
+                    'shares': trade_shares[i],
+                    'price': row_prices[i],
+                    'value': trade_values[i]
+                })
+
+            nav[row] = cash + row_prices @ shares
+            segment_start = row + 1
+
+        nav[segment_start:] = cash + marked_prices[segment_start:] @ shares
+
+        nav_series = pd.Series(nav / self.initial_capital, index=self.prices.index, name='nav')
+        daily_returns = nav_series.pct_change().dropna()
+
+        return {
+            'nav': nav_series,
+            'weights': pd.DataFrame.from_dict(weight_records, orient='index', columns=symbols),
+            'holdings': pd.DataFrame.from_dict(holding_records, orient='index', columns=symbols),
+            'trades': pd.DataFrame(trade_records, columns=['date', 'code', 'shares', 'price', 'value']),
+            'total_fees': total_fees,
+            'turnover': float(np.mean(turnovers)) if turnovers else 0.0,
+            'metrics': self.analyzer.calculate_risk_metrics(daily_returns)
+        }
+
+
+def backtest_portfolio(prices, rebalance_freq='M', **kwargs):
+    """
+    便捷函数：对价格矩阵进行定期调仓回测
+
+    Args:
+        prices: 收盘价矩阵（日期 × 股票）
+        rebalance_freq: 调仓频率
+        **kwargs: 其余参数传给 PortfolioBacktester
+
+    Returns:
+        dict: 回测结果
+    """
+    return PortfolioBacktester(prices, rebalance_freq=rebalance_freq, **kwargs).run()
+
+
+if __name__ == "__main__":
+    # 测试代码
+    dates = pd.bdate_range('2020-01-01', periods=750)
+    codes = ['000001', '000002', '600000', '600519', '000858']
+    rng = np.random.default_rng(0)
+    prices = pd.DataFrame(
+        np.exp(rng.normal(0.0003, 0.02, (len(dates), len(codes))).cumsum(axis=0)) * 20,
+        index=dates,
+        columns=codes
+    )
+
+    result = backtest_portfolio(prices, rebalance_freq='Q')
+
+    print("=== 组合回测结果 ===")
+    print(f"期末净值: {result['nav'].iloc[-1]:.4f}")
+    print(f"总交易费用: {result['total_fees']:.2f}")
+    print(f"平均换手率: {result['turnover']:.2%}")
+    print(f"风险指标: {result['metrics']}")
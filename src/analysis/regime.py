@@ -0,0 +1,153 @@
+"""
+市场状态模块
+对每根K线、每只股票一次性计算趋势状态和价格位置，
+结果与技术指标一起保存，供信号引擎、回测和筛选器直接读取
+"""
+
+import pandas as pd
+import numpy as np
+
+
+# 趋势状态编码
+TREND_UP = 1
+TREND_RANGE = 0
+TREND_DOWN = -1
+TREND_LABELS = {TREND_UP: '强势上涨', TREND_RANGE: '震荡', TREND_DOWN: '强势下跌'}
+
+# 价格位置编码
+POSITION_HIGH = 1
+POSITION_MID = 0
+POSITION_LOW = -1
+POSITION_LABELS = {POSITION_HIGH: '高位', POSITION_MID: '中位', POSITION_LOW: '低位'}
+
+# 信号强度调整因子，与 OptimizedTradingSignalAnalyzer 一致
+TREND_FACTORS = {
+    '强势上涨': {'buy': 1.5, 'sell': 0.7},
+    '震荡': {'buy': 1.0, 'sell': 1.0},
+    '强势下跌': {'buy': 0.7, 'sell': 1.5},
+}
+POSITION_FACTORS = {
+    '高位': {'buy': 0.6, 'sell': 1.4},
+    '中位': {'buy': 1.0, 'sell': 1.0},
+    '低位': {'buy': 1.4, 'sell': 0.6},
+}
+
+REGIME_COLUMNS = ['trend_state', 'position_pct', 'position_state']
+
+
+def classify_trend(close, ma20=None, ma60=None):
+    """
+    趋势状态分类
+
+    收盘价 > MA20 > MA60 为强势上涨，收盘价 < MA20 < MA60 为强势下跌，其余为震荡。
+
+    Args:
+        close: 收盘价，Series（单只股票）或 DataFrame（日期 × 股票）
+        ma20: 已计算的20日均线，默认现算
+        ma60: 已计算的60日均线，默认现算
+
+    Returns:
+        与 close 形状相同的 int8 编码（1/0/-1）
+    """
+    if ma20 is None:
+        ma20 = close.rolling(20).mean()
+    if ma60 is None:
+        ma60 = close.rolling(60).mean()
+
+    up = ((close > ma20) & (ma20 > ma60)).values
+    down = ((close < ma20) & (ma20 < ma60)).values
+    codes = np.where(up, TREND_UP, np.where(down, TREND_DOWN, TREND_RANGE)).astype(np.int8)
+    if isinstance(close, pd.DataFrame):
+        return pd.DataFrame(codes, index=close.index, columns=close.columns)
+    return pd.Series(codes, index=close.index, name='trend')
+
+
+def price_position(close, high, low, window=120):
+    """
+    价格位置百分位：收盘价在最近 window 日最高/最低价区间中的位置
+
+    数据不足 window 日时使用全部已有数据；区间为零时记为50。
+
+    Returns:
+        0~100 的位置百分比
+    """
+    highest = high.rolling(window, min_periods=1).max()
+    lowest = low.rolling(window, min_periods=1).min()
+    span = highest - lowest
+    pct = (close - lowest) / span.where(span > 0) * 100
+    return pct.fillna(50)
+
+
+def classify_position(pct):
+    """
+    价格位置分类：>80% 高位，<20% 低位，其余中位
+
+    Returns:
+        与 pct 形状相同的 int8 编码（1/0/-1）
+    """
+    codes = np.where(pct.values > 80, POSITION_HIGH,
+                     np.where(pct.values < 20, POSITION_LOW, POSITION_MID)).astype(np.int8)
+    if isinstance(pct, pd.DataFrame):
+        return pd.DataFrame(codes, index=pct.index, columns=pct.columns)
+    return pd.Series(codes, index=pct.index, name='position')
+
+
+def compute_regimes(panel, window=120):
+    """
+    面板级市场状态计算（所有日期、所有股票一次完成）
+
+    Args:
+        panel: {字段: DataFrame(日期 × 股票)}，需包含 close/high/low
+        window: 价格位置回看天数
+
+    Returns:
+        dict: {'trend': int8矩阵, 'position_pct': 位置百分比矩阵, 'position': int8矩阵}
+    """
+    close = panel['close']
+    pct = price_position(close, panel['high'], panel['low'], window)
+    return {
+        'trend': classify_trend(close),
+        'position_pct': pct,
+        'position': classify_position(pct)
+    }
+
+
+def add_regime_columns(df, window=120):
+    """
+    为单只股票K线数据追加市场状态列
+
+    已存在 MA20/MA60 列时直接复用。
+
+    Args:
+        df: K线数据，需包含 close/high/low
+        window: 价格位置回看天数
+
+    Returns:
+        DataFrame: 追加 trend_state、position_pct、position_state 列
+    """
+    trend = classify_trend(df['close'], df.get('MA20'), df.get('MA60'))
+    pct = price_position(df['close'], df['high'], df['low'], window)
+    df['trend_state'] = trend.map(TREND_LABELS).values
+    df['position_pct'] = pct.values
+    df['position_state'] = classify_position(pct).map(POSITION_LABELS).values
+    return df
+
+
+def has_regime_columns(df):
+    """判断数据是否已包含预计算的市场状态列"""
+    return all(col in df.columns for col in REGIME_COLUMNS)
+
+
+if __name__ == "__main__":
+    # 测试代码
+    dates = pd.date_range('2024-01-01', periods=300, freq='B')
+    codes = ['000001', '600519', '300059']
+    close = pd.DataFrame(np.exp(np.random.normal(0, 0.02, (300, 3)).cumsum(axis=0)) * 20,
+                         index=dates, columns=codes)
+    panel = {'close': close, 'high': close * 1.01, 'low': close * 0.99}
+
+    regimes = compute_regimes(panel)
+    print("=== 趋势状态分布 ===")
+    print(regimes['trend'].apply(lambda s: s.map(TREND_LABELS).value_counts()))
+    print("\n=== 最新价格位置 ===")
+    print(regimes['position_pct'].iloc[-1])
@@ -0,0 +1,358 @@
+"""
+回测结果存储模块
+将回测/参数扫描的净值曲线、成交明细、参数与指标写入分区列式文件（Parquet / Arrow IPC）
+
+目录结构:
+    root/
+    ├── _index/part-<run_id>.parquet      # 每次运行一行：策略、股票、参数、指标
+    ├── _index/index.parquet              # compact_index() 合并后的索引
+    ├── _index/_schema/<hash>.arrow       # 各文件出现过的表结构（每种结构一个文件）
+    ├── equity/strategy=<name>/part-<run_id>.<ext>
+    ├── equity/_schema/<hash>.arrow
+    └── trades/strategy=<name>/part-<run_id>.<ext>
+
+每次写入都生成新文件（先写临时文件再原子重命名），多个进程可并发追加，无需加锁。
+读取时合并 _schema 中为数不多的表结构作为统一结构，一次 Arrow Dataset 扫描读取所有文件，
+不必逐个打开文件读取元数据。
+"""
+
+import hashlib
+import json
+import os
+import uuid
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+class BacktestResultStore:
+    """回测结果存储"""
+
+    FORMATS = {'parquet': 'parquet', 'ipc': 'arrow'}
+    INDEX_DIR = '_index'
+    INDEX_FILE = 'index.parquet'
+    SCHEMA_DIR = '_schema'
+    INDEX_COLUMNS = ['run_id', 'strategy', 'symbol', 'params', 'start_date', 'end_date', 'created_at']
+
+    def __init__(self, root, file_format='parquet'):
+        """
+        初始化结果存储
+
+        Args:
+            root: 存储根目录
+            file_format: 数据文件格式，'parquet' 或 'ipc'（Arrow IPC / Feather V2）
+        """
+        if pa is None:
+            raise ImportError("结果存储需要安装pyarrow: pip install pyarrow")
+        if file_format not in self.FORMATS:
+            raise ValueError(f"不支持的文件格式: {file_format}")
+
+        self.root = root
+        self.file_format = file_format
+        self.extension = self.FORMATS[file_format]
+        os.makedirs(os.path.join(root, self.INDEX_DIR), exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _partition_value(value):
+        """分区目录名中不允许出现路径分隔符"""
+        return str(value).replace('/', '_').replace('\\', '_')
+
+    def _write_table(self, table, path):
+        """原子写入单个文件"""
+        directory, name = os.path.split(path)
+        os.makedirs(directory, exist_ok=True)
+        # '.' 开头的临时文件会被 Arrow Dataset 忽略，并发读取不会读到写了一半的文件
+        tmp_path = os.path.join(directory, f".{name}.{uuid.uuid4().hex}.tmp")
+        if path.endswith('.parquet'):
+            pq.write_table(table, tmp_path)
+        else:
+            feather.write_feather(table, tmp_path)
+        os.replace(tmp_path, path)
+
+    def _register_schema(self, table_dir, schema):
+        """
+        记录表结构：每种结构只写一个文件（按结构内容命名），并发写入同一结构时内容相同，无需加锁
+        """
+        schema = schema.remove_metadata()
+        digest = hashlib.sha1(schema.serialize().to_pybytes()).hexdigest()[:16]
+        path = os.path.join(table_dir, self.SCHEMA_DIR, f"{digest}.arrow")
+        if not os.path.exists(path):
+            self._write_table(schema.empty_table(), path)
+
+    def _schema(self, table_dir, file_format, partitioning=None):
+        """
+        读取统一表结构：合并 _schema 中的各种结构（旧数据没有 _schema 时从各文件元数据生成一次）
+
+        Returns:
+            pyarrow.Schema: 不含分区字段
+        """
+        schema_dir = os.path.join(table_dir, self.SCHEMA_DIR)
+        if not os.path.isdir(schema_dir):
+            dataset = ds.dataset(table_dir, format=file_format, partitioning=partitioning)
+            for fragment in dataset.get_fragments():
+                self._register_schema(table_dir, fragment.physical_schema)
+            if not os.path.isdir(schema_dir):
+                return None
+        schemas = [feather.read_table(os.path.join(schema_dir, f)).schema
+                   for f in sorted(os.listdir(schema_dir)) if f.endswith('.arrow')]
+        try:
+            return pa.unify_schemas(schemas, promote_options='permissive')
+        except TypeError:
+            return pa.unify_schemas(schemas)
+
+    def write_run(self, strategy, params=None, metrics=None, equity=None, trades=None,
+                  symbol=None, run_id=None):
+        """
+        写入一次回测运行的结果
+
+        Args:
+            strategy: 策略名称
+            params: 参数字典
+            metrics: 指标字典，如 {'annual_return': 12.3, 'sharpe_ratio': 1.1}
+            equity: 净值曲线，Series（索引为日期）或包含 date 列的 DataFrame
+            trades: 成交明细 DataFrame
+            symbol: 股票代码（组合回测可为空）
+            run_id: 运行ID，默认自动生成
+
+        Returns:
+            str: 运行ID
+        """
+        run_id = run_id or f"{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+        params = params or {}
+        metrics = metrics or {}
+        strategy_dir = f"strategy={self._partition_value(strategy)}"
+
+        dates = pd.Series(dtype='datetime64[ns]')
+        for name, frame in (('equity', equity), ('trades', trades)):
+            if frame is None:
+                continue
+            if isinstance(frame, pd.Series):
+                frame = frame.rename(frame.name or 'nav').rename_axis('date').reset_index()
+            frame = frame.copy()
+            if 'date' in frame.columns:
+                frame['date'] = pd.to_datetime(frame['date'])
+                dates = pd.concat([dates, frame['date']])
+            frame.insert(0, 'run_id', run_id)
+            if 'symbol' not in frame.columns:
+                frame['symbol'] = symbol
+            # 保证各文件 symbol 列类型一致（全为空时也写成字符串列）
+            frame['symbol'] = frame['symbol'].astype('string')
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            path = os.path.join(self.root, name, strategy_dir, f"part-{run_id}.{self.extension}")
+            self._write_table(table, path)
+            self._register_schema(os.path.join(self.root, name), table.schema)
+
+        record = {
+            'run_id': run_id,
+            'strategy': strategy,
+            'symbol': symbol,
+            'params': json.dumps(params, ensure_ascii=False, sort_keys=True, default=str),
+            'start_date': dates.min() if not dates.empty else pd.NaT,
+            'end_date': dates.max() if not dates.empty else pd.NaT,
+            'created_at': pd.Timestamp.now()
+        }
+        record.update({f'param_{k}': v for k, v in params.items()})
+        record.update({f'metric_{k}': v for k, v in metrics.items()})
+
+        index_path = os.path.join(self.root, self.INDEX_DIR, f"part-{run_id}.parquet")
+        table = pa.Table.from_pandas(pd.DataFrame([record]), preserve_index=False)
+        self._write_table(table, index_path)
+        self._register_schema(os.path.join(self.root, self.INDEX_DIR), table.schema)
+        return run_id
+
+    # ------------------------------------------------------------------
+    # 索引
+    # ------------------------------------------------------------------
+
+    def _index_files(self):
+        index_dir = os.path.join(self.root, self.INDEX_DIR)
+        return sorted(os.path.join(index_dir, f) for f in os.listdir(index_dir)
+                      if f.endswith('.parquet'))
+
+    def load_index(self, filter=None):
+        """
+        读取运行索引（一次 Arrow Dataset 扫描读取所有索引文件）
+
+        Args:
+            filter: Arrow 过滤表达式，下推到文件统计信息
+
+        Returns:
+            DataFrame: 每次运行一行
+        """
+        index_dir = os.path.join(self.root, self.INDEX_DIR)
+        schema = self._schema(index_dir, 'parquet') if self._index_files() else None
+        if schema is None:
+            return pd.DataFrame(columns=self.INDEX_COLUMNS)
+        dataset = ds.dataset(self._index_files(), schema=schema, format='parquet')
+        index = dataset.to_table(filter=filter).to_pandas()
+        return index.drop_duplicates('run_id', keep='last').reset_index(drop=True)
+
+    def compact_index(self):
+        """
+        合并索引碎片文件
+
+        Returns:
+            int: 合并后的运行数
+        """
+        files = self._index_files()
+        index = self.load_index()
+        target = os.path.join(self.root, self.INDEX_DIR, self.INDEX_FILE)
+        self._write_table(pa.Table.from_pandas(index, preserve_index=False), target)
+        for f in files:
+            if f != target:
+                os.remove(f)
+        return len(index)
+
+    def query_runs(self, strategy=None, symbol=None, params=None, start=None, end=None):
+        """
+        按条件筛选运行
+
+        Args:
+            strategy: 策略名称或名称列表
+            symbol: 股票代码或代码列表
+            params: 参数等值条件，如 {'fast': 12}
+            start: 回测区间须覆盖到此日期之后
+            end: 回测区间须开始于此日期之前
+
+        Returns:
+            DataFrame: 符合条件的运行索引
+        """
+        expr = None
+
+        def _and(e):
+            return e if expr is None else expr & e
+
+        if strategy is not None:
+            expr = _and(ds.field('strategy').isin([strategy] if isinstance(strategy, str) else list(strategy)))
+        if symbol is not None:
+            expr = _and(ds.field('symbol').isin([symbol] if isinstance(symbol, str) else list(symbol)))
+        if start is not None:
+            expr = _and(ds.field('end_date') >= pd.Timestamp(start))
+        if end is not None:
+            expr = _and(ds.field('start_date') <= pd.Timestamp(end))
+        index = self.load_index(expr)
+
+        mask = pd.Series(True, index=index.index)
+        for key, value in (params or {}).items():
+            column = f'param_{key}'
+            if column not in index.columns:
+                return index.iloc[0:0]
+            mask &= index[column] == value
+        return index[mask].reset_index(drop=True)
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def _read(self, table_name, run_ids=None, strategy=None, symbol=None,
+              start=None, end=None, columns=None):
+        """使用Arrow Dataset读取，过滤条件下推到分区目录和文件统计信息"""
+        path = os.path.join(self.root, table_name)
+        if not os.path.isdir(path):
+            return pd.DataFrame()
+        file_format = 'parquet' if self.file_format == 'parquet' else 'ipc'
+        # 分区目录名始终按字符串解析（策略名为数字时也不推断为整数）
+        partitioning = ds.partitioning(pa.schema([('strategy', pa.string())]), flavor='hive')
+        # 默认只按第一个文件推断列；使用记录的统一结构，后续运行新增的列不会丢失
+        schema = self._schema(path, file_format, partitioning)
+        if schema is None:
+            return pd.DataFrame()
+        if 'strategy' not in schema.names:
+            schema = schema.append(pa.field('strategy', pa.string()))
+        dataset = ds.dataset(path, schema=schema, format=file_format, partitioning=partitioning)
+
+        expr = None
+
+        def _and(e):
+            return e if expr is None else expr & e
+
+        if strategy is not None:
+            values = [strategy] if isinstance(strategy, str) else list(strategy)
+            expr = _and(ds.field('strategy').isin([self._partition_value(v) for v in values]))
+        if run_ids is not None:
+            expr = _and(ds.field('run_id').isin(list(run_ids)))
+        if symbol is not None:
+            expr = _and(ds.field('symbol').isin([symbol] if isinstance(symbol, str) else list(symbol)))
+        if 'date' in schema.names:
+            date_type = schema.field('date').type
+            if start is not None:
+                expr = _and(ds.field('date') >= pa.scalar(pd.Timestamp(start)).cast(date_type))
+            if end is not None:
+                expr = _and(ds.field('date') <= pa.scalar(pd.Timestamp(end)).cast(date_type))
+
+        return dataset.to_table(columns=columns, filter=expr).to_pandas()
+
+    def read_equity(self, run_ids=None, strategy=None, symbol=None, start=None, end=None, columns=None):
+        """
+        读取净值曲线
+
+        Args:
+            run_ids: 运行ID列表
+            strategy: 策略名称或名称列表
+            symbol: 股票代码或代码列表
+            start: 开始日期
+            end: 结束日期
+            columns: 只读取指定列
+
+        Returns:
+            DataFrame: 长表格式 (run_id, date, nav, ...)
+        """
+        return self._read('equity', run_ids, strategy, symbol, start, end, columns)
+
+    def read_trades(self, run_ids=None, strategy=None, symbol=None, start=None, end=None, columns=None):
+        """
+        读取成交明细
+
+        Returns:
+            DataFrame: 成交明细
+        """
+        return self._read('trades', run_ids, strategy, symbol, start, end, columns)
+
+    def compare_equity(self, run_ids, value_column='nav', start=None, end=None):
+        """
+        对比多次运行的净值曲线
+
+        Args:
+            run_ids: 运行ID列表
+            value_column: 净值列名
+            start: 开始日期
+            end: 结束日期
+
+        Returns:
+            DataFrame: 索引为日期，列为运行ID
+        """
+        equity = self.read_equity(run_ids=run_ids, start=start, end=end,
+                                  columns=['run_id', 'date', value_column])
+        if equity.empty:
+            return equity
+        return equity.pivot(index='date', columns='run_id', values=value_column)
+
+
+if __name__ == "__main__":
+    # 测试代码
+    import tempfile
+    import numpy as np
+
+    store = BacktestResultStore(tempfile.mkdtemp())
+    dates = pd.bdate_range('2024-01-01', periods=250)
+
+    for fast in [5, 10, 20]:
+        nav = pd.Series(np.random.randn(250).cumsum() / 100 + 1, index=dates, name='nav')
+        store.write_run('ma_cross', params={'fast': fast, 'slow': 60},
+                        metrics={'final_nav': nav.iloc[-1]}, equity=nav, symbol='000001')
+
+    runs = store.query_runs(strategy='ma_cross', params={'slow': 60})
+    print(runs[['run_id', 'param_fast', 'metric_final_nav']])
+    print(store.compare_equity(runs['run_id'], start='2024-06-01').tail())
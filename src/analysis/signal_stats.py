@@ -0,0 +1,338 @@
+"""
+信号有效性统计模块
+对全市场面板一次性计算远期收益标签，与向量化信号掩码关联，
+按板块、年份、市场状态统计各信号的胜率与平均远期收益
+"""
+
+import pandas as pd
+import numpy as np
+
+from ..utils.data_quality import validate_panel
+from ..utils.helpers import get_stock_board
+from .regime import classify_trend, TREND_LABELS
+
+
+PANEL_FIELDS = ['open', 'high', 'low', 'close', 'volume']
+
+# 信号方向：买入信号以上涨为命中，卖出信号以下跌为命中
+SIGNAL_TYPES = {
+    'MA金叉': 'buy',
+    'MA死叉': 'sell',
+    'MACD金叉': 'buy',
+    'MACD死叉': 'sell',
+    'RSI超卖': 'buy',
+    'RSI超买': 'sell',
+    '突破MA60': 'buy',
+    '跌破MA60': 'sell',
+    '放量突破': 'buy',
+    '放量下跌': 'sell',
+    '放量上涨': 'buy',
+    '温和放量': 'buy',
+}
+
+# 增量更新时重算指标所需的预热行数（覆盖MA60及EMA收敛）
+WARMUP_BARS = 250
+
+
+def build_panel(frames, fields=PANEL_FIELDS):
+    """
+    将单只股票的K线数据拼成面板
+
+    Args:
+        frames: {股票代码: K线DataFrame}，需包含 date 列或日期索引
+        fields: 需要的字段
+
+    Returns:
+        dict: {字段: DataFrame(日期 × 股票)}
+    """
+    panel = {}
+    for field in fields:
+        columns = {}
+        for code, df in frames.items():
+            data = df.set_index('date') if 'date' in df.columns else df
+            columns[code] = data[field]
+        panel[field] = pd.DataFrame(columns).sort_index()
+    return panel
+
+
+def compute_forward_returns(close, horizons=(1, 5, 20)):
+    """
+    计算远期收益矩阵
+
+    Args:
+        close: 收盘价矩阵（日期 × 股票）
+        horizons: 远期天数
+
+    Returns:
+        dict: {天数: 远期收益矩阵}，t日的值为 close[t+h] / close[t] - 1
+    """
+    return {h: close.shift(-h) / close - 1 for h in horizons}
+
+
+def compute_signal_masks(panel):
+    """
+    在面板上向量化计算各交易信号
+
+    信号定义与 TradingSignalAnalyzer / OptimizedTradingSignalAnalyzer /
+    AdvancedTradingAnalyzer 中的单根K线判断一致，但对所有日期、所有股票一次算出。
+
+    Args:
+        panel: {字段: DataFrame(日期 × 股票)}
+
+    Returns:
+        dict: {信号名称: 布尔矩阵}
+    """
+    close = panel['close']
+    open_ = panel['open']
+    high = panel['high']
+    low = panel['low']
+    volume = panel['volume']
+
+    ma5 = close.rolling(5).mean()
+    ma10 = close.rolling(10).mean()
+    ma60 = close.rolling(60).mean()
+
+    ema12 = close.ewm(span=12, adjust=False).mean()
+    ema26 = close.ewm(span=26, adjust=False).mean()
+    dif = ema12 - ema26
+    dea = dif.ewm(span=9, adjust=False).mean()
+
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).rolling(14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+    rsi = 100 - (100 / (1 + gain / loss))
+
+    vol_ratio = volume / volume.rolling(20).mean()
+    vol_change = volume / volume.shift(1)
+
+    def cross_up(a, b):
+        return (a > b) & (a.shift(1) <= b.shift(1))
+
+    def cross_down(a, b):
+        return (a < b) & (a.shift(1) >= b.shift(1))
+
+    return {
+        'MA金叉': cross_up(ma5, ma10),
+        'MA死叉': cross_down(ma5, ma10),
+        'MACD金叉': cross_up(dif, dea),
+        'MACD死叉': cross_down(dif, dea),
+        'RSI超卖': rsi < 30,
+        'RSI超买': rsi > 70,
+        '突破MA60': cross_up(close, ma60),
+        '跌破MA60': cross_down(close, ma60),
+        '放量突破': (vol_ratio > 2.0) & (close > high.shift(1)),
+        '放量下跌': (vol_ratio > 2.0) & (close < low.shift(1)),
+        '放量上涨': (vol_change > 2.0) & (close > open_),
+        '温和放量': (vol_ratio > 1.2) & (vol_ratio < 2.0) & (close > open_),
+    }
+
+
+def compute_market_regime(close):
+    """
+    计算市场状态（等权市场指数相对MA20/MA60的位置）
+
+    Args:
+        close: 收盘价矩阵
+
+    Returns:
+        Series: 每日市场状态 强势上涨/震荡/强势下跌
+    """
+    index = (1 + close.pct_change(fill_method=None).mean(axis=1).fillna(0)).cumprod()
+    return classify_trend(index).map(TREND_LABELS)
+
+
+class SignalEffectivenessEngine:
+    """信号有效性统计引擎"""
+
+    def __init__(self, panel, horizons=(1, 5, 20), signals=None, quality_filter=True):
+        """
+        初始化统计引擎
+
+        Args:
+            panel: {字段: DataFrame(日期 × 股票)}，需包含 open/high/low/close/volume
+            horizons: 远期收益天数
+            signals: 需要统计的信号名称列表，默认全部
+            quality_filter: 是否忽略数据质量校验未通过的K线上的信号（见 utils.data_quality）
+        """
+        missing = [f for f in PANEL_FIELDS if f not in panel]
+        if missing:
+            raise ValueError(f"面板缺少必要的字段: {missing}")
+
+        self.panel = {f: panel[f].sort_index() for f in PANEL_FIELDS}
+        self.horizons = tuple(horizons)
+        self.signals = list(signals) if signals else list(SIGNAL_TYPES)
+        self.quality_filter = quality_filter
+        self.events = pd.DataFrame()
+        self.regime = None
+
+    def _signal_masks(self, panel):
+        """计算信号掩码，并去掉数据质量校验未通过的K线上的信号"""
+        masks = compute_signal_masks(panel)
+        if self.quality_filter:
+            valid = validate_panel(panel)[1]['valid']
+            masks = {name: mask & valid for name, mask in masks.items()}
+        return masks
+
+    def _extract_events(self, masks, row_offset=0):
+        """
+        将信号掩码展开为事件表
+
+        Args:
+            masks: {信号名称: 布尔矩阵}
+            row_offset: 掩码第一行在完整面板中的行号
+
+        Returns:
+            DataFrame: (row, col, signal)
+        """
+        frames = []
+        for name in self.signals:
+            rows, cols = np.nonzero(masks[name].fillna(False).values)
+            frames.append(pd.DataFrame({
+                'row': rows + row_offset,
+                'col': cols,
+                'signal': name
+            }))
+        return pd.concat(frames, ignore_index=True)
+
+    def _label_events(self, events):
+        """为事件填充日期、代码、板块、年份、市场状态和远期收益"""
+        close = self.panel['close']
+        values = close.values
+        dates = close.index
+        codes = np.asarray(close.columns)
+        n_rows = len(values)
+
+        rows = events['row'].values
+        cols = events['col'].values
+        events['date'] = dates[rows]
+        events['code'] = codes[cols]
+        events['year'] = pd.DatetimeIndex(events['date']).year
+        events['regime'] = self.regime.values[rows]
+
+        boards = pd.Series({code: get_stock_board(str(code)) for code in codes})
+        events['board'] = boards.values[cols]
+
+        entry = values[rows, cols]
+        for h in self.horizons:
+            target = rows + h
+            valid = target < n_rows
+            fwd = np.full(len(events), np.nan)
+            fwd[valid] = values[target[valid], cols[valid]] / entry[valid] - 1
+            events[f'fwd_{h}'] = fwd
+        return events
+
+    def fit(self):
+        """
+        全量计算信号事件与远期收益标签
+
+        Returns:
+            self
+        """
+        self.regime = compute_market_regime(self.panel['close'])
+        masks = self._signal_masks(self.panel)
+        self.events = self._label_events(self._extract_events(masks))
+        return self
+
+    def update(self, new_bars):
+        """
+        增量追加新交易日并更新统计
+
+        只对尾部窗口重算指标，只为新日期生成事件，只为尚未完整标注的事件补远期收益。
+
+        Args:
+            new_bars: {字段: DataFrame(新日期 × 股票)}
+
+        Returns:
+            self
+        """
+        if self.regime is None:
+            raise ValueError("请先调用 fit() 进行全量计算")
+
+        old_rows = len(self.panel['close'])
+        for field in PANEL_FIELDS:
+            combined = pd.concat([self.panel[field], new_bars[field]])
+            # 新股票追加到末尾，保持已有列位置不变
+            columns = self.panel[field].columns.append(new_bars[field].columns.difference(self.panel[field].columns))
+            self.panel[field] = combined[~combined.index.duplicated(keep='last')].reindex(columns=columns)
+        n_rows = len(self.panel['close'])
+        if n_rows == old_rows:
+            return self
+
+        self.regime = compute_market_regime(self.panel['close'])
+
+        start = max(0, old_rows - WARMUP_BARS)
+        tail = {f: self.panel[f].iloc[start:] for f in PANEL_FIELDS}
+        masks = {name: mask.iloc[old_rows - start:] for name, mask in self._signal_masks(tail).items()}
+        new_events = self._label_events(self._extract_events(masks, row_offset=old_rows))
+
+        # 补全之前远期收益尚未可得的事件
+        max_h = max(self.horizons)
+        pending = self.events['row'] >= old_rows - max_h
+        if pending.any():
+            relabeled = self._label_events(self.events.loc[pending, ['row', 'col', 'signal']].copy())
+            relabeled.index = self.events.index[pending]
+            self.events.loc[pending, relabeled.columns] = relabeled
+
+        self.events = pd.concat([self.events, new_events], ignore_index=True)
+        return self
+
+    def summary(self, by=None):
+        """
+        汇总各信号的命中率与平均远期收益
+
+        Args:
+            by: 额外分组维度，可选 'board'、'year'、'regime' 或其列表
+
+        Returns:
+            DataFrame: 每个(信号, 分组)一行，包含 count、hit_rate_{h}(%)、avg_return_{h}(%)
+        """
+        if self.events.empty:
+            return pd.DataFrame()
+
+        keys = ['signal'] + ([by] if isinstance(by, str) else list(by or []))
+        events = self.events
+        direction = np.where(events['signal'].map(SIGNAL_TYPES) == 'sell', -1, 1)
+
+        stats = pd.DataFrame({k: events[k] for k in keys})
+        stats['count'] = 1
+        for h in self.horizons:
+            fwd = events[f'fwd_{h}']
+            stats[f'n_{h}'] = fwd.notna().astype(int)
+            stats[f'hit_{h}'] = ((fwd * direction) > 0).astype(int)
+            stats[f'ret_{h}'] = fwd
+
+        grouped = stats.groupby(keys)
+        result = grouped['count'].sum().to_frame()
+        for h in self.horizons:
+            n = grouped[f'n_{h}'].sum()
+            result[f'hit_rate_{h}'] = grouped[f'hit_{h}'].sum() / n.replace(0, np.nan) * 100
+            result[f'avg_return_{h}'] = grouped[f'ret_{h}'].mean() * 100
+        result['type'] = result.index.get_level_values('signal').map(SIGNAL_TYPES)
+        return result.reset_index()
+
+
+if __name__ == "__main__":
+    # 测试代码
+    from ..utils.trading_calendar import get_trading_calendar
+
+    dates = get_trading_calendar().recent(600, end='2024-06-28')
+    codes = ['000001', '000002', '300059', '600519', '688981']
+    rng = np.random.default_rng(0)
+    close = pd.DataFrame(np.exp(rng.normal(0, 0.02, (600, 5)).cumsum(axis=0)) * 20, index=dates, columns=codes)
+    panel = {
+        'close': close,
+        'open': close * (1 + rng.normal(0, 0.005, close.shape)),
+        'high': close * 1.01,
+        'low': close * 0.99,
+        'volume': pd.DataFrame(rng.integers(1e6, 1e7, close.shape), index=dates, columns=codes).astype(float)
+    }
+
+    history = {f: df.iloc[:-5] for f, df in panel.items()}
+    latest = {f: df.iloc[-5:] for f, df in panel.items()}
+
+    engine = SignalEffectivenessEngine(history).fit()
+    engine.update(latest)
+
+    print("=== 信号有效性统计 ===")
+    print(engine.summary()[['signal', 'count', 'hit_rate_5', 'avg_return_5']])
+    print(engine.summary(by='board').head(10))
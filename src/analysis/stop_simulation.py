@@ -0,0 +1,245 @@
+"""
+止损模拟模块
+将 calculate_optimized_stop_loss / calculate_stop_loss_profit 的止损规则
+作为移动止损应用到历史上的每一个入场点，统计离场日期、R倍数和止损触发频率
+"""
+
+import pandas as pd
+import numpy as np
+
+from .regime import classify_trend, TREND_UP, TREND_DOWN
+from ..utils.schema import is_validated
+
+
+# 按趋势确定的波动率倍数，与 OptimizedTradingSignalAnalyzer.calculate_optimized_stop_loss 一致
+TREND_MULTIPLIERS = {
+    '强势上涨': 3.0,
+    '震荡': 2.5,
+    '强势下跌': 2.0,
+}
+# 趋势在候选止损矩阵中的列号（0/1/2）对应的标签；与 regime.TREND_LABELS（代码→标签的字典）不同
+_TREND_CODES = np.array(list(TREND_MULTIPLIERS))
+_NEUTRAL_CODE = 1
+
+
+class StopLossSimulator:
+    """移动止损模拟器"""
+
+    def __init__(self, df, vol_window=60, support_window=20):
+        """
+        初始化止损模拟器
+
+        Args:
+            df: K线数据，必须包含 open, close, high, low, volume
+            vol_window: 波动率滚动窗口（只使用入场前的数据，避免未来函数）
+            support_window: 动态支撑位回看天数
+        """
+        self.df = df.reset_index(drop=True)
+        self.vol_window = vol_window
+        self.support_window = support_window
+        self._validate_data()
+        self._prepare()
+
+    def _validate_data(self):
+        """验证数据格式"""
+        if is_validated(self.df):
+            return
+        required_cols = ['open', 'close', 'high', 'low', 'volume']
+        for col in required_cols:
+            if col not in self.df.columns:
+                raise ValueError(f"缺少必要的列: {col}")
+
+    def _prepare(self):
+        """预计算每根K线的波动率、趋势和动态支撑位"""
+        close = self.df['close']
+        if 'trend_state' in self.df.columns:
+            # 已预计算的市场状态直接读取，无法识别的标签（含缺失）按震荡处理
+            codes = {label: i for i, label in enumerate(_TREND_CODES)}
+            trend = self.df['trend_state'].map(codes).fillna(_NEUTRAL_CODE).values
+        else:
+            codes = classify_trend(close, self.df.get('MA20'), self.df.get('MA60')).values
+            trend = np.where(codes == TREND_UP, 0, np.where(codes == TREND_DOWN, 2, _NEUTRAL_CODE))
+        self.trend = trend.astype(int)
+
+        self.volatility = close.pct_change().rolling(self.vol_window).std().values
+        self.support = self.df['low'].rolling(self.support_window, min_periods=1).min().values * 0.98
+
+    def _stop_candidates(self, rule):
+        """
+        计算每根K线收盘后的止损候选价
+
+        Returns:
+            ndarray: (K线数 × 3)，三列分别对应强势上涨/震荡/强势下跌的倍数
+        """
+        close = self.df['close'].values
+        if rule == 'basic':
+            # calculate_stop_loss_profit：固定2倍波动率
+            level = close * (1 - 2 * self.volatility)
+            return np.repeat(level[:, None], 3, axis=1)
+
+        multipliers = np.array(list(TREND_MULTIPLIERS.values()))
+        levels = close[:, None] * (1 - multipliers[None, :] * self.volatility[:, None])
+        # 取波动率止损与动态支撑的较小值（更保守）
+        return np.minimum(levels, self.support[:, None])
+
+    def simulate(self, entries=None, max_holding=60, rule='optimized'):
+        """
+        模拟移动止损
+
+        每个入场点以当日收盘价入场，初始止损按入场日规则计算；之后每日收盘后
+        按同一倍数重新计算止损候选价，止损位只上移不下移。若当日最低价触及止损位
+        则离场（跳空低开时按开盘价成交），持有满 max_holding 日按收盘价离场。
+
+        Args:
+            entries: 入场掩码（布尔Series/数组），默认每根K线都作为入场点
+            max_holding: 最长持有天数
+            rule: 'optimized'（按趋势2/2.5/3倍波动率+20日支撑）或 'basic'（固定2倍波动率）
+
+        Returns:
+            DataFrame: 每个入场点一行
+        """
+        if rule not in ('optimized', 'basic'):
+            raise ValueError(f"不支持的止损规则: {rule}")
+
+        n = len(self.df)
+        open_ = self.df['open'].values
+        close = self.df['close'].values
+        low = self.df['low'].values
+        candidates = self._stop_candidates(rule)
+
+        if entries is None:
+            entries = np.ones(n, dtype=bool)
+        entries = np.asarray(entries, dtype=bool) & ~np.isnan(self.volatility)
+        entry_idx = np.nonzero(entries[:n - 1])[0]
+        if len(entry_idx) == 0:
+            return pd.DataFrame()
+
+        trend = self.trend[entry_idx]
+        initial_stop = candidates[entry_idx, trend]
+        entry_price = close[entry_idx]
+
+        # (入场点 × 持有天数) 的路径矩阵
+        offsets = np.arange(1, max_holding + 1)
+        path = entry_idx[:, None] + offsets[None, :]
+        in_range = path < n
+        path = np.minimum(path, n - 1)
+
+        # 第 j 天的止损位 = max(初始止损, 入场后至第 j-1 天收盘的候选价)
+        prev_candidates = candidates[path - 1, trend[:, None]]
+        prev_candidates[:, 0] = initial_stop
+        stops = np.maximum.accumulate(np.fmax(prev_candidates, initial_stop[:, None]), axis=1)
+
+        hit = (low[path] <= stops) & in_range
+        any_hit = hit.any(axis=1)
+        first_hit = np.argmax(hit, axis=1)
+        last_valid = in_range.sum(axis=1) - 1
+
+        exit_offset = np.where(any_hit, first_hit, last_valid)
+        rows = np.arange(len(entry_idx))
+        exit_idx = path[rows, exit_offset]
+        stop_at_exit = stops[rows, exit_offset]
+
+        exit_price = np.where(
+            any_hit,
+            np.minimum(open_[exit_idx], stop_at_exit),
+            close[exit_idx]
+        )
+        reason = np.where(any_hit, 'stop',
+                          np.where(in_range[:, -1], 'time', 'open'))
+
+        risk = entry_price - initial_stop
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r_multiple = np.where(risk > 0, (exit_price - entry_price) / risk, np.nan)
+
+        dates = self.df['date'].values if 'date' in self.df.columns else np.arange(n)
+        return pd.DataFrame({
+            'entry_date': dates[entry_idx],
+            'entry_price': entry_price,
+            'trend': _TREND_CODES[trend],
+            'initial_stop': initial_stop,
+            'stop_loss_pct': risk / entry_price * 100,
+            'exit_date': dates[exit_idx],
+            'exit_price': exit_price,
+            'exit_reason': reason,
+            'holding_days': exit_offset + 1,
+            'return_pct': (exit_price / entry_price - 1) * 100,
+            'r_multiple': r_multiple
+        })
+
+    @staticmethod
+    def summarize(trades, by=None):
+        """
+        汇总止损模拟结果
+
+        Args:
+            trades: simulate() 的结果
+            by: 分组列，如 'trend'
+
+        Returns:
+            DataFrame: 交易次数、止损触发率、平均R倍数、胜率、平均持有天数
+        """
+        if trades.empty:
+            return pd.DataFrame()
+
+        closed = trades[trades['exit_reason'] != 'open']
+        stats = closed.assign(
+            stop_hit=(closed['exit_reason'] == 'stop').astype(float),
+            win=(closed['r_multiple'] > 0).astype(float)
+        )
+        grouped = stats.groupby(by) if by else stats.groupby(lambda _: '全部')
+        result = grouped.agg(
+            trades=('r_multiple', 'size'),
+            stop_hit_rate=('stop_hit', 'mean'),
+            avg_r=('r_multiple', 'mean'),
+            median_r=('r_multiple', 'median'),
+            win_rate=('win', 'mean'),
+            avg_holding_days=('holding_days', 'mean'),
+            avg_stop_loss_pct=('stop_loss_pct', 'mean')
+        )
+        result['stop_hit_rate'] *= 100
+        result['win_rate'] *= 100
+        return result
+
+
+def simulate_universe(frames, entries=None, **kwargs):
+    """
+    对多只股票批量模拟移动止损
+
+    Args:
+        frames: {股票代码: K线DataFrame}
+        entries: {股票代码: 入场掩码}，默认每根K线都入场
+        **kwargs: 传给 StopLossSimulator.simulate
+
+    Returns:
+        DataFrame: 所有股票的模拟结果，带 code 列
+    """
+    results = []
+    for code, df in frames.items():
+        mask = entries.get(code) if entries else None
+        trades = StopLossSimulator(df).simulate(entries=mask, **kwargs)
+        if not trades.empty:
+            trades.insert(0, 'code', code)
+            results.append(trades)
+    return pd.concat(results, ignore_index=True) if results else pd.DataFrame()
+
+
+if __name__ == "__main__":
+    # 测试代码
+    dates = pd.bdate_range('2020-01-01', periods=1000)
+    close = np.exp(np.random.normal(0.0003, 0.02, 1000).cumsum()) * 20
+    df = pd.DataFrame({
+        'date': dates,
+        'open': close * (1 + np.random.normal(0, 0.005, 1000)),
+        'close': close,
+        'high': close * 1.015,
+        'low': close * 0.985,
+        'volume': np.random.randint(1000000, 10000000, 1000)
+    })
+
+    simulator = StopLossSimulator(df)
+    trades = simulator.simulate()
+
+    print("=== 移动止损模拟 ===")
+    print(trades.tail())
+    print(StopLossSimulator.summarize(trades))
+    print(StopLossSimulator.summarize(trades, by='trend'))
@@ -6,6 +6,9 @@
 import pandas as pd
 import numpy as np
 
+from .regime import add_regime_columns
+from ..utils.schema import is_validated
+
 
 class TechnicalAnalyzer:
     """技术分析器"""
@@ -17,11 +20,14 @@ class TechnicalAnalyzer:
         Args:
             df: K线数据DataFrame，必须包含 open, close, high, low, volume 列
         """
-        self.df = df.copy()
+        # 已规范化的数据只做浅拷贝（新增指标列不影响调用方）
+        self.df = df.copy(deep=not is_validated(df))
         self._validate_data()
     
     def _validate_data(self):
         """验证数据格式"""
+        if is_validated(self.df):
+            return
         required_cols = ['open', 'close', 'high', 'low', 'volume']
         for col in required_cols:
             if col not in self.df.columns:
@@ -181,6 +187,19 @@ class TechnicalAnalyzer:
         
         return self
     
+    def calculate_regime(self, window=120):
+        """
+        计算市场状态（趋势状态、价格位置）
+        
+        Args:
+            window: 价格位置回看天数
+            
+        Returns:
+            self
+        """
+        add_regime_columns(self.df, window)
+        return self
+    
     def calculate_all(self):
         """计算所有常用技术指标"""
         return (self
@@ -225,6 +244,37 @@ class TechnicalAnalyzer:
         return self.df
 
 
+# 页面可选的技术指标及其参数，按此顺序计算
+INDICATOR_STEPS = {
+    'MA': lambda analyzer: analyzer.calculate_ma([5, 10, 20, 60]),
+    'MACD': lambda analyzer: analyzer.calculate_macd(),
+    'RSI': lambda analyzer: analyzer.calculate_rsi(),
+    'BOLL': lambda analyzer: analyzer.calculate_bollinger(),
+    'KDJ': lambda analyzer: analyzer.calculate_kdj(),
+}
+
+
+def calculate_indicators(df, indicators):
+    """
+    按名称计算一组技术指标
+
+    Args:
+        df: K线数据
+        indicators: 指标名称，'MA' / 'MACD' / 'RSI' / 'BOLL' / 'KDJ'
+
+    Returns:
+        DataFrame: 包含技术指标的数据
+    """
+    unknown = set(indicators) - set(INDICATOR_STEPS)
+    if unknown:
+        raise ValueError(f"不支持的技术指标: {sorted(unknown)}")
+    analyzer = TechnicalAnalyzer(df)
+    for name, step in INDICATOR_STEPS.items():
+        if name in indicators:
+            step(analyzer)
+    return analyzer.get_data()
+
+
 def analyze_stock(df):
     """
     便捷函数：对股票数据进行技术分析
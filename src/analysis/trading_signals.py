@@ -9,6 +9,8 @@ from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+from ..utils.schema import is_validated
+
 
 class TradingSignalAnalyzer:
     """交易信号分析器"""
@@ -20,12 +22,14 @@ class TradingSignalAnalyzer:
         Args:
             df: K线数据，必须包含 open, close, high, low, volume, date
         """
-        self.df = df.copy()
+        self.df = df.copy(deep=not is_validated(df))
         self.signals = []
         self._validate_data()
     
     def _validate_data(self):
         """验证数据格式"""
+        if is_validated(self.df):
+            return
         required_cols = ['open', 'close', 'high', 'low', 'volume']
         for col in required_cols:
             if col not in self.df.columns:
@@ -176,15 +180,20 @@ class TradingSignalAnalyzer:
     
     def analyze_trend(self):
         """分析趋势"""
-        df = self.df.copy()
-        
-        # 计算趋势
-        df['trend_short'] = df['close'].rolling(20).mean().iloc[-1]
-        df['trend_long'] = df['close'].rolling(60).mean().iloc[-1] if len(df) >= 60 else df['close'].mean()
+        df = self.df
         
         current_price = df['close'].iloc[-1]
-        ma20 = df['close'].rolling(20).mean().iloc[-1]
-        ma60 = df['close'].rolling(60).mean().iloc[-1] if len(df) >= 60 else df['close'].mean()
+        # 已有均线列（如TechnicalAnalyzer计算过）时直接读取最后一行
+        if 'MA20' in df.columns and not pd.isna(df['MA20'].iloc[-1]):
+            ma20 = df['MA20'].iloc[-1]
+        else:
+            ma20 = df['close'].tail(20).mean() if len(df) >= 20 else np.nan
+        if len(df) < 60:
+            ma60 = df['close'].mean()
+        elif 'MA60' in df.columns and not pd.isna(df['MA60'].iloc[-1]):
+            ma60 = df['MA60'].iloc[-1]
+        else:
+            ma60 = df['close'].tail(60).mean()
         
         # 判断趋势
         if current_price > ma20 > ma60:
@@ -9,6 +9,9 @@ from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+from .regime import add_regime_columns, has_regime_columns, TREND_FACTORS, POSITION_FACTORS
+from ..utils.schema import is_validated
+
 
 class OptimizedTradingSignalAnalyzer:
     """优化版交易信号分析器 - 专业级"""
@@ -20,12 +23,14 @@ class OptimizedTradingSignalAnalyzer:
         Args:
             df: K线数据
         """
-        self.df = df.copy()
+        self.df = df.copy(deep=not is_validated(df))
         self._validate_data()
         self._calculate_all_indicators()
     
     def _validate_data(self):
         """验证数据格式"""
+        if is_validated(self.df):
+            return
         required_cols = ['open', 'close', 'high', 'low', 'volume']
         for col in required_cols:
             if col not in self.df.columns:
@@ -57,62 +62,29 @@ class OptimizedTradingSignalAnalyzer:
         df['VOL_MA5'] = df['volume'].rolling(5).mean()
         df['VOL_MA20'] = df['volume'].rolling(20).mean()
         
+        # 趋势与价格位置（已预计算时直接读取）
+        if not has_regime_columns(df):
+            add_regime_columns(df)
+        
         self.df = df
     
     def _get_trend_factor(self):
         """获取趋势因子"""
-        df = self.df
-        current = df.iloc[-1]
-        
-        # 判断趋势方向
-        if current['close'] > current['MA20'] > current['MA60']:
-            # 强势上涨趋势
-            return {'buy': 1.5, 'sell': 0.7, 'trend': '强势上涨'}
-        elif current['close'] < current['MA20'] < current['MA60']:
-            # 强势下跌趋势
-            return {'buy': 0.7, 'sell': 1.5, 'trend': '强势下跌'}
-        else:
-            # 震荡行情
-            return {'buy': 1.0, 'sell': 1.0, 'trend': '震荡'}
+        trend = self.df['trend_state'].iloc[-1]
+        return {**TREND_FACTORS[trend], 'trend': trend}
     
     def _get_position_factor(self):
         """获取位置因子"""
-        df = self.df
-        lookback = min(120, len(df))
-        recent = df.tail(lookback)
-        
-        max_price = recent['high'].max()
-        min_price = recent['low'].min()
-        current_price = df['close'].iloc[-1]
-        
-        if max_price - min_price > 0:
-            position_pct = (current_price - min_price) / (max_price - min_price) * 100
-        else:
-            position_pct = 50
+        current = self.df.iloc[-1]
+        position = current['position_state']
         
         # 高位（>80%）：卖出信号强化，买入信号弱化
-        if position_pct > 80:
-            return {
-                'position': '高位',
-                'buy': 0.6,
-                'sell': 1.4,
-                'pct': position_pct
-            }
         # 低位（<20%）：买入信号强化，卖出信号弱化
-        elif position_pct < 20:
-            return {
-                'position': '低位',
-                'buy': 1.4,
-                'sell': 0.6,
-                'pct': position_pct
-            }
-        else:
-            return {
-                'position': '中位',
-                'buy': 1.0,
-                'sell': 1.0,
-                'pct': position_pct
-            }
+        return {
+            'position': position,
+            **POSITION_FACTORS[position],
+            'pct': current['position_pct']
+        }
     
     def analyze_signals_with_weights(self):
         """
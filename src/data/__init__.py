@@ -0,0 +1,31 @@
+"""Data modules for BigA Stock Analysis"""
+
+from .akshare_data import AKShareData, AKShareIndicator
+from .tushare_data import TuShareData
+from .history_store import HistoryStore
+from .local_source import LocalFileSource
+from .bar_matrix import BarMatrix, get_bar_matrix
+from .cache import DataCache, get_cache
+from .freshness import FreshnessPolicy, get_freshness_policy
+from .adjustment import AdjustmentEngine, get_adjustment_engine
+from .symbol_master import SymbolMaster, get_symbol_master
+from .universe_store import UniverseStore, get_universe_store
+from .fundamental_store import FundamentalStore, get_fundamental_store
+from .singleflight import SingleFlight, get_singleflight
+from .tick_store import TickStore, TickRecorder, get_tick_store
+from .bar_aggregator import BarAggregator, MinuteBarStore, get_minute_bar_store
+from .replay_data import ReplayDataSource, generate_synthetic_data
+from .hedged_source import HedgedDataSource, get_hedged_source
+from .batch_fetcher import BatchHistoryFetcher, TokenBucket, get_history_batch
+from .prefetch import PrefetchScheduler, AccessTracker, get_prefetcher
+
+__all__ = ['AKShareData', 'AKShareIndicator', 'TuShareData', 'HistoryStore', 'LocalFileSource',
+           'BarMatrix', 'get_bar_matrix', 'DataCache', 'get_cache', 'FreshnessPolicy', 'get_freshness_policy',
+           'BatchHistoryFetcher', 'TokenBucket', 'get_history_batch',
+           'SingleFlight', 'get_singleflight', 'ReplayDataSource', 'generate_synthetic_data',
+           'AdjustmentEngine', 'get_adjustment_engine',
+           'SymbolMaster', 'get_symbol_master', 'UniverseStore', 'get_universe_store',
+           'FundamentalStore', 'get_fundamental_store',
+           'HedgedDataSource', 'get_hedged_source', 'TickStore', 'TickRecorder', 'get_tick_store',
+           'BarAggregator', 'MinuteBarStore', 'get_minute_bar_store',
+           'PrefetchScheduler', 'AccessTracker', 'get_prefetcher']
@@ -0,0 +1,274 @@
+"""
+复权计算模块
+本地只保存不复权K线和每只股票的后复权因子表（仅在除权除息日变化，通常几十行），
+读取时向量化计算前复权/后复权价格：
+    后复权价 = 原始价 × 当日因子
+    前复权价 = 原始价 × 当日因子 / 最新因子
+新的除权除息只需在因子表追加一行，不必重新下载历史K线
+
+目录结构:
+    root/
+    └── <code>.json     # {"factors": [[日期, 因子], ...], "checked_through": 日期}
+"""
+
+import json
+import os
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from ..utils.config import get_config, resolve_path
+from ..utils.trading_calendar import get_trading_calendar
+
+
+# 需要复权的价格列
+PRICE_COLUMNS = ['open', 'close', 'high', 'low', 'change']
+
+ADJUST_TYPES = ('qfq', 'hfq', 'none')
+
+
+def detect_ex_dates(df, tolerance=0.011):
+    """
+    从不复权K线中识别除权除息日：当日昨收（close - change）与上一交易日收盘价不一致
+
+    Args:
+        df: 不复权日K线，需包含 date, close, change 列
+        tolerance: 允许的误差（元），覆盖两位小数的舍入
+
+    Returns:
+        DatetimeIndex: 疑似除权除息日
+    """
+    if df is None or len(df) < 2 or 'change' not in df.columns:
+        return pd.DatetimeIndex([])
+    pre_close = df['close'] - df['change']
+    gap = (pre_close - df['close'].shift(1)).abs()
+    return pd.DatetimeIndex(df.loc[gap > tolerance, 'date'])
+
+
+def ex_rights_multiplier(pre_close, cash=0.0, bonus=0.0, rights=0.0, rights_price=0.0):
+    """
+    计算一次除权除息带来的因子乘数
+
+    除权参考价 = (前收盘 - 每股派息 + 配股价 × 每股配股数) / (1 + 每股送转数 + 每股配股数)
+
+    Args:
+        pre_close: 除权前一日收盘价
+        cash: 每股现金分红（元）
+        bonus: 每股送转股数（10送3转2 即 0.5）
+        rights: 每股配股数
+        rights_price: 配股价
+
+    Returns:
+        float: 前收盘 / 除权参考价
+    """
+    reference = (pre_close - cash + rights_price * rights) / (1 + bonus + rights)
+    if reference <= 0:
+        raise ValueError("除权参考价必须大于0")
+    return pre_close / reference
+
+
+class AdjustmentEngine:
+    """复权因子管理与复权计算"""
+
+    def __init__(self, root, retry_after=3600):
+        """
+        初始化复权引擎
+
+        Args:
+            root: 因子表目录
+            retry_after: 因子表获取失败或为空后，多少秒内不再重试（沿用本地因子表）
+        """
+        self.root = root
+        self.retry_after = retry_after
+        self._memo = {}
+        self._failed = {}  # code -> 上次获取失败的时间
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, code):
+        return os.path.join(self.root, f"{code}.json")
+
+    def _load(self, code):
+        if code not in self._memo:
+            path = self._path(code)
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._memo[code] = json.load(f)
+            else:
+                self._memo[code] = {}
+        return self._memo[code]
+
+    def _save(self, code, record):
+        path = self._path(code)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._memo[code] = record
+
+    def factors(self, code):
+        """
+        读取后复权因子表
+
+        Returns:
+            DataFrame: date, factor（按日期升序），没有因子表时为空
+        """
+        rows = self._load(code).get('factors', [])
+        df = pd.DataFrame(rows, columns=['date', 'factor'])
+        df['date'] = pd.to_datetime(df['date'])
+        return df
+
+    def set_factors(self, code, factors, checked_through=None):
+        """
+        保存后复权因子表（只保留因子变化的日期）
+
+        Args:
+            code: 股票代码
+            factors: DataFrame，date, factor 列
+            checked_through: 因子表确认有效的最后日期，默认今天
+        """
+        df = factors[['date', 'factor']].copy()
+        df['date'] = pd.to_datetime(df['date'])
+        df = df.dropna().sort_values('date').drop_duplicates('date', keep='last')
+        df = df[df['factor'].ne(df['factor'].shift(1))]
+        self._save(code, {
+            'factors': [[d.strftime('%Y-%m-%d'), float(f)] for d, f in zip(df['date'], df['factor'])],
+            'checked_through': pd.Timestamp(checked_through or pd.Timestamp.now()).strftime('%Y-%m-%d'),
+        })
+
+    def add_corporate_action(self, code, ex_date, pre_close, cash=0.0, bonus=0.0, rights=0.0, rights_price=0.0):
+        """
+        追加一次除权除息（只更新因子表，已有K线不变）
+
+        Args:
+            code: 股票代码
+            ex_date: 除权除息日
+            pre_close: 除权前一日收盘价（不复权）
+            cash: 每股现金分红
+            bonus: 每股送转股数
+            rights: 每股配股数
+            rights_price: 配股价
+        """
+        factors = self.factors(code)
+        ex_date = pd.Timestamp(ex_date).normalize()
+        before = factors[factors['date'] < ex_date]
+        base = before['factor'].iloc[-1] if not before.empty else 1.0
+        if factors.empty:
+            factors = pd.DataFrame({'date': [pd.Timestamp('1990-12-19')], 'factor': [1.0]})
+        row = pd.DataFrame({'date': [ex_date],
+                            'factor': [base * ex_rights_multiplier(pre_close, cash, bonus, rights, rights_price)]})
+        self.set_factors(code, pd.concat([factors, row], ignore_index=True),
+                         checked_through=self._load(code).get('checked_through'))
+
+    def needs_refresh(self, code, raw):
+        """
+        因子表是否需要重新获取：没有因子表，因子表确认日期早于最近一个交易日，
+        或K线中出现因子表确认日期之后的除权除息
+
+        前复权价格取决于最新的因子，请求区间之外（确认日期之后）的除权除息同样会改变结果，
+        因此确认日期落后于最近一个交易日时总是重新确认
+
+        Args:
+            code: 股票代码
+            raw: 不复权日K线
+        """
+        record = self._load(code)
+        if not record.get('factors'):
+            return True
+        checked = pd.Timestamp(record.get('checked_through', '1990-01-01'))
+        if checked < get_trading_calendar().previous_trading_day():
+            return True
+        return bool((detect_ex_dates(raw) > checked).any())
+
+    def _refresh(self, code, refresh):
+        """调用因子表获取函数；失败或为空时沿用本地因子表，retry_after 秒内不再重试"""
+        try:
+            fresh = refresh()
+        except Exception as e:
+            print(f"{code} 获取复权因子失败: {e}")
+            fresh = None
+        if fresh is not None and not fresh.empty:
+            self.set_factors(code, fresh)
+            self._failed.pop(code, None)
+        else:
+            self._failed[code] = time.time()
+
+    def adjust(self, code, raw, adjust='qfq', refresh=None):
+        """
+        对不复权K线计算复权价格（向量化）
+
+        Args:
+            code: 股票代码
+            raw: 不复权日K线，需包含 date 列
+            adjust: 'qfq'(前复权) / 'hfq'(后复权) / 'none'
+            refresh: 因子表获取函数 refresh() -> DataFrame(date, factor)，因子表缺失或过期时调用；
+                     获取失败时沿用本地因子表
+
+        Returns:
+            DataFrame: 复权后的日K线（新对象）
+        """
+        if adjust not in ADJUST_TYPES:
+            raise ValueError(f"不支持的复权方式: {adjust}")
+        if raw is None or raw.empty or adjust == 'none':
+            return raw
+
+        if refresh is not None and self.needs_refresh(code, raw) and \
+                time.time() - self._failed.get(code, 0) >= self.retry_after:
+            self._refresh(code, refresh)
+
+        factors = self.factors(code)
+        if factors.empty:
+            raise ValueError(f"{code} 没有复权因子")
+
+        factor_dates = factors['date'].values
+        factor_values = factors['factor'].to_numpy(dtype=float)
+        position = np.searchsorted(factor_dates, pd.to_datetime(raw['date']).values, side='right') - 1
+        factor = np.where(position >= 0, factor_values[position.clip(0)], factor_values[0])
+        if adjust == 'qfq':
+            factor = factor / factor_values[-1]
+
+        df = raw.copy()
+        for col in PRICE_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].to_numpy(dtype=float) * factor
+        return df
+
+
+_default_engines = {}
+
+
+def get_adjustment_engine(root=None):
+    """
+    获取共享的复权引擎
+
+    Args:
+        root: 因子表目录，默认读取 config.yaml 中 storage.factor_dir
+
+    Returns:
+        AdjustmentEngine: 未启用本地存储时返回 None
+    """
+    if not get_config('storage', 'enabled', default=True):
+        return None
+    root = resolve_path(root or get_config('storage', 'factor_dir', default='data/factors'))
+    if root not in _default_engines:
+        _default_engines[root] = AdjustmentEngine(
+            root, retry_after=get_config('storage', 'factor_retry_after', default=3600))
+    return _default_engines[root]
+
+
+if __name__ == "__main__":
+    # 测试代码：10派5元后前复权价格连续
+    import tempfile
+
+    dates = pd.bdate_range('2024-06-03', periods=6)
+    raw = pd.DataFrame({'date': dates, 'close': [10.0, 10.2, 10.1, 9.7, 9.8, 9.9]})
+    raw['change'] = raw['close'].diff().fillna(0)
+    raw.loc[3, 'change'] = 9.7 - 9.6   # 除息日昨收为除息参考价 9.6
+
+    engine = AdjustmentEngine(tempfile.mkdtemp())
+    print(f"识别的除息日: {list(detect_ex_dates(raw).strftime('%Y-%m-%d'))}")
+    engine.add_corporate_action('000001', dates[3], pre_close=10.1, cash=0.5)
+    print(engine.factors('000001'))
+    print(engine.adjust('000001', raw, 'qfq'))
+    print(engine.adjust('000001', raw, 'hfq'))
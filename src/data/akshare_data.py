@@ -0,0 +1,388 @@
+"""
+AKShare数据源模块
+获取A股股票列表、实时行情、历史K线、市场概况
+历史K线优先读取本地存储，只有缺失的日期才请求AKShare；
+本地只存不复权K线，前复权/后复权由复权因子表在读取时计算
+"""
+
+import pandas as pd
+
+from ..analysis.technical import TechnicalAnalyzer
+from ..utils.helpers import get_exchange_from_code
+from ..utils.schema import normalize_bars
+from .history_store import get_history_store
+from .adjustment import get_adjustment_engine
+from .cache import get_cache
+from .singleflight import get_singleflight
+from .batch_fetcher import BatchHistoryFetcher
+from .bar_matrix import get_bar_matrix, update_bar_matrix
+
+
+# AKShare实时行情列名映射
+SPOT_COLUMNS = {
+    '代码': 'code',
+    '名称': 'name',
+    '最新价': 'price',
+    '涨跌幅': 'pct_change',
+    '涨跌额': 'change',
+    '成交量': 'volume',
+    '成交额': 'amount',
+    '振幅': 'amplitude',
+    '最高': 'high',
+    '最低': 'low',
+    '今开': 'open',
+    '昨收': 'pre_close',
+    '量比': 'volume_ratio',
+    '换手率': 'turnover_rate',
+    '市盈率-动态': 'pe',
+    '市净率': 'pb',
+    '总市值': 'total_mv',
+    '流通市值': 'circ_mv',
+}
+
+
+def _market_prefix(code):
+    """AKShare新浪接口的市场前缀"""
+    if code.startswith(('6', '9')):
+        return 'sh'
+    if code.startswith(('4', '8')):
+        return 'bj'
+    return 'sz'
+
+
+def _import_akshare():
+    try:
+        import akshare as ak
+        return ak
+    except ImportError:
+        raise ImportError("需要安装akshare: pip install akshare")
+
+
+class AKShareData:
+    """AKShare数据源"""
+
+    def __init__(self, source=None, store=None, use_store=True, cache=None, use_cache=True,
+                 flight=None, adjuster=None):
+        """
+        初始化AKShare数据源
+
+        Args:
+            source: 历史数据的替代来源（需实现 get_history_data），如 LocalFileSource；
+                    默认请求AKShare
+            store: 本地行情存储 HistoryStore，默认使用 config.yaml 中 storage 配置
+            use_store: 是否启用本地行情存储
+            cache: 数据缓存 DataCache，默认使用 config.yaml 中 cache 配置的共享缓存
+            use_cache: 是否启用缓存
+            flight: 请求合并器 SingleFlight，默认使用进程内共享实例（并发的相同请求只发一次）
+            adjuster: 复权引擎 AdjustmentEngine，默认随本地存储启用；
+                      替代数据源需实现 get_adjust_factors 才使用因子复权
+        """
+        self.source = source
+        self.cache = (cache if cache is not None else get_cache()) if use_cache else None
+        self.flight = flight if flight is not None else get_singleflight()
+        self.store = None
+        if use_store:
+            try:
+                self.store = store if store is not None else get_history_store()
+            except ImportError as e:
+                print(f"本地行情存储不可用: {e}")
+        self.adjuster = None
+        if self.store is not None and (source is None or hasattr(source, 'get_adjust_factors')):
+            self.adjuster = adjuster if adjuster is not None else get_adjustment_engine()
+
+    def _cache_key(self, key):
+        # 替代数据源与默认数据源的数据不能混用
+        return (id(self.source), key) if self.source else key
+
+    def _cached(self, call_type, key, loader, refresh=False):
+        """
+        经缓存调用；缓存未命中时，并发的相同请求合并为一次加载
+
+        refresh 为 True 时跳过缓存读取直接加载，加载成功才覆盖缓存条目，失败时原条目继续有效
+        """
+        key = self._cache_key(key)
+
+        def coalesced():
+            return self.flight.do((call_type, key), loader, call_type)
+
+        if self.cache is None:
+            return coalesced()
+        if not refresh:
+            return self.cache.get_or_load(call_type, key, coalesced)
+        value = coalesced()
+        if value is None or (isinstance(value, (pd.DataFrame, pd.Series)) and value.empty):
+            return value
+        self.cache.set(call_type, key, value)
+        return value.copy() if isinstance(value, (pd.DataFrame, pd.Series)) else value
+
+    def cache_remaining(self, call_type, key):
+        """
+        缓存条目的剩余有效时间（预取调度用）
+
+        Args:
+            call_type: 调用类型，如 'history'
+            key: 与对应方法一致的缓存键，如 (code, start_date, end_date, adjust)
+
+        Returns:
+            float: 秒，未启用缓存或未缓存时为 0
+        """
+        return self.cache.remaining(call_type, self._cache_key(key)) if self.cache is not None else 0.0
+
+    def _fetch_history(self, code, start_date, end_date, adjust='qfq'):
+        """从数据源获取历史K线（失败时抛出异常，避免空结果被记为已覆盖）"""
+        if self.source is not None:
+            return self.source.get_history_data(code, start_date, end_date, adjust)
+
+        ak = _import_akshare()
+        df = ak.stock_zh_a_hist(
+            symbol=code,
+            period='daily',
+            start_date=start_date,
+            end_date=end_date,
+            adjust='' if adjust in (None, 'none') else adjust
+        )
+        if df is None or df.empty:
+            return pd.DataFrame()
+        return normalize_bars(df)
+
+    def _fetch_factors(self, code):
+        """获取后复权因子表（date, factor）"""
+        if self.source is not None:
+            return self.source.get_adjust_factors(code)
+        ak = _import_akshare()
+        df = ak.stock_zh_a_daily(symbol=f"{_market_prefix(code)}{code}", adjust='hfq-factor')
+        if df is None or df.empty:
+            return pd.DataFrame()
+        df = df.rename(columns={'hfq_factor': 'factor'})
+        df['factor'] = pd.to_numeric(df['factor'], errors='coerce')
+        return df[['date', 'factor']]
+
+    def _use_factors(self, adjust):
+        """是否由不复权K线 + 复权因子计算"""
+        return self.adjuster is not None and adjust in ('qfq', 'hfq')
+
+    def _adjust(self, code, raw, adjust):
+        """对本地不复权K线计算复权价格"""
+        return self.adjuster.adjust(code, raw, adjust, refresh=lambda: self._fetch_factors(code))
+
+    def get_history_data(self, code, start_date, end_date, adjust='qfq', refresh=False):
+        """
+        获取历史日K线
+
+        Args:
+            code: 股票代码，如 '000001'
+            start_date: 开始日期 'YYYYMMDD'
+            end_date: 结束日期 'YYYYMMDD'
+            adjust: 复权方式 'qfq'(前复权) / 'hfq'(后复权) / 'none'
+            refresh: 跳过缓存重新加载，成功后覆盖缓存（预取用）
+
+        Returns:
+            DataFrame: 标准列名和dtype（见 utils.schema），按日期升序，已标记为校验通过
+        """
+        def _load():
+            try:
+                if self._use_factors(adjust):
+                    raw = self.store.get_history(
+                        code, start_date, end_date,
+                        lambda c, s, e: self._fetch_history(c, s, e, 'none'),
+                        'none'
+                    )
+                    return normalize_bars(self._adjust(code, raw, adjust))
+                if self.store is not None:
+                    return normalize_bars(self.store.get_history(
+                        code, start_date, end_date,
+                        lambda c, s, e: self._fetch_history(c, s, e, adjust),
+                        adjust
+                    ))
+                return normalize_bars(self._fetch_history(code, start_date, end_date, adjust))
+            except Exception as e:
+                print(f"获取历史数据失败: {e}")
+                return pd.DataFrame()
+
+        return self._cached('history', (code, str(start_date), str(end_date), adjust), _load, refresh)
+
+    def get_history_batch(self, codes, start_date, end_date, adjust='qfq', progress=None, **kwargs):
+        """
+        并发获取多只股票的历史日K线（限速、重试，结果写入本地存储）
+
+        Args:
+            codes: 股票代码列表
+            start_date: 开始日期 'YYYYMMDD'
+            end_date: 结束日期 'YYYYMMDD'
+            adjust: 复权方式
+            progress: 进度回调 progress(done, total, code, ok)
+            **kwargs: 传给 BatchHistoryFetcher 的其他参数，如 max_concurrency、retries
+
+        Returns:
+            dict: {代码: DataFrame}，失败的股票不在结果中
+        """
+        use_factors = self._use_factors(adjust)
+        fetcher = BatchHistoryFetcher(
+            fetch=self._fetch_history, store=self.store, use_store=self.store is not None,
+            adjust='none' if use_factors else adjust, progress=progress, **kwargs
+        )
+        results = fetcher.run(codes, start_date, end_date)
+        if fetcher.errors:
+            print(f"批量获取历史数据失败 {len(fetcher.errors)} 只: {list(fetcher.errors)[:10]}")
+        if self.source is None and self.store is not None and results:
+            self._update_bar_matrix(list(results), start_date, end_date)
+        normalized = {}
+        for code, df in results.items():
+            try:
+                normalized[code] = normalize_bars(self._adjust(code, df, adjust) if use_factors else df)
+            except Exception as e:
+                print(f"{code} 复权失败: {e}" if use_factors else f"{code} 数据格式错误: {e}")
+        return normalized
+
+    def _update_bar_matrix(self, codes, start_date, end_date):
+        """批量更新后把新K线同步到全市场K线矩阵（矩阵已构建时）"""
+        try:
+            matrix = get_bar_matrix('r+')
+            if matrix is not None:
+                update_bar_matrix(matrix, self.store, codes, start_date, end_date, self.adjuster)
+        except Exception as e:
+            print(f"更新K线矩阵失败: {e}")
+
+    def _fetch_spot(self, refresh=False):
+        """
+        获取全市场实时行情快照
+
+        快照按代码建立索引并写入共享缓存，有效期内所有调用方（包括不同会话）共用一次请求
+
+        Args:
+            refresh: 跳过缓存重新加载，成功后覆盖缓存
+        """
+        def _load():
+            ak = _import_akshare()
+            spot = ak.stock_zh_a_spot_em().rename(columns=SPOT_COLUMNS)
+            spot['code'] = spot['code'].astype(str)
+            spot.index = pd.Index(spot['code'].values)
+            return spot
+
+        return self._cached('realtime_quote', 'spot', _load, refresh)
+
+    def get_realtime_quotes(self, codes, refresh=False):
+        """
+        批量获取实时行情（一次全市场快照，按代码查找）
+
+        Args:
+            codes: 股票代码列表
+            refresh: 跳过缓存重新获取快照，成功后覆盖缓存（预取用）
+
+        Returns:
+            DataFrame: 以代码为索引，按传入顺序排列；快照中没有的代码不在结果中
+        """
+        try:
+            spot = self._fetch_spot(refresh)
+            found = [code for code in dict.fromkeys(codes) if code in spot.index]
+            return spot.loc[found]
+        except Exception as e:
+            print(f"获取实时行情失败: {e}")
+            return pd.DataFrame()
+
+    def get_realtime_quote(self, code):
+        """
+        获取单只股票实时行情
+
+        Args:
+            code: 股票代码
+
+        Returns:
+            DataFrame: 一行行情数据，包含 price 列
+        """
+        return self.get_realtime_quotes([code]).reset_index(drop=True)
+
+    def get_stock_list(self, exchange=None):
+        """
+        获取股票列表
+
+        Args:
+            exchange: '深圳交易所' / '上海交易所'，默认全部
+
+        Returns:
+            DataFrame: 包含 code, name 列
+        """
+        try:
+            df = self._cached('stock_list', 'all', lambda: _import_akshare().stock_info_a_code_name())
+            if exchange:
+                df = df[df['code'].map(get_exchange_from_code) == exchange]
+            return df.reset_index(drop=True)
+        except Exception as e:
+            print(f"获取股票列表失败: {e}")
+            return pd.DataFrame()
+
+    def get_market_overview(self):
+        """
+        获取市场涨跌概况
+
+        Returns:
+            DataFrame: 包含 type, count 列（上涨/下跌/平盘）
+        """
+        def _load():
+            spot = self._fetch_spot()
+            change = pd.to_numeric(spot['pct_change'], errors='coerce').dropna()
+            return pd.DataFrame({
+                'type': ['上涨', '下跌', '平盘'],
+                'count': [(change > 0).sum(), (change < 0).sum(), (change == 0).sum()]
+            })
+
+        try:
+            return self._cached('market_overview', 'overview', _load)
+        except Exception as e:
+            print(f"获取市场概况失败: {e}")
+            return pd.DataFrame()
+
+
+class AKShareIndicator:
+    """技术指标计算（链式调用，基于TechnicalAnalyzer）"""
+
+    def __init__(self, df=None):
+        self.analyzer = TechnicalAnalyzer(df) if df is not None else None
+
+    def calculate_ma(self, df=None, periods=[5, 10, 20, 60]):
+        """
+        计算移动平均线
+
+        Args:
+            df: K线数据（首次调用时传入）
+            periods: MA周期列表
+
+        Returns:
+            self
+        """
+        if df is not None:
+            self.analyzer = TechnicalAnalyzer(df)
+        self.analyzer.calculate_ma(periods)
+        return self
+
+    def calculate_macd(self, fast=12, slow=26, signal=9):
+        """计算MACD"""
+        self.analyzer.calculate_macd(fast, slow, signal)
+        return self
+
+    def calculate_rsi(self, period=14):
+        """计算RSI"""
+        self.analyzer.calculate_rsi(period)
+        return self
+
+    def calculate_bollinger(self, period=20, num_std=2):
+        """计算布林带"""
+        self.analyzer.calculate_bollinger(period, num_std)
+        return self
+
+    def calculate_kdj(self, n=9, m1=3, m2=3):
+        """计算KDJ"""
+        self.analyzer.calculate_kdj(n, m1, m2)
+        return self
+
+    def get_data(self):
+        """获取计算结果"""
+        return self.analyzer.get_data()
+
+
+if __name__ == "__main__":
+    # 测试代码
+    ak_data = AKShareData()
+    hist = ak_data.get_history_data('000001', '20240101', '20241201')
+    print(f"获取到 {len(hist)} 条历史数据")
+    print(hist.tail())
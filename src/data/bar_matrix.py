@@ -0,0 +1,509 @@
+"""
+全市场K线矩阵模块
+每个字段（open/high/low/close/volume/amount）一个 (交易日 × 股票) 的二进制矩阵文件，
+配合股票索引、交易日历和元数据文件，任何进程都可以 np.memmap 零拷贝映射后按日期/股票切片
+
+目录结构:
+    root/
+    ├── meta.json        # 行数、股票数、股票容量、文件代数、字段及类型
+    ├── symbols.txt      # 股票代码，一行一个，行号即列号
+    ├── calendar.bin     # 交易日（datetime64[D]，int64）
+    ├── open.bin ... amount.bin   # 行优先存储，追加一个交易日 = 在文件末尾追加一行
+    └── open.g1.bin ...  # 扩容后按新容量重写的字段文件（第1代）
+
+每日更新时只在文件末尾追加一行，并在最后原子更新 meta.json；
+读取方以 meta.json 中的行数、股票数和文件代数为准，因此不会读到写了一半的数据。
+扩容时字段文件写为新一代文件，由 meta.json 的一次原子替换切换，中途中断不影响旧文件。
+"""
+
+import json
+import os
+import uuid
+
+import pandas as pd
+import numpy as np
+
+from ..utils.config import get_config, resolve_path
+
+
+FIELD_DTYPES = {
+    'open': np.float32,
+    'high': np.float32,
+    'low': np.float32,
+    'close': np.float32,
+    'volume': np.float64,
+    'amount': np.float64,
+}
+
+
+class BarMatrix:
+    """内存映射的全市场K线矩阵"""
+
+    META_FILE = 'meta.json'
+    SYMBOLS_FILE = 'symbols.txt'
+    CALENDAR_FILE = 'calendar.bin'
+
+    def __init__(self, root, mode='r'):
+        """
+        打开已有的K线矩阵
+
+        Args:
+            root: 矩阵目录
+            mode: 'r' 只读映射，'r+' 可原地修改/追加
+        """
+        if mode not in ('r', 'r+'):
+            raise ValueError(f"不支持的打开模式: {mode}")
+        self.root = root
+        self.mode = mode
+        self._maps = {}
+        self.refresh()
+
+    # ------------------------------------------------------------------
+    # 创建
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def create(cls, root, symbols, capacity=None, fields=FIELD_DTYPES):
+        """
+        创建空的K线矩阵
+
+        Args:
+            root: 矩阵目录
+            symbols: 股票代码列表
+            capacity: 股票列容量（预留新股位置，避免频繁重建），默认 股票数 × 1.1 + 100
+            fields: {字段: dtype}
+
+        Returns:
+            BarMatrix: 以 'r+' 模式打开的矩阵
+        """
+        symbols = [str(s) for s in symbols]
+        capacity = capacity or int(len(symbols) * 1.1) + 100
+        if capacity < len(symbols):
+            raise ValueError("股票容量不能小于股票数量")
+
+        os.makedirs(root, exist_ok=True)
+        for name in list(fields) + [cls.CALENDAR_FILE]:
+            path = os.path.join(root, name if name.endswith('.bin') else f"{name}.bin")
+            open(path, 'wb').close()
+
+        cls._write_symbols(root, symbols)
+        cls._write_meta(root, {
+            'n_days': 0,
+            'n_symbols': len(symbols),
+            'capacity': capacity,
+            'generation': 0,
+            'fields': {name: np.dtype(dtype).str for name, dtype in fields.items()}
+        })
+        return cls(root, mode='r+')
+
+    @classmethod
+    def from_panel(cls, root, panel, capacity=None):
+        """
+        从面板数据创建K线矩阵
+
+        Args:
+            root: 矩阵目录
+            panel: {字段: DataFrame(日期 × 股票)}
+            capacity: 股票列容量
+
+        Returns:
+            BarMatrix
+        """
+        close = panel['close']
+        fields = {f: FIELD_DTYPES.get(f, np.float64) for f in panel}
+        matrix = cls.create(root, list(close.columns), capacity, fields)
+        aligned = {f: df.reindex(index=close.index, columns=close.columns) for f, df in panel.items()}
+        matrix.append(close.index, {f: df.values for f, df in aligned.items()})
+        return matrix
+
+    @staticmethod
+    def _write_meta(root, meta):
+        path = os.path.join(root, BarMatrix.META_FILE)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _write_symbols(root, symbols):
+        """原子写入股票代码（只在末尾追加新股票，读取方按 meta.json 的股票数截取）"""
+        path = os.path.join(root, BarMatrix.SYMBOLS_FILE)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(symbols))
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _field_file(name, generation=0):
+        """字段文件名：第0代为 <字段>.bin，扩容后为 <字段>.g<代数>.bin"""
+        return f"{name}.bin" if not generation else f"{name}.g{generation}.bin"
+
+    # ------------------------------------------------------------------
+    # 映射
+    # ------------------------------------------------------------------
+
+    def refresh(self):
+        """重新读取元数据并重新映射（其他进程追加数据后调用）"""
+        with open(os.path.join(self.root, self.META_FILE), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        with open(os.path.join(self.root, self.SYMBOLS_FILE), 'r', encoding='utf-8') as f:
+            symbols = f.read().split('\n') if self.meta['n_symbols'] else []
+        self.symbols = np.array(symbols[:self.meta['n_symbols']])
+        self.symbol_index = {code: i for i, code in enumerate(self.symbols)}
+
+        n_days = self.meta['n_days']
+        calendar = self._map(self.CALENDAR_FILE, np.int64, (n_days,))
+        self.calendar = pd.DatetimeIndex(calendar.astype('datetime64[D]'))
+        self._maps = {}
+        return self
+
+    def _map(self, filename, dtype, shape):
+        """映射一个文件的前 shape 个元素"""
+        path = os.path.join(self.root, filename)
+        if int(np.prod(shape)) == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode=self.mode, shape=shape)
+
+    @property
+    def fields(self):
+        return list(self.meta['fields'])
+
+    @property
+    def shape(self):
+        return self.meta['n_days'], self.meta['n_symbols']
+
+    def field(self, name):
+        """
+        获取字段矩阵（零拷贝）
+
+        Args:
+            name: 字段名
+
+        Returns:
+            ndarray: (交易日 × 股票) 的内存映射视图
+        """
+        if name not in self.meta['fields']:
+            raise ValueError(f"不存在的字段: {name}")
+        if name not in self._maps:
+            dtype = np.dtype(self.meta['fields'][name])
+            full = self._map(self._field_file(name, self.meta.get('generation', 0)), dtype,
+                             (self.meta['n_days'], self.meta['capacity']))
+            self._maps[name] = full[:, :self.meta['n_symbols']]
+        return self._maps[name]
+
+    # ------------------------------------------------------------------
+    # 切片
+    # ------------------------------------------------------------------
+
+    def date_slice(self, start=None, end=None):
+        """将日期区间转换为行切片（二分查找）"""
+        i = 0 if start is None else self.calendar.searchsorted(pd.Timestamp(start), side='left')
+        j = len(self.calendar) if end is None else self.calendar.searchsorted(pd.Timestamp(end), side='right')
+        return slice(i, j)
+
+    def symbol_positions(self, symbols):
+        """股票代码转换为列号（不存在的代码抛出 KeyError）"""
+        return np.array([self.symbol_index[str(s)] for s in symbols], dtype=np.int64)
+
+    def get(self, name, start=None, end=None, symbols=None):
+        """
+        按日期/股票切片
+
+        只按日期切片时返回内存映射视图（零拷贝）；指定股票时按列取数（产生拷贝）。
+
+        Args:
+            name: 字段名
+            start: 开始日期
+            end: 结束日期
+            symbols: 股票代码列表
+
+        Returns:
+            ndarray
+        """
+        data = self.field(name)[self.date_slice(start, end)]
+        if symbols is not None:
+            data = data[:, self.symbol_positions(symbols)]
+        return data
+
+    def to_frame(self, name, start=None, end=None, symbols=None):
+        """
+        按日期/股票切片为DataFrame
+
+        Returns:
+            DataFrame: 索引为交易日，列为股票代码
+        """
+        rows = self.date_slice(start, end)
+        data = self.get(name, start, end, symbols)
+        columns = self.symbols if symbols is None else [str(s) for s in symbols]
+        return pd.DataFrame(data, index=self.calendar[rows], columns=columns, copy=False)
+
+    def to_panel(self, start=None, end=None, symbols=None, fields=None):
+        """
+        按日期/股票切片为面板
+
+        Returns:
+            dict: {字段: DataFrame(日期 × 股票)}
+        """
+        return {f: self.to_frame(f, start, end, symbols) for f in (fields or self.fields)}
+
+    # ------------------------------------------------------------------
+    # 追加与更新
+    # ------------------------------------------------------------------
+
+    def _check_writable(self):
+        if self.mode != 'r+':
+            raise IOError("K线矩阵以只读模式打开")
+
+    def _truncate_to_meta(self):
+        """截掉上次写入中断遗留的、未记入元数据的尾部数据"""
+        n_days = self.meta['n_days']
+        generation = self.meta.get('generation', 0)
+        for name, dtype in self.meta['fields'].items():
+            row_bytes = np.dtype(dtype).itemsize * self.meta['capacity']
+            path = os.path.join(self.root, self._field_file(name, generation))
+            if os.path.getsize(path) > n_days * row_bytes:
+                os.truncate(path, n_days * row_bytes)
+        path = os.path.join(self.root, self.CALENDAR_FILE)
+        if os.path.getsize(path) > n_days * 8:
+            os.truncate(path, n_days * 8)
+        self._remove_old_generations(generation)
+
+    def _align_rows(self, values, n_rows):
+        """将 DataFrame/Series/ndarray 对齐为 (行数 × 容量) 的矩阵，缺失为NaN"""
+        capacity = self.meta['capacity']
+        n_symbols = self.meta['n_symbols']
+        out = np.full((n_rows, capacity), np.nan)
+        if isinstance(values, (pd.DataFrame, pd.Series)):
+            frame = values.to_frame().T if isinstance(values, pd.Series) else values
+            frame = frame.reindex(columns=self.symbols)
+            out[:, :n_symbols] = frame.values
+        else:
+            arr = np.asarray(values, dtype=float).reshape(n_rows, -1)
+            out[:, :arr.shape[1]] = arr
+        return out
+
+    def append(self, dates, bars):
+        """
+        在矩阵末尾追加交易日
+
+        Args:
+            dates: 交易日（单个日期或日期列表），必须晚于已有最后一个交易日
+            bars: {字段: 数据}，数据可为按股票代码为列的 DataFrame/Series，
+                  或与 symbols 顺序一致的数组；缺失字段/股票写入NaN
+
+        Returns:
+            self
+        """
+        self._check_writable()
+        dates = pd.DatetimeIndex([dates] if np.ndim(dates) == 0 else dates).normalize()
+        if len(self.calendar) and dates[0] <= self.calendar[-1]:
+            raise ValueError(f"追加日期 {dates[0].date()} 不晚于已有最后交易日 {self.calendar[-1].date()}")
+
+        self._truncate_to_meta()
+        n_rows = len(dates)
+        for name, dtype in self.meta['fields'].items():
+            rows = self._align_rows(bars[name], n_rows) if name in bars else \
+                np.full((n_rows, self.meta['capacity']), np.nan)
+            with open(os.path.join(self.root, self._field_file(name, self.meta.get('generation', 0))), 'ab') as f:
+                f.write(rows.astype(np.dtype(dtype)).tobytes())
+        with open(os.path.join(self.root, self.CALENDAR_FILE), 'ab') as f:
+            f.write(dates.values.astype('datetime64[D]').astype(np.int64).tobytes())
+
+        self.meta['n_days'] += n_rows
+        self._write_meta(self.root, self.meta)
+        return self.refresh()
+
+    def update_day(self, date, bars):
+        """
+        原地更新已有交易日（如收盘后修正数据）
+
+        Args:
+            date: 已存在的交易日
+            bars: {字段: 数据}，格式同 append
+        """
+        self._check_writable()
+        row = self.calendar.get_loc(pd.Timestamp(date).normalize())
+        for name, values in bars.items():
+            aligned = self._align_rows(values, 1)[0, :self.meta['n_symbols']]
+            target = self.field(name)
+            valid = ~np.isnan(aligned)
+            target[row, valid] = aligned[valid]
+            if isinstance(target, np.memmap):
+                target.flush()
+        return self
+
+    def add_symbols(self, symbols):
+        """
+        增加股票列（容量内直接扩展，超出容量时按1.5倍重建为新一代文件）
+
+        股票代码文件先原子写入，容量、文件代数和股票数随 meta.json 的一次原子替换同时生效
+
+        Args:
+            symbols: 新股票代码列表
+
+        Returns:
+            self
+        """
+        self._check_writable()
+        new = [str(s) for s in symbols if str(s) not in self.symbol_index]
+        if not new:
+            return self
+
+        meta = dict(self.meta, n_symbols=self.meta['n_symbols'] + len(new))
+        if meta['n_symbols'] > meta['capacity']:
+            meta.update(self._resize(int(meta['n_symbols'] * 1.5)))
+
+        self._write_symbols(self.root, list(self.symbols) + new)
+        self._write_meta(self.root, meta)
+        self._remove_old_generations(meta.get('generation', 0))
+        return self.refresh()
+
+    def _resize(self, capacity):
+        """
+        按新容量把所有字段写为新一代文件（meta.json 切换前对读取方不可见）
+
+        Returns:
+            dict: 需要写入 meta.json 的 capacity 和 generation
+        """
+        self._truncate_to_meta()
+        n_days, old_capacity = self.meta['n_days'], self.meta['capacity']
+        old_generation = self.meta.get('generation', 0)
+        generation = old_generation + 1
+        for name, dtype in self.meta['fields'].items():
+            old_path = os.path.join(self.root, self._field_file(name, old_generation))
+            path = os.path.join(self.root, self._field_file(name, generation))
+            old = np.fromfile(old_path, dtype=np.dtype(dtype)).reshape(n_days, old_capacity)
+            new = np.full((n_days, capacity), np.nan, dtype=np.dtype(dtype))
+            new[:, :old_capacity] = old
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            new.tofile(tmp_path)
+            os.replace(tmp_path, path)
+        return {'capacity': capacity, 'generation': generation}
+
+    def _remove_old_generations(self, generation):
+        """
+        删除当前代和上一代以外的字段文件，以及中断遗留的临时文件
+
+        保留上一代：刚读取旧 meta.json 的读取方仍能映射旧文件
+        """
+        keep = {self._field_file(name, g) for name in self.meta['fields'] for g in (generation, generation - 1)}
+        for filename in os.listdir(self.root):
+            field = filename.split('.', 1)[0]
+            if field in self.meta['fields'] and filename not in keep and \
+                    (filename.endswith('.bin') or filename.endswith('.tmp')):
+                os.remove(os.path.join(self.root, filename))
+
+
+def _read_panel(store, symbols, start, end, adjust, adjuster):
+    """从本地行情存储读取面板 {字段: DataFrame(日期 × 股票)}，没有数据的股票不在列中"""
+    frames = {}
+    for code in symbols:
+        if adjuster is not None and adjust in ('qfq', 'hfq'):
+            df = adjuster.adjust(code, store.read(code, start, end, 'none'), adjust)
+        else:
+            df = store.read(code, start, end, adjust)
+        if not df.empty:
+            frames[code] = df.set_index('date')
+    fields = [f for f in FIELD_DTYPES if any(f in df.columns for df in frames.values())]
+    panel = {f: pd.DataFrame({code: df[f] for code, df in frames.items() if f in df.columns})
+             for f in fields}
+    return {f: df.sort_index().reindex(columns=list(frames)) for f, df in panel.items()}
+
+
+def build_bar_matrix(root, store, symbols, start, end, adjust='hfq', adjuster=None):
+    """
+    从本地行情存储构建K线矩阵
+
+    Args:
+        root: 矩阵目录
+        store: HistoryStore
+        symbols: 股票代码列表
+        start: 开始日期
+        end: 结束日期
+        adjust: 复权方式（记入 meta.json，每日追加沿用）；前复权价格随除权变化，
+                需要每日追加的矩阵应使用 'hfq' 或 'none'
+        adjuster: 复权引擎，提供时读取不复权K线并按因子表复权
+
+    Returns:
+        BarMatrix
+    """
+    matrix = BarMatrix.from_panel(root, _read_panel(store, symbols, start, end, adjust, adjuster))
+    matrix.meta['adjust'] = adjust
+    BarMatrix._write_meta(root, matrix.meta)
+    return matrix
+
+
+def update_bar_matrix(matrix, store, symbols, start, end, adjuster=None):
+    """
+    把本地行情存储中新写入的K线同步到K线矩阵（每日批量更新后调用）
+
+    新股票增加列；矩阵中已有的交易日按非空值原地更新，之后的交易日追加到末尾
+
+    Args:
+        matrix: 以 'r+' 模式打开的 BarMatrix
+        store: HistoryStore
+        symbols: 本次更新的股票代码
+        start: 开始日期
+        end: 结束日期
+        adjuster: 复权引擎，复权方式沿用矩阵构建时的设置
+
+    Returns:
+        int: 追加的交易日数
+    """
+    panel = _read_panel(store, symbols, start, end, matrix.meta.get('adjust', 'none'), adjuster)
+    if not panel or panel['close'].empty:
+        return 0
+    matrix.add_symbols(panel['close'].columns)
+    dates = panel['close'].index
+    last = matrix.calendar[-1] if len(matrix.calendar) else None
+    for date in (dates if last is None else dates[dates <= last]):
+        if date in matrix.calendar:
+            matrix.update_day(date, {f: df.loc[date] for f, df in panel.items()})
+    new_dates = dates if last is None else dates[dates > last]
+    if len(new_dates):
+        matrix.append(new_dates, {f: df.loc[new_dates] for f, df in panel.items()})
+    return len(new_dates)
+
+
+_default_matrices = {}
+
+
+def get_bar_matrix(mode='r'):
+    """
+    获取共享的全市场K线矩阵（目录读取 config.yaml 中 storage.bar_matrix_dir）
+
+    Args:
+        mode: 'r' 只读，'r+' 可追加（每日更新用）
+
+    Returns:
+        BarMatrix: 未启用本地存储或矩阵尚未构建时返回 None；已打开的矩阵重新读取元数据后返回
+    """
+    if not get_config('storage', 'enabled', default=True):
+        return None
+    root = resolve_path(get_config('storage', 'bar_matrix_dir', default='data/bars'))
+    if not os.path.exists(os.path.join(root, BarMatrix.META_FILE)):
+        return None
+    key = (root, mode)
+    if key not in _default_matrices:
+        _default_matrices[key] = BarMatrix(root, mode)
+        return _default_matrices[key]
+    return _default_matrices[key].refresh()
+
+
+if __name__ == "__main__":
+    # 测试代码
+    import tempfile
+
+    root = tempfile.mkdtemp()
+    dates = pd.bdate_range('2024-01-01', periods=250)
+    codes = ['000001', '000002', '600000', '600519']
+    close = pd.DataFrame(np.random.rand(250, 4) * 10 + 10, index=dates, columns=codes)
+    panel = {'open': close, 'high': close * 1.01, 'low': close * 0.99, 'close': close,
+             'volume': close * 1e5, 'amount': close * 1e6}
+
+    matrix = BarMatrix.from_panel(root, {f: df.iloc[:-1] for f, df in panel.items()})
+    matrix.append(dates[-1], {f: df.iloc[-1] for f, df in panel.items()})
+
+    reader = BarMatrix(root)
+    print(f"矩阵形状: {reader.shape}")
+    print(reader.to_frame('close', start='2024-12-01', symbols=['600519', '000001']).tail())
@@ -0,0 +1,249 @@
+"""
+批量历史行情获取模块
+基于 asyncio 并发获取多只股票的日K线：并发数上限、按数据源的令牌桶限速、
+失败重试（指数退避）、进度回调，结果直接写入本地行情存储
+"""
+
+import asyncio
+import inspect
+import random
+import threading
+import time
+
+import pandas as pd
+
+from ..utils.config import get_config
+from .history_store import get_history_store
+
+
+class TokenBucket:
+    """令牌桶限速器（异步，可跨线程和事件循环共享）"""
+
+    def __init__(self, rate, capacity=None):
+        """
+        初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数（即平均请求速率）
+            capacity: 桶容量（允许的突发请求数），默认等于 rate
+        """
+        if rate <= 0:
+            raise ValueError("rate 必须大于0")
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(rate, 1))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        # 令牌状态只由线程锁保护：多个会话各自 asyncio.run 的事件循环和后台线程共用同一个桶
+        self._tokens_lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self, tokens=1):
+        """不等待地获取令牌（供后台线程使用），令牌不足时返回 False"""
+        with self._tokens_lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def _reserve(self, tokens):
+        """
+        预留令牌，返回需要等待的秒数
+
+        令牌不足时预支为负数，后来的请求排在已预留的请求之后，等待时间依次递增
+        """
+        with self._tokens_lock:
+            self._refill()
+            self.tokens -= tokens
+            return max(0.0, -self.tokens / self.rate)
+
+    async def acquire(self, tokens=1):
+        """获取令牌，不足时等待（在锁外等待，不阻塞其他线程和事件循环）"""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+_rate_limiters = {}
+
+
+def get_rate_limiter(source_name):
+    """
+    获取数据源共享的令牌桶（同一数据源的所有批量任务共用一个限速）
+
+    Args:
+        source_name: 数据源名称，如 'akshare'，读取 config.yaml 中
+                     data_sources.<name>.rate_limit / burst
+
+    Returns:
+        TokenBucket
+    """
+    if source_name not in _rate_limiters:
+        rate = get_config('data_sources', source_name, 'rate_limit', default=5)
+        burst = get_config('data_sources', source_name, 'burst', default=None)
+        _rate_limiters[source_name] = TokenBucket(rate, burst)
+    return _rate_limiters[source_name]
+
+
+class BatchHistoryFetcher:
+    """批量日K线获取器"""
+
+    def __init__(self, fetch=None, source_name='akshare', store=None, use_store=True,
+                 max_concurrency=None, rate_limiter=None, retries=3, backoff=0.5,
+                 adjust='qfq', progress=None):
+        """
+        初始化批量获取器
+
+        Args:
+            fetch: 数据源函数 fetch(code, start, end, adjust) -> DataFrame，日期参数为 'YYYYMMDD'；
+                   可以是普通函数（在线程池中执行）或协程函数。默认使用 AKShare
+            source_name: 数据源名称，用于选择限速配置
+            store: 本地行情存储，默认使用 config.yaml 中 storage 配置
+            use_store: 是否写入本地行情存储（启用时只请求缺失的日期）
+            max_concurrency: 最大并发请求数，默认读取 data_sources.<name>.max_concurrency
+            rate_limiter: 限速器，默认使用数据源共享的令牌桶
+            retries: 单次请求失败后的重试次数
+            backoff: 首次重试等待秒数，之后按2倍递增（附加随机抖动）
+            adjust: 复权方式
+            progress: 进度回调 progress(done, total, code, ok)
+        """
+        if fetch is None:
+            from .akshare_data import AKShareData
+            fetch = AKShareData(use_store=False, use_cache=False)._fetch_history
+        self.fetch = fetch
+        self.source_name = source_name
+        self.store = None
+        if use_store:
+            self.store = store if store is not None else get_history_store()
+        self.max_concurrency = max_concurrency or get_config(
+            'data_sources', source_name, 'max_concurrency', default=8)
+        self.rate_limiter = rate_limiter or get_rate_limiter(source_name)
+        self.retries = retries
+        self.backoff = backoff
+        self.adjust = adjust
+        self.progress = progress
+
+        self.errors = {}
+        self.stats = {}
+
+    async def _call(self, code, start, end):
+        """限速 + 重试地调用一次数据源"""
+        for attempt in range(self.retries + 1):
+            await self.rate_limiter.acquire()
+            self.stats['requests'] += 1
+            try:
+                if inspect.iscoroutinefunction(self.fetch):
+                    return await self.fetch(code, start, end, self.adjust)
+                return await asyncio.to_thread(self.fetch, code, start, end, self.adjust)
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                self.stats['retries'] += 1
+                delay = self.backoff * (2 ** attempt)
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+    async def _fetch_one(self, code, start, end):
+        """获取单只股票：有本地存储时只补缺失区间"""
+        if self.store is None:
+            return await self._call(code, start.strftime('%Y%m%d'), end.strftime('%Y%m%d'))
+
+        plan = await asyncio.to_thread(self.store.plan_fetch, code, start, end, self.adjust)
+        for fetch_start, gap_start, gap_end in plan:
+            data = await self._call(code, fetch_start.strftime('%Y%m%d'), gap_end.strftime('%Y%m%d'))
+            await asyncio.to_thread(self.store.record_fetch, code, gap_start, gap_end, data, self.adjust)
+        return await asyncio.to_thread(self.store.read, code, start, end, self.adjust)
+
+    async def fetch_all(self, codes, start_date, end_date):
+        """
+        并发获取多只股票的日K线
+
+        Args:
+            codes: 股票代码列表
+            start_date: 开始日期
+            end_date: 结束日期
+
+        Returns:
+            dict: {代码: DataFrame}，失败的股票不在结果中，原因见 self.errors
+        """
+        start = pd.Timestamp(start_date).normalize()
+        end = pd.Timestamp(end_date).normalize()
+        codes = list(dict.fromkeys(codes))
+        self.errors = {}
+        self.stats = {'total': len(codes), 'succeeded': 0, 'failed': 0,
+                      'requests': 0, 'retries': 0, 'elapsed': 0.0}
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results = {}
+        done = 0
+        started_at = time.monotonic()
+
+        async def worker(code):
+            nonlocal done
+            async with semaphore:
+                try:
+                    results[code] = await self._fetch_one(code, start, end)
+                    ok = True
+                    self.stats['succeeded'] += 1
+                except Exception as e:
+                    self.errors[code] = str(e)
+                    ok = False
+                    self.stats['failed'] += 1
+            done += 1
+            if self.progress is not None:
+                self.progress(done, len(codes), code, ok)
+
+        await asyncio.gather(*(worker(code) for code in codes))
+        self.stats['elapsed'] = time.monotonic() - started_at
+        return results
+
+    def run(self, codes, start_date, end_date):
+        """fetch_all 的同步版本（不能在已运行的事件循环中调用）"""
+        return asyncio.run(self.fetch_all(codes, start_date, end_date))
+
+
+def get_history_batch(codes, start_date, end_date, adjust='qfq', progress=None, **kwargs):
+    """
+    批量获取历史日K线（同步调用）
+
+    Args:
+        codes: 股票代码列表
+        start_date: 开始日期 'YYYYMMDD'
+        end_date: 结束日期 'YYYYMMDD'
+        adjust: 复权方式
+        progress: 进度回调 progress(done, total, code, ok)
+        **kwargs: 传给 BatchHistoryFetcher 的其他参数
+
+    Returns:
+        dict: {代码: DataFrame}
+    """
+    fetcher = BatchHistoryFetcher(adjust=adjust, progress=progress, **kwargs)
+    return fetcher.run(codes, start_date, end_date)
+
+
+if __name__ == "__main__":
+    # 测试代码：模拟延迟和限流的本地数据源
+    import tempfile
+
+    from .history_store import HistoryStore
+
+    async def stub_fetch(code, start, end, adjust):
+        await asyncio.sleep(random.uniform(0.05, 0.2))
+        if random.random() < 0.1:
+            raise ConnectionError("429 Too Many Requests")
+        dates = pd.bdate_range(start, end)
+        return pd.DataFrame({'date': dates, 'close': 10.0, 'open': 10.0,
+                             'high': 10.0, 'low': 10.0, 'volume': 1000.0})
+
+    codes = [f"{i:06d}" for i in range(1, 101)]
+    fetcher = BatchHistoryFetcher(
+        fetch=stub_fetch, store=HistoryStore(tempfile.mkdtemp()),
+        max_concurrency=16, rate_limiter=TokenBucket(50, 10), backoff=0.1,
+        progress=lambda done, total, code, ok: done % 20 == 0 and print(f"进度 {done}/{total}")
+    )
+    data = fetcher.run(codes, '20240101', '20240630')
+    print(fetcher.stats)
+    print(f"失败: {fetcher.errors}")
@@ -0,0 +1,246 @@
+"""
+数据缓存模块
+进程内 TTL + LRU 缓存，读取 config.yaml 的 cache 配置：
+按调用类型设置过期时间（启用新鲜度策略时按交易时段计算，见 freshness.py），
+按条目数和字节数双重上限淘汰，并统计命中/未命中
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from ..utils.config import get_config
+from .freshness import get_freshness_policy
+
+
+# 各调用类型的默认过期时间（秒），可在 config.yaml 的 cache.ttls 中覆盖
+DEFAULT_TTLS = {
+    'history': 3600,
+    'realtime_quote': 10,
+    'stock_list': 86400,
+    'market_overview': 30,
+    'indicators': 3600,
+}
+
+
+def estimate_size(value):
+    """估算缓存对象占用的字节数"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class DataCache:
+    """TTL + LRU 数据缓存（线程安全）"""
+
+    def __init__(self, max_size=1000, max_bytes=512 * 1024 * 1024, default_ttl=300, ttls=None, policy=None):
+        """
+        初始化缓存
+
+        Args:
+            max_size: 最大条目数
+            max_bytes: 最大总字节数
+            default_ttl: 未配置类型的默认过期时间（秒）
+            ttls: {调用类型: 过期时间}，启用新鲜度策略时为交易时段内的过期时间
+            policy: 新鲜度策略 FreshnessPolicy，按交易时段延长或缩短过期时间，为 None 时使用固定过期时间
+        """
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.policy = policy
+
+        self._entries = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._stats = {}
+
+    def _stat(self, call_type):
+        if call_type not in self._stats:
+            self._stats[call_type] = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0}
+        return self._stats[call_type]
+
+    def ttl_for(self, call_type, now=None):
+        """
+        获取调用类型的过期时间
+
+        Args:
+            call_type: 调用类型
+            now: 写入时间，默认现在（仅新鲜度策略使用）
+
+        Returns:
+            float: 秒
+        """
+        ttl = self.ttls.get(call_type, self.default_ttl)
+        return self.policy.ttl(call_type, ttl, now) if self.policy is not None else ttl
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, call_type, key, default=None):
+        """
+        读取缓存
+
+        Args:
+            call_type: 调用类型
+            key: 缓存键（可哈希）
+
+        Returns:
+            缓存值，未命中或过期时返回 default
+        """
+        full_key = (call_type, key)
+        with self._lock:
+            entry = self._entries.get(full_key)
+            stat = self._stat(call_type)
+            if entry is None:
+                stat['misses'] += 1
+                return default
+            value, expires_at, _ = entry
+            if expires_at <= time.time():
+                self._remove(full_key)
+                stat['expired'] += 1
+                stat['misses'] += 1
+                return default
+            self._entries.move_to_end(full_key)
+            stat['hits'] += 1
+            return value
+
+    def remaining(self, call_type, key):
+        """
+        缓存条目的剩余有效时间（不计入命中统计，不改变LRU顺序）
+
+        Returns:
+            float: 秒，未缓存或已过期时为 0
+        """
+        with self._lock:
+            entry = self._entries.get((call_type, key))
+            return max(entry[1] - time.time(), 0.0) if entry is not None else 0.0
+
+    def set(self, call_type, key, value, ttl=None):
+        """
+        写入缓存
+
+        Args:
+            call_type: 调用类型
+            key: 缓存键
+            value: 缓存值
+            ttl: 过期时间（秒），默认按调用类型
+        """
+        ttl = self.ttl_for(call_type) if ttl is None else ttl
+        if ttl <= 0:
+            return
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+
+        full_key = (call_type, key)
+        with self._lock:
+            if full_key in self._entries:
+                self._remove(full_key)
+            self._entries[full_key] = (value, time.time() + ttl, size)
+            self._bytes += size
+            self._evict()
+
+    def _evict(self):
+        """按LRU顺序淘汰，直到满足条目数和字节数上限"""
+        while self._entries and (len(self._entries) > self.max_size or self._bytes > self.max_bytes):
+            key, _ = next(iter(self._entries.items()))
+            self._remove(key)
+            self._stat(key[0])['evictions'] += 1
+
+    def get_or_load(self, call_type, key, loader, ttl=None):
+        """
+        读取缓存，未命中时调用 loader 加载并写入
+
+        空的DataFrame（通常表示请求失败）不写入缓存。DataFrame 返回副本，
+        调用方修改结果不会污染缓存。
+
+        Args:
+            call_type: 调用类型
+            key: 缓存键
+            loader: 无参加载函数
+
+        Returns:
+            数据
+        """
+        value = self.get(call_type, key)
+        if value is None:
+            value = loader()
+            if value is None or (isinstance(value, (pd.DataFrame, pd.Series)) and value.empty):
+                return value
+            self.set(call_type, key, value, ttl)
+        return value.copy() if isinstance(value, (pd.DataFrame, pd.Series)) else value
+
+    def invalidate(self, call_type=None, key=None):
+        """
+        清除缓存
+
+        Args:
+            call_type: 只清除该类型，默认全部
+            key: 只清除该键
+        """
+        with self._lock:
+            if call_type is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            targets = [k for k in self._entries
+                       if k[0] == call_type and (key is None or k[1] == key)]
+            for k in targets:
+                self._remove(k)
+
+    def stats(self):
+        """
+        缓存统计
+
+        Returns:
+            dict: 条目数、字节数及各调用类型的命中/未命中/淘汰次数和命中率
+        """
+        with self._lock:
+            by_type = {}
+            for call_type, stat in self._stats.items():
+                total = stat['hits'] + stat['misses']
+                by_type[call_type] = {**stat, 'hit_rate': stat['hits'] / total * 100 if total else 0}
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_size': self.max_size,
+                'max_bytes': self.max_bytes,
+                'by_type': by_type
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    获取进程内共享的数据缓存（按 config.yaml 的 cache 配置创建）
+
+    Returns:
+        DataCache: cache.enabled 为 false 时返回 None
+    """
+    global _default_cache
+    if not get_config('cache', 'enabled', default=True):
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = DataCache(
+                max_size=get_config('cache', 'max_size', default=1000),
+                max_bytes=int(get_config('cache', 'max_bytes_mb', default=512)) * 1024 * 1024,
+                default_ttl=get_config('cache', 'ttl', default=300),
+                ttls=get_config('cache', 'ttls', default={}),
+                policy=get_freshness_policy()
+            )
+    return _default_cache
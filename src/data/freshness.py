@@ -0,0 +1,209 @@
+"""
+缓存新鲜度策略模块
+按交易日历和交易时段计算各调用类型缓存的过期时刻，代替固定的过期时间：
+    实时数据（行情快照、涨跌概况）：竞价和连续交易时段按秒级过期，午间休市保持到13:00，
+        收盘数据稳定后保持到下一个交易日开盘集合竞价
+    日线数据（历史K线、技术指标）：盘中按较短时间过期，收盘后数据发布后保持到下一个交易日开盘
+    股票列表：保持到下一个交易日开盘集合竞价（新股上市当天生效）
+夜间、周末和节假日数据不会变化，缓存一直有效，命中率最高；盘中数据仍保持新鲜
+"""
+
+from datetime import datetime
+
+import pandas as pd
+
+from ..utils.config import get_config
+from ..utils.trading_calendar import get_trading_calendar, intraday_phase
+
+
+# 调用类型 -> 数据类别，可在 config.yaml 的 cache.freshness.kinds 中覆盖
+DEFAULT_KINDS = {
+    'realtime_quote': 'realtime',
+    'market_overview': 'realtime',
+    'history': 'daily',
+    'indicators': 'daily',
+    'stock_list': 'listing',
+}
+
+# 各数据类别的时刻（HH:MM），可在 config.yaml 的 cache.freshness.times 中覆盖
+DEFAULT_TIMES = {
+    'call_auction': '09:15',    # 开盘集合竞价，实时数据开始变化
+    'open': '09:30',            # 连续竞价，当日K线开始出现
+    'afternoon': '13:00',       # 午间休市结束
+    'realtime_final': '15:05',  # 收盘集合竞价结果稳定，实时数据不再变化
+    'daily_final': '16:00',     # 当日日K线发布完成
+}
+
+# 实时数据按固定过期时间缓存的交易时段
+ACTIVE_PHASES = ('call_auction', 'continuous')
+
+
+def _minute_of_day(value):
+    hour, minute = str(value).split(':')
+    return int(hour) * 60 + int(minute)
+
+
+class FreshnessPolicy:
+    """按交易时段计算缓存过期时间"""
+
+    def __init__(self, kinds=None, times=None, max_ttl=None, calendar=None):
+        """
+        初始化新鲜度策略
+
+        Args:
+            kinds: {调用类型: 'realtime' / 'daily' / 'listing'}，未列出的调用类型使用固定过期时间
+            times: 各时刻 'HH:MM'，见 DEFAULT_TIMES
+            max_ttl: 过期时间上限（秒），长假期间也不超过该值
+            calendar: 交易日历，默认共享日历
+        """
+        self.kinds = {**DEFAULT_KINDS, **(kinds or {})}
+        self.times = {name: _minute_of_day(value) for name, value in {**DEFAULT_TIMES, **(times or {})}.items()}
+        self.max_ttl = max_ttl if max_ttl is not None else 7 * 86400
+        self.calendar = calendar or get_trading_calendar()
+        self._days = {}  # 自然日 -> (是否交易日, 下一个交易日)
+
+    def _day(self, today):
+        """自然日是否为交易日及之后的下一个交易日（按日缓存，每次写缓存都会用到）"""
+        info = self._days.get(today)
+        if info is None:
+            try:
+                next_session = self.calendar.shift(today, 1)
+            except ValueError:
+                # 已到交易日历最后一个交易日（下一年休市安排尚未公布），按下一个工作日计算
+                next_session = today + pd.offsets.BDay(1)
+            info = (bool(self.calendar.is_trading_day(today)), next_session)
+            self._days[today] = info
+        return info
+
+    def phase(self, now):
+        """当前交易时段，同 TradingCalendar.market_phase"""
+        if not self._day(now.normalize())[0]:
+            return 'closed'
+        return intraday_phase(now.hour * 60 + now.minute)
+
+    def _at(self, date, name):
+        """交易日 date 的某个时刻"""
+        return pd.Timestamp(date).normalize() + pd.Timedelta(minutes=self.times[name])
+
+    def next_time(self, now, name):
+        """
+        now 之后（不含）最近一个交易日的某个时刻
+
+        Args:
+            now: 当前时间
+            name: 时刻名称，如 'call_auction'
+
+        Returns:
+            Timestamp
+        """
+        today = now.normalize()
+        is_session, next_session = self._day(today)
+        if is_session and now < self._at(today, name):
+            return self._at(today, name)
+        return self._at(next_session, name)
+
+    def expires_at(self, call_type, base_ttl, now=None):
+        """
+        缓存过期时刻
+
+        Args:
+            call_type: 调用类型
+            base_ttl: 固定过期时间（秒），用于盘中和未配置类别的调用类型
+            now: 写入时间，默认现在
+
+        Returns:
+            Timestamp
+        """
+        now = pd.Timestamp(now or datetime.now())
+        fixed = now + pd.Timedelta(seconds=base_ttl)
+        kind = self.kinds.get(call_type)
+        if kind is None:
+            return fixed
+
+        phase = self.phase(now)
+        today = now.normalize()
+        if kind == 'listing':
+            expires = self.next_time(now, 'call_auction')
+        elif kind == 'realtime':
+            if phase in ACTIVE_PHASES:
+                expires = fixed
+            elif phase == 'lunch':
+                expires = self._at(today, 'afternoon')
+            elif phase == 'post_close' and now < self._at(today, 'realtime_final'):
+                expires = fixed
+            else:
+                expires = self.next_time(now, 'call_auction')
+        elif kind == 'daily':
+            if phase in ('pre_open', 'closed'):
+                expires = self.next_time(now, 'open')
+            elif phase == 'lunch':
+                expires = max(self._at(today, 'afternoon'), fixed)
+            elif now < self._at(today, 'daily_final'):
+                expires = min(fixed, self._at(today, 'daily_final'))
+            else:
+                expires = self.next_time(now, 'open')
+        else:
+            raise ValueError(f"不支持的数据类别: {kind}")
+        return min(expires, now + pd.Timedelta(seconds=self.max_ttl))
+
+    def ttl(self, call_type, base_ttl, now=None):
+        """
+        缓存过期时间
+
+        Args:
+            call_type: 调用类型
+            base_ttl: 固定过期时间（秒），不大于0时不缓存
+            now: 写入时间，默认现在
+
+        Returns:
+            float: 秒
+        """
+        if base_ttl <= 0:
+            return base_ttl
+        now = pd.Timestamp(now or datetime.now())
+        return max((self.expires_at(call_type, base_ttl, now) - now).total_seconds(), 0.0)
+
+    def schedule(self, ttls, now=None):
+        """
+        当前时刻各调用类型的过期时间
+
+        Args:
+            ttls: {调用类型: 固定过期时间}
+            now: 当前时间，默认现在
+
+        Returns:
+            DataFrame: call_type, kind, ttl, expires_at
+        """
+        now = pd.Timestamp(now or datetime.now())
+        rows = [{'call_type': call_type, 'kind': self.kinds.get(call_type, 'fixed'),
+                 'ttl': self.ttl(call_type, base_ttl, now), 'expires_at': self.expires_at(call_type, base_ttl, now)}
+                for call_type, base_ttl in ttls.items()]
+        return pd.DataFrame(rows)
+
+
+def get_freshness_policy():
+    """
+    按 config.yaml 的 cache.freshness 配置创建新鲜度策略
+
+    Returns:
+        FreshnessPolicy: cache.freshness.enabled 为 false 时返回 None
+    """
+    if not get_config('cache', 'freshness', 'enabled', default=True):
+        return None
+    return FreshnessPolicy(
+        kinds=get_config('cache', 'freshness', 'kinds', default={}),
+        times=get_config('cache', 'freshness', 'times', default={}),
+        max_ttl=get_config('cache', 'freshness', 'max_ttl', default=None),
+    )
+
+
+if __name__ == "__main__":
+    # 测试代码：一个交易日内各时点，以及周五收盘后到周一开盘
+    from .cache import DEFAULT_TTLS
+
+    policy = FreshnessPolicy()
+    for now in ['2024-06-28 08:00', '2024-06-28 09:20', '2024-06-28 10:00', '2024-06-28 11:45',
+                '2024-06-28 15:02', '2024-06-28 15:30', '2024-06-28 17:00', '2024-06-29 12:00']:
+        table = policy.schedule(DEFAULT_TTLS, now).set_index('call_type')
+        print(f"{now} [{policy.phase(pd.Timestamp(now))}]")
+        print(table[['ttl', 'expires_at']].to_string(header=False))
@@ -0,0 +1,332 @@
+"""
+基本面数据时点存储模块
+本地保存全市场每日估值指标和季度财务指标，财务数据记录公告日，
+通过向量化的 as-of 关联把基本面对齐到行情面板：
+每个交易日只能看到当日收盘前已知的数据，没有未来函数，也不需要逐只股票请求
+
+目录结构:
+    root/
+    ├── daily_basic/year=2024.parquet   # code, date, pe, pe_ttm, pb, ps, turnover_rate, total_mv ...
+    └── financials/year=2024.parquet    # code, end_date(报告期), ann_date(公告日), 指标 ...
+"""
+
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from ..utils.config import get_config, resolve_path
+from ..utils.trading_calendar import get_trading_calendar
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+DAILY_KEYS = ['code', 'date']
+FINANCIAL_KEYS = ['code', 'end_date', 'ann_date']
+
+
+def _normalize_code(series):
+    """'000001.SZ' -> '000001'"""
+    return series.astype(str).str[:6]
+
+
+class FundamentalStore:
+    """基本面数据时点存储"""
+
+    def __init__(self, root):
+        """
+        初始化基本面存储
+
+        Args:
+            root: 存储根目录
+        """
+        if pa is None:
+            raise ImportError("基本面存储需要安装pyarrow: pip install pyarrow")
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # 读写
+    # ------------------------------------------------------------------
+
+    def _path(self, table, year):
+        return os.path.join(self.root, table, f"year={year}.parquet")
+
+    def _write_partition(self, df, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path)
+        os.replace(tmp_path, path)
+
+    def _upsert(self, table, df, date_col, keys):
+        """按年份分区合并写入，相同键以新数据为准"""
+        for year, part in df.groupby(df[date_col].dt.year):
+            path = self._path(table, year)
+            if os.path.exists(path):
+                part = pd.concat([pq.read_table(path).to_pandas(), part], ignore_index=True)
+            part = part.drop_duplicates(keys, keep='last').sort_values(keys[::-1]).reset_index(drop=True)
+            self._write_partition(part, path)
+
+    def _read(self, table, date_col, start=None, end=None, codes=None, columns=None):
+        base = os.path.join(self.root, table)
+        if not os.path.isdir(base):
+            return pd.DataFrame()
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+
+        frames = []
+        for name in sorted(os.listdir(base)):
+            if not (name.startswith('year=') and name.endswith('.parquet')):
+                continue
+            year = int(name[5:9])
+            if (start is not None and year < start.year) or (end is not None and year > end.year):
+                continue
+            filters = [('code', 'in', list(codes))] if codes is not None else None
+            frames.append(pq.read_table(os.path.join(base, name), columns=columns, filters=filters).to_pandas())
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames, ignore_index=True)
+        mask = pd.Series(True, index=df.index)
+        if start is not None:
+            mask &= df[date_col] >= start
+        if end is not None:
+            mask &= df[date_col] <= end
+        return df[mask].reset_index(drop=True)
+
+    def write_daily_basic(self, df):
+        """
+        写入每日估值指标（TuShare daily_basic 格式或已标准化的数据）
+
+        Args:
+            df: 包含 ts_code/code, trade_date/date 及指标列
+        """
+        if df is None or df.empty:
+            return
+        df = df.rename(columns={'ts_code': 'code', 'trade_date': 'date'}).copy()
+        df['code'] = _normalize_code(df['code'])
+        df['date'] = pd.to_datetime(df['date'].astype(str))
+        self._upsert('daily_basic', df, 'date', DAILY_KEYS)
+
+    def write_financials(self, df):
+        """
+        写入季度财务指标（同一报告期的更正公告作为新版本保留）
+
+        Args:
+            df: 包含 ts_code/code, end_date(报告期), ann_date(公告日) 及指标列
+        """
+        if df is None or df.empty:
+            return
+        df = df.rename(columns={'ts_code': 'code'}).copy()
+        df['code'] = _normalize_code(df['code'])
+        for col in ('end_date', 'ann_date'):
+            df[col] = pd.to_datetime(df[col].astype(str))
+        df = df.dropna(subset=['ann_date'])
+        self._upsert('financials', df, 'ann_date', FINANCIAL_KEYS)
+
+    def read_daily_basic(self, start=None, end=None, codes=None, fields=None):
+        """读取每日估值指标"""
+        columns = DAILY_KEYS + list(fields) if fields else None
+        return self._read('daily_basic', 'date', start, end, codes, columns)
+
+    def read_financials(self, start=None, end=None, codes=None, fields=None):
+        """读取公告日在区间内的财务指标"""
+        columns = FINANCIAL_KEYS + list(fields) if fields else None
+        return self._read('financials', 'ann_date', start, end, codes, columns)
+
+    def stored_dates(self, start=None, end=None):
+        """已存储每日估值的交易日"""
+        df = self._read('daily_basic', 'date', start, end, columns=['date'])
+        return pd.DatetimeIndex(df['date'].unique()).sort_values() if not df.empty else pd.DatetimeIndex([])
+
+    # ------------------------------------------------------------------
+    # 更新
+    # ------------------------------------------------------------------
+
+    def update_daily_basic(self, fetch, start, end):
+        """
+        补齐区间内缺失交易日的全市场估值（每个交易日一次请求）
+
+        Args:
+            fetch: fetch(trade_date 'YYYYMMDD') -> 当日全市场 DataFrame
+            start: 开始日期
+            end: 结束日期
+
+        Returns:
+            int: 新写入的交易日数
+        """
+        sessions = get_trading_calendar().sessions(start, end)
+        missing = sessions.difference(self.stored_dates(start, end))
+        frames = []
+        for date in missing:
+            df = fetch(date.strftime('%Y%m%d'))
+            if df is not None and not df.empty:
+                frames.append(df)
+        if frames:
+            self.write_daily_basic(pd.concat(frames, ignore_index=True))
+        return len(frames)
+
+    def update_financials(self, fetch, periods):
+        """
+        按报告期更新全市场财务指标
+
+        Args:
+            fetch: fetch(period 'YYYYMMDD') -> 该报告期全市场 DataFrame
+            periods: 报告期列表，如 ['20231231', '20240331']
+        """
+        for period in periods:
+            self.write_financials(fetch(pd.Timestamp(period).strftime('%Y%m%d')))
+
+    # ------------------------------------------------------------------
+    # 时点关联
+    # ------------------------------------------------------------------
+
+    def daily_panel(self, field, dates, codes):
+        """
+        每日估值指标面板（dates × codes），缺失日期沿用最近一个已知值
+
+        Args:
+            field: 指标名，如 'pe_ttm'
+            dates: 交易日
+            codes: 股票代码列表
+
+        Returns:
+            DataFrame
+        """
+        dates = pd.DatetimeIndex(dates)
+        df = self.read_daily_basic(None, dates.max(), codes, [field])
+        if df.empty:
+            return pd.DataFrame(np.nan, index=dates, columns=list(codes))
+        wide = df.pivot_table(index='date', columns='code', values=field, aggfunc='last')
+        wide = wide.reindex(wide.index.union(dates)).sort_index().ffill()
+        return wide.reindex(index=dates, columns=list(codes))
+
+    def financial_panel(self, field, dates, codes):
+        """
+        财务指标面板（dates × codes）：每个交易日取当时已公告的最新报告期数值
+
+        公告日当天可能盘后发布，从公告日后的下一个交易日起可见；
+        晚于更新报告期公告的旧报告期更正不会覆盖新报告期。
+
+        Args:
+            field: 指标名，如 'roe'
+            dates: 交易日
+            codes: 股票代码列表
+
+        Returns:
+            DataFrame
+        """
+        dates = pd.DatetimeIndex(dates)
+        known = self._visible_financials(codes, dates.max(), [field])
+        if known.empty:
+            return pd.DataFrame(np.nan, index=dates, columns=list(codes))
+        wide = known.pivot_table(index='visible_date', columns='code', values=field, aggfunc='last')
+        wide = wide.reindex(wide.index.union(dates)).sort_index().ffill()
+        return wide.reindex(index=dates, columns=list(codes))
+
+    def _visible_financials(self, codes, end, fields):
+        """计算每条财务记录的可见日期，并剔除不改变最新报告期的旧报告期更正"""
+        df = self.read_financials(None, end, codes, fields)
+        if df.empty:
+            return df
+        calendar = get_trading_calendar()
+        # 交易日历范围外（早于日历，或在日历最后一个交易日及之后）的公告日按下一个工作日可见
+        ann_date = pd.DatetimeIndex(df['ann_date'])
+        covered = np.asarray(calendar.covers(ann_date), dtype=bool) & np.asarray(ann_date < calendar.days[-1])
+        visible = pd.Series(ann_date + pd.offsets.BDay(1))
+        if covered.any():
+            visible[covered] = calendar.shift(ann_date[covered], 1)
+        df['visible_date'] = visible.to_numpy()
+        df = df.sort_values(['code', 'visible_date', 'end_date'], kind='stable')
+        latest_period = df.groupby('code')['end_date'].cummax()
+        return df[df['end_date'] >= latest_period].reset_index(drop=True)
+
+    def asof_join(self, frame, daily_fields=(), financial_fields=(), date_col='date', code_col='code'):
+        """
+        把基本面指标按时点关联到长表行情（每行一个 代码×日期）
+
+        Args:
+            frame: 行情数据，包含 date_col 和 code_col 列
+            daily_fields: 每日估值指标，如 ['pe_ttm', 'pb']
+            financial_fields: 财务指标，如 ['roe', 'netprofit_yoy']
+            date_col: 日期列名
+            code_col: 代码列名
+
+        Returns:
+            DataFrame: 原始行顺序不变，追加指标列
+        """
+        result = frame.copy()
+        result['_row'] = np.arange(len(result))
+        left = result[[date_col, code_col, '_row']].rename(columns={date_col: '_date', code_col: '_code'})
+        left['_date'] = pd.to_datetime(left['_date'])
+        left = left.sort_values('_date', kind='stable')
+        codes = left['_code'].unique().tolist()
+        end = left['_date'].max()
+
+        sources = []
+        if daily_fields:
+            daily = self.read_daily_basic(None, end, codes, daily_fields)
+            if not daily.empty:
+                sources.append((daily.rename(columns={'date': '_date', 'code': '_code'}), list(daily_fields)))
+        if financial_fields:
+            fin = self._visible_financials(codes, end, financial_fields)
+            if not fin.empty:
+                fin = fin.rename(columns={'visible_date': '_date', 'code': '_code'})
+                sources.append((fin, list(financial_fields)))
+
+        for right, fields in sources:
+            right = right[['_date', '_code'] + fields].sort_values('_date', kind='stable')
+            right['_date'] = right['_date'].astype(left['_date'].dtype)
+            left = pd.merge_asof(left, right, on='_date', by='_code', direction='backward')
+
+        for right, fields in sources:
+            for field in fields:
+                result[field] = left.set_index('_row')[field].reindex(result['_row']).to_numpy()
+        for field in list(daily_fields) + list(financial_fields):
+            if field not in result.columns:
+                result[field] = np.nan
+        return result.drop(columns='_row')
+
+
+_default_store = None
+
+
+def get_fundamental_store():
+    """
+    获取共享的基本面存储（目录读取 config.yaml 中 storage.fundamental_dir）
+
+    Returns:
+        FundamentalStore: 未启用本地存储时返回 None
+    """
+    global _default_store
+    if not get_config('storage', 'enabled', default=True):
+        return None
+    if _default_store is None:
+        _default_store = FundamentalStore(
+            resolve_path(get_config('storage', 'fundamental_dir', default='data/fundamentals')))
+    return _default_store
+
+
+if __name__ == "__main__":
+    # 测试代码：2024Q1 报告在 4月26日（周五）公告，4月29日起可见
+    import tempfile
+
+    store = FundamentalStore(tempfile.mkdtemp())
+    store.write_financials(pd.DataFrame({
+        'ts_code': ['000001.SZ', '000001.SZ', '000001.SZ'],
+        'end_date': ['20231231', '20240331', '20231231'],
+        'ann_date': ['20240315', '20240426', '20240510'],   # 最后一行为年报更正
+        'roe': [10.0, 2.5, 10.2],
+    }))
+    dates = get_trading_calendar().sessions('2024-04-24', '2024-05-14')
+    store.write_daily_basic(pd.DataFrame({
+        'ts_code': '000001.SZ', 'trade_date': dates.strftime('%Y%m%d'), 'pe_ttm': np.linspace(5, 6, len(dates)),
+    }))
+
+    prices = pd.DataFrame({'date': dates, 'code': '000001', 'close': 10.0})
+    print(store.asof_join(prices, ['pe_ttm'], ['roe']))
+    print(store.financial_panel('roe', dates, ['000001']).T)
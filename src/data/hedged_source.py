@@ -0,0 +1,325 @@
+"""
+多数据源对冲请求模块
+把AKShare、TuShare等数据源组合为一个数据源：先向当前最健康的数据源发请求，
+超过延迟预算仍未返回时再向下一个数据源发出对冲请求，以先返回的有效结果为准；
+记录每个数据源最近请求的延迟分位数和错误率，后续请求自动优先路由到更健康的数据源
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from ..utils.config import get_config
+
+
+def _is_valid(result):
+    """数据源约定失败时返回空 DataFrame，空结果不作为有效结果"""
+    if result is None:
+        return False
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return not result.empty
+    return True
+
+
+class SourceHealth:
+    """单个数据源最近请求的延迟和成败记录"""
+
+    def __init__(self, window=200):
+        """
+        Args:
+            window: 保留的最近请求数
+        """
+        self._records = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.wins = 0
+
+    def record(self, latency, ok):
+        """记录一次请求（latency 为秒）"""
+        with self._lock:
+            self._records.append((latency, ok))
+            self.calls += 1
+
+    def _latencies(self):
+        with self._lock:
+            return np.array([latency for latency, ok in self._records if ok], dtype=float)
+
+    def quantile(self, q):
+        """成功请求的延迟分位数（秒），没有样本时为 None"""
+        latencies = self._latencies()
+        return float(np.quantile(latencies, q)) if len(latencies) else None
+
+    @property
+    def samples(self):
+        return len(self._records)
+
+    @property
+    def error_rate(self):
+        with self._lock:
+            if not self._records:
+                return 0.0
+            return sum(not ok for _, ok in self._records) / len(self._records)
+
+
+class HedgedDataSource:
+    """带对冲请求和自动故障切换的组合数据源"""
+
+    def __init__(self, sources, delay=None, timeout=None, window=None, max_error_rate=None,
+                 min_samples=20, workers=None):
+        """
+        初始化组合数据源
+
+        Args:
+            sources: 数据源列表 [(名称, 数据源), ...]，顺序为没有统计数据时的优先顺序
+            delay: 对冲延迟上限（秒），默认读取 data_sources.hedge.delay_ms
+            timeout: 单次请求等待上限（秒）
+            window: 统计延迟和错误率的最近请求数
+            max_error_rate: 错误率超过该值的数据源排到最后
+            min_samples: 主源样本数达到该值后，对冲延迟取其 p95（不超过 delay）
+            workers: 请求线程数，默认读取 data_sources.hedge.workers；未配置时为
+                     data_sources.hedge.max_concurrency（并发调用数）× 数据源数，每个调用每个数据源最多占用一个线程
+        """
+        if not sources:
+            raise ValueError("至少需要一个数据源")
+        self.sources = list(sources)
+        self.delay = delay if delay is not None else get_config(
+            'data_sources', 'hedge', 'delay_ms', default=800) / 1000
+        self.timeout = timeout if timeout is not None else get_config(
+            'data_sources', 'hedge', 'timeout', default=30)
+        window = window or get_config('data_sources', 'hedge', 'window', default=200)
+        self.max_error_rate = max_error_rate if max_error_rate is not None else get_config(
+            'data_sources', 'hedge', 'max_error_rate', default=0.5)
+        self.min_samples = min_samples
+        self.health = {name: SourceHealth(window) for name, _ in self.sources}
+        self.hedges = 0
+        if workers is None:
+            workers = get_config('data_sources', 'hedge', 'workers', default=None) or \
+                get_config('data_sources', 'hedge', 'max_concurrency', default=8) * len(self.sources)
+        # 落后的请求在后台线程中继续完成并计入统计，不阻塞调用方；尚未开始的落后请求直接取消
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hedged-source')
+
+    # ------------------------------------------------------------------
+    # 路由
+    # ------------------------------------------------------------------
+
+    def ranked(self, method=None, accepts=None):
+        """
+        按健康程度排序的数据源：错误率超限的排最后，其余按 p50 延迟升序，没有样本的保持原顺序
+
+        Args:
+            method: 只返回实现了该方法的数据源
+            accepts: 只返回 accepts(数据源) 为真的数据源，如能提供所请求复权方式的数据源
+
+        Returns:
+            list: [(名称, 数据源), ...]
+        """
+        candidates = []
+        for order, (name, source) in enumerate(self.sources):
+            if method is not None and not hasattr(source, method):
+                continue
+            if hasattr(source, 'is_available') and not source.is_available():
+                continue
+            if accepts is not None and not accepts(source):
+                continue
+            health = self.health[name]
+            p50 = health.quantile(0.5)
+            candidates.append(((health.error_rate > self.max_error_rate,
+                                p50 if p50 is not None else float('inf'), order), name, source))
+        return [(name, source) for _, name, source in sorted(candidates, key=lambda c: c[0])]
+
+    def hedge_delay(self, name):
+        """对冲延迟：主源样本足够时取其 p95，不超过配置的上限"""
+        health = self.health[name]
+        if health.samples >= self.min_samples:
+            p95 = health.quantile(0.95)
+            if p95 is not None:
+                return min(p95, self.delay)
+        return self.delay
+
+    def _submit(self, name, source, method, args, kwargs):
+        health = self.health[name]
+        started = time.perf_counter()
+        future = self._executor.submit(getattr(source, method), *args, **kwargs)
+
+        def on_done(f):
+            if f.cancelled():
+                return
+            ok = f.exception() is None and _is_valid(f.result())
+            health.record(time.perf_counter() - started, ok)
+
+        future.add_done_callback(on_done)
+        return future
+
+    @staticmethod
+    def _cancel(pending):
+        """取消还在排队的落后请求，不占用线程池（已开始的请求无法中断，完成后计入统计）"""
+        for future in pending:
+            future.cancel()
+
+    def call(self, method, *args, **kwargs):
+        """
+        调用数据源方法：主源超过对冲延迟未返回时向下一个数据源发请求，取先返回的有效结果
+
+        Args:
+            method: 方法名，如 'get_history_data'
+            *args, **kwargs: 方法参数
+
+        Returns:
+            tuple: (数据源返回值, 返回结果的数据源名称)；全部失败时为 (空 DataFrame, None)
+                   （有异常时抛出最后一个异常）
+        """
+        return self._call(method, args, kwargs)
+
+    def _call(self, method, args, kwargs, accepts=None):
+        # 返回结果的数据源随结果一起返回：共享实例被多个会话并发调用，不能记在实例上
+        ranked = self.ranked(method, accepts)
+        if not ranked:
+            raise ValueError(f"没有可用的数据源实现 {method}")
+
+        pending = {}
+        queue = list(ranked)
+        deadline = time.monotonic() + self.timeout
+        last_error = None
+
+        name, source = queue.pop(0)
+        pending[self._submit(name, source, method, args, kwargs)] = name
+        wait_for = self.hedge_delay(name)
+
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = wait(pending, timeout=min(wait_for, remaining) if queue else remaining,
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                if future.exception() is not None:
+                    last_error = future.exception()
+                elif _is_valid(future.result()):
+                    self.health[name].wins += 1
+                    self._cancel(pending)
+                    return future.result(), name
+            # 主源超时未返回，或已返回失败：立即向下一个数据源发请求
+            if queue and (not done or not pending):
+                name, source = queue.pop(0)
+                if pending:
+                    self.hedges += 1
+                pending[self._submit(name, source, method, args, kwargs)] = name
+                wait_for = self.hedge_delay(name)
+
+        self._cancel(pending)
+        if last_error is not None:
+            raise last_error
+        return pd.DataFrame(), None
+
+    # ------------------------------------------------------------------
+    # 数据接口
+    # ------------------------------------------------------------------
+
+    def is_available(self):
+        """是否至少有一个可用的数据源"""
+        return bool(self.ranked())
+
+    def get_history_with_source(self, code, start_date, end_date, adjust='qfq'):
+        """
+        获取历史日K线及返回数据的数据源（参数同 AKShareData.get_history_data）
+
+        只向能提供该复权方式的数据源请求，避免不同复权口径的数据混用
+
+        Returns:
+            tuple: (DataFrame, 数据源名称)，失败时为 (空 DataFrame, None)
+        """
+        def accepts(source):
+            return not hasattr(source, 'supports_adjust') or source.supports_adjust(adjust)
+
+        try:
+            return self._call('get_history_data', (code, start_date, end_date, adjust), {}, accepts)
+        except Exception as e:
+            print(f"获取历史数据失败: {e}")
+            return pd.DataFrame(), None
+
+    def get_history_data(self, code, start_date, end_date, adjust='qfq'):
+        """获取历史日K线（参数同 AKShareData.get_history_data）"""
+        return self.get_history_with_source(code, start_date, end_date, adjust)[0]
+
+    def get_stock_list(self):
+        """获取股票列表"""
+        try:
+            return self.call('get_stock_list')[0]
+        except Exception as e:
+            print(f"获取股票列表失败: {e}")
+            return pd.DataFrame()
+
+    def stats(self):
+        """
+        各数据源的健康统计
+
+        Returns:
+            DataFrame: 每个数据源一行，calls, wins, error_rate, p50_ms, p99_ms
+        """
+        rows = []
+        for name, _ in self.sources:
+            health = self.health[name]
+            p50, p99 = health.quantile(0.5), health.quantile(0.99)
+            rows.append({
+                'source': name,
+                'calls': health.calls,
+                'wins': health.wins,
+                'error_rate': round(health.error_rate, 4),
+                'p50_ms': round(p50 * 1000, 1) if p50 is not None else None,
+                'p99_ms': round(p99 * 1000, 1) if p99 is not None else None,
+            })
+        return pd.DataFrame(rows).set_index('source')
+
+
+_default_source = None
+
+
+def get_hedged_source():
+    """
+    获取共享的组合数据源（AKShare + 已配置token的TuShare，顺序读取 data_sources.hedge.order）
+
+    Returns:
+        HedgedDataSource
+    """
+    global _default_source
+    if _default_source is None:
+        from .akshare_data import AKShareData
+        from .tushare_data import TuShareData
+
+        available = {'akshare': AKShareData, 'tushare': TuShareData}
+        order = get_config('data_sources', 'hedge', 'order', default=['akshare', 'tushare'])
+        sources = [(name, available[name]()) for name in order
+                   if name in available and get_config('data_sources', name, 'enabled', default=True)]
+        _default_source = HedgedDataSource(sources)
+    return _default_source
+
+
+if __name__ == "__main__":
+    # 测试代码：主源偶尔很慢或报错，备用源稳定
+    import random
+
+    class StubSource:
+        def __init__(self, name, slow_rate, error_rate, base):
+            self.name, self.slow_rate, self.error_rate, self.base = name, slow_rate, error_rate, base
+
+        def get_history_data(self, code, start_date, end_date, adjust='qfq'):
+            time.sleep(self.base * (20 if random.random() < self.slow_rate else 1))
+            if random.random() < self.error_rate:
+                raise ConnectionError(f"{self.name} 请求失败")
+            return pd.DataFrame({'date': [start_date], 'close': [10.0], 'source': [self.name]})
+
+    random.seed(0)
+    hedged = HedgedDataSource([('akshare', StubSource('akshare', 0.2, 0.1, 0.01)),
+                               ('tushare', StubSource('tushare', 0.0, 0.0, 0.03))],
+                              delay=0.05, timeout=2)
+    started = time.perf_counter()
+    winners = [hedged.get_history_data('000001', '20240101', '20240131')['source'].iloc[0] for _ in range(100)]
+    print(f"100次请求耗时 {time.perf_counter() - started:.2f}s，对冲 {hedged.hedges} 次")
+    print(pd.Series(winners).value_counts())
+    print(hedged.stats())
+    print(f"当前优先顺序: {[name for name, _ in hedged.ranked()]}")
@@ -0,0 +1,402 @@
+"""
+本地历史行情存储模块
+按 股票代码/年份 分区保存日K线（Parquet 或 Arrow IPC），
+区间读取直接走磁盘，只有本地缺失的日期才调用数据源
+
+目录结构:
+    root/
+    └── adjust=<qfq|hfq|none>/
+        └── symbol=<code>/
+            ├── _meta.json          # 已覆盖的日期区间列表
+            ├── year=2023.parquet
+            └── year=2024.parquet
+"""
+
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from ..utils.config import get_config, resolve_path
+from ..utils.trading_calendar import get_trading_calendar
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+def to_timestamp(value):
+    """将 '20240101' / '2024-01-01' / datetime 统一转为 Timestamp（日精度）"""
+    return pd.Timestamp(value).normalize()
+
+
+def _has_trading_days(start, end):
+    """区间内是否存在交易日（只含周末、节假日的空档无需请求；早于交易日历的区间按需要请求处理）"""
+    if start > end:
+        return False
+    calendar = get_trading_calendar()
+    return not calendar.covers(start) or calendar.count(start, end) > 0
+
+
+def merge_intervals(intervals):
+    """
+    合并日期区间，相邻或仅隔休市日的区间视为连续
+
+    Args:
+        intervals: [(开始日期, 结束日期), ...]
+
+    Returns:
+        list: 按开始日期排序、互不重叠的区间
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and not _has_trading_days(merged[-1][1] + timedelta(days=1), start - timedelta(days=1)):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def missing_intervals(intervals, start, end):
+    """
+    计算请求区间中未被覆盖、且包含交易日的部分（按交易日历）
+
+    Args:
+        intervals: 已覆盖区间（已合并）
+        start: 请求开始日期
+        end: 请求结束日期
+
+    Returns:
+        list: [(开始日期, 结束日期), ...]
+    """
+    missing = []
+    cursor = start
+    for cov_start, cov_end in intervals:
+        if cov_end < cursor:
+            continue
+        if cov_start > end:
+            break
+        if cov_start > cursor:
+            missing.append((cursor, cov_start - timedelta(days=1)))
+        cursor = max(cursor, cov_end + timedelta(days=1))
+    if cursor <= end:
+        missing.append((cursor, end))
+    return [(s, e) for s, e in missing if _has_trading_days(s, e)]
+
+
+class HistoryStore:
+    """本地日K线存储"""
+
+    FORMATS = {'parquet': 'parquet', 'ipc': 'arrow'}
+    META_FILE = '_meta.json'
+
+    def __init__(self, root, file_format='parquet', reconcile_days=3):
+        """
+        初始化历史行情存储
+
+        Args:
+            root: 存储根目录
+            file_format: 'parquet' 或 'ipc'
+            reconcile_days: 向后补数时重新获取覆盖区间末尾的交易日数，用于修正数据源的事后更正
+        """
+        if pa is None:
+            raise ImportError("本地行情存储需要安装pyarrow: pip install pyarrow")
+        if file_format not in self.FORMATS:
+            raise ValueError(f"不支持的文件格式: {file_format}")
+
+        self.root = root
+        self.file_format = file_format
+        self.extension = self.FORMATS[file_format]
+        self.reconcile_days = reconcile_days
+        os.makedirs(root, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # 路径与元数据
+    # ------------------------------------------------------------------
+
+    def _symbol_dir(self, code, adjust):
+        return os.path.join(self.root, f"adjust={adjust or 'none'}", f"symbol={code}")
+
+    def _year_path(self, code, adjust, year):
+        return os.path.join(self._symbol_dir(code, adjust), f"year={year}.{self.extension}")
+
+    def _atomic_write(self, path, write_func):
+        """先写临时文件再重命名，避免读到半个文件"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        write_func(tmp_path)
+        os.replace(tmp_path, path)
+
+    def load_meta(self, code, adjust='qfq'):
+        """读取股票的元数据"""
+        path = os.path.join(self._symbol_dir(code, adjust), self.META_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_meta(self, code, meta, adjust='qfq'):
+        """保存股票的元数据"""
+        path = os.path.join(self._symbol_dir(code, adjust), self.META_FILE)
+
+        def _write(tmp_path):
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+
+        self._atomic_write(path, _write)
+
+    def intervals(self, code, adjust='qfq'):
+        """
+        获取本地已覆盖的日期区间列表
+
+        Returns:
+            list: [(开始日期, 结束日期), ...]，按日期排序
+        """
+        meta = self.load_meta(code, adjust)
+        if 'intervals' in meta:
+            pairs = meta['intervals']
+        elif meta.get('start'):
+            # 旧版元数据只记录一个连续区间
+            pairs = [(meta['start'], meta['end'])]
+        else:
+            pairs = []
+        return merge_intervals([(to_timestamp(s), to_timestamp(e)) for s, e in pairs])
+
+    def save_intervals(self, code, intervals, adjust='qfq'):
+        """保存已覆盖的日期区间列表"""
+        self.save_meta(code, {
+            'intervals': [(s.strftime('%Y-%m-%d'), e.strftime('%Y-%m-%d'))
+                          for s, e in merge_intervals(intervals)],
+            'updated_at': datetime.now().isoformat(timespec='seconds')
+        }, adjust)
+
+    def coverage(self, code, adjust='qfq'):
+        """
+        获取本地已覆盖的日期范围
+
+        Returns:
+            tuple: (最早日期, 最晚日期)，无数据时为 (None, None)；中间可能存在空档，见 intervals
+        """
+        intervals = self.intervals(code, adjust)
+        if not intervals:
+            return None, None
+        return intervals[0][0], intervals[-1][1]
+
+    def symbols(self, adjust='qfq'):
+        """列出已存储的股票代码"""
+        base = os.path.join(self.root, f"adjust={adjust or 'none'}")
+        if not os.path.isdir(base):
+            return []
+        return sorted(d.split('=', 1)[1] for d in os.listdir(base) if d.startswith('symbol='))
+
+    # ------------------------------------------------------------------
+    # 读写
+    # ------------------------------------------------------------------
+
+    def _read_file(self, path):
+        if self.file_format == 'parquet':
+            return pq.read_table(path).to_pandas()
+        return feather.read_table(path, memory_map=True).to_pandas()
+
+    def _write_file(self, df, path):
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self.file_format == 'parquet':
+            self._atomic_write(path, lambda p: pq.write_table(table, p))
+        else:
+            self._atomic_write(path, lambda p: feather.write_feather(table, p))
+
+    def read(self, code, start=None, end=None, adjust='qfq'):
+        """
+        读取本地日K线
+
+        Args:
+            code: 股票代码
+            start: 开始日期
+            end: 结束日期
+            adjust: 复权方式
+
+        Returns:
+            DataFrame: 按日期升序，date 列为 datetime64
+        """
+        symbol_dir = self._symbol_dir(code, adjust)
+        if not os.path.isdir(symbol_dir):
+            return pd.DataFrame()
+
+        start = to_timestamp(start) if start is not None else None
+        end = to_timestamp(end) if end is not None else None
+
+        frames = []
+        for name in sorted(os.listdir(symbol_dir)):
+            if not (name.startswith('year=') and name.endswith(self.extension)):
+                continue
+            year = int(name[5:9])
+            if (start is not None and year < start.year) or (end is not None and year > end.year):
+                continue
+            frames.append(self._read_file(os.path.join(symbol_dir, name)))
+
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames, ignore_index=True)
+        mask = pd.Series(True, index=df.index)
+        if start is not None:
+            mask &= df['date'] >= start
+        if end is not None:
+            mask &= df['date'] <= end
+        return df[mask].reset_index(drop=True)
+
+    def write(self, code, df, adjust='qfq'):
+        """
+        合并写入日K线（同一日期以新数据为准）
+
+        Args:
+            code: 股票代码
+            df: 需包含 date 列
+            adjust: 复权方式
+        """
+        if df is None or df.empty:
+            return
+        df = df.copy()
+        df['date'] = pd.to_datetime(df['date'])
+
+        for year, part in df.groupby(df['date'].dt.year):
+            path = self._year_path(code, adjust, year)
+            if os.path.exists(path):
+                part = pd.concat([self._read_file(path), part], ignore_index=True)
+            part = (part.drop_duplicates('date', keep='last')
+                        .sort_values('date')
+                        .reset_index(drop=True))
+            self._write_file(part, path)
+
+    def _reconcile_start(self, code, gap_start, intervals, adjust):
+        """
+        紧接已覆盖区间之后的补数，从覆盖区间末尾的 reconcile_days 个交易日开始请求
+
+        Returns:
+            Timestamp: 实际请求的开始日期
+        """
+        if self.reconcile_days <= 0:
+            return gap_start
+        prev = [e for _, e in intervals if e < gap_start]
+        if not prev or _has_trading_days(prev[-1] + timedelta(days=1), gap_start - timedelta(days=1)):
+            return gap_start
+        calendar = get_trading_calendar()
+        if not calendar.covers(prev[-1]):
+            return gap_start
+        return min(gap_start, calendar.date_of(max(calendar.index_of(prev[-1]) - (self.reconcile_days - 1), 0)))
+
+    def plan_fetch(self, code, start, end, adjust='qfq'):
+        """
+        计算补齐区间需要向数据源发起的请求
+
+        Args:
+            code: 股票代码
+            start: 开始日期
+            end: 结束日期
+            adjust: 复权方式
+
+        Returns:
+            list: [(请求开始日期, 空档开始日期, 空档结束日期), ...]，
+                  请求结束日期即空档结束日期
+        """
+        intervals = self.intervals(code, adjust)
+        return [(self._reconcile_start(code, gap_start, intervals, adjust), gap_start, gap_end)
+                for gap_start, gap_end in missing_intervals(intervals, to_timestamp(start), to_timestamp(end))]
+
+    def record_fetch(self, code, gap_start, gap_end, data, adjust='qfq'):
+        """
+        写入一次补数请求的结果，并把空档记为已覆盖（当日及以后不计入）
+
+        数据源返回空结果时，只有确认该区间本来就没有K线（上市前、退市后或停牌期间）才记为已覆盖，
+        否则视为请求失败，下次读取时重新请求
+
+        Args:
+            code: 股票代码
+            gap_start: 空档开始日期
+            gap_end: 空档结束日期
+            data: 数据源返回的日K线
+            adjust: 复权方式
+        """
+        if data is None or data.empty:
+            if not self._known_empty(code, gap_start, gap_end, adjust):
+                return
+        else:
+            self.write(code, data, adjust)
+        covered_end = min(to_timestamp(gap_end), to_timestamp(datetime.now()) - timedelta(days=1))
+        if covered_end >= to_timestamp(gap_start):
+            self.save_intervals(code, self.intervals(code, adjust) + [(to_timestamp(gap_start), covered_end)],
+                                adjust)
+
+    def _known_empty(self, code, gap_start, gap_end, adjust='qfq'):
+        """区间内确实没有该股票的K线：在上市前或退市后，或前后都有已存储的K线（停牌）"""
+        gap_start, gap_end = to_timestamp(gap_start), to_timestamp(gap_end)
+        try:
+            from .universe_store import get_universe_store
+
+            universe = get_universe_store()
+            if universe is not None and len(universe):
+                info = universe.load(listed_only=False)
+                info = info[info['code'] == code]
+                if not info.empty:
+                    list_date, delist_date = info['list_date'].iloc[0], info['delist_date'].iloc[0]
+                    if (pd.notna(list_date) and gap_end < list_date) or \
+                            (pd.notna(delist_date) and gap_start >= delist_date):
+                        return True
+        except Exception as e:
+            print(f"读取股票池失败: {e}")
+        return not self.read(code, None, gap_start - timedelta(days=1), adjust).empty and \
+            not self.read(code, gap_end + timedelta(days=1), None, adjust).empty
+
+    def get_history(self, code, start, end, fetch, adjust='qfq'):
+        """
+        读取区间数据，本地缺失部分通过 fetch 补齐
+
+        按股票维护多个已覆盖区间，只向数据源请求未覆盖且包含交易日的空档；
+        紧接在已覆盖区间之后的空档会连同最近 reconcile_days 个交易日一起请求，
+        以新数据覆盖数据源的事后更正。当日数据可能尚未收盘，不计入覆盖区间。
+
+        Args:
+            code: 股票代码
+            start: 开始日期
+            end: 结束日期
+            fetch: 数据源函数 fetch(code, start, end) -> DataFrame，日期参数为 'YYYYMMDD'
+            adjust: 复权方式
+
+        Returns:
+            DataFrame: 区间内的日K线
+        """
+        for fetch_start, gap_start, gap_end in self.plan_fetch(code, start, end, adjust):
+            data = fetch(code, fetch_start.strftime('%Y%m%d'), gap_end.strftime('%Y%m%d'))
+            self.record_fetch(code, gap_start, gap_end, data, adjust)
+
+        return self.read(code, start, end, adjust)
+
+
+_default_stores = {}
+
+
+def get_history_store(root=None, file_format=None):
+    """
+    获取共享的历史行情存储（同一目录在进程内只创建一次）
+
+    Args:
+        root: 存储目录，默认读取 config.yaml 中 storage.history_dir
+        file_format: 文件格式，默认读取 storage.format
+
+    Returns:
+        HistoryStore: 未启用存储时返回 None
+    """
+    if not get_config('storage', 'enabled', default=True):
+        return None
+    root = resolve_path(root or get_config('storage', 'history_dir', default='data/history'))
+    file_format = file_format or get_config('storage', 'format', default='parquet')
+    key = (root, file_format)
+    if key not in _default_stores:
+        _default_stores[key] = HistoryStore(
+            root, file_format, reconcile_days=get_config('storage', 'reconcile_days', default=3)
+        )
+    return _default_stores[key]
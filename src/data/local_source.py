@@ -0,0 +1,67 @@
+"""
+本地文件数据源
+从本地CSV/Parquet文件读取日K线，接口与 AKShareData 的历史数据部分一致，
+用于离线运行和测试本地行情存储
+"""
+
+import os
+
+import pandas as pd
+
+
+class LocalFileSource:
+    """本地文件数据源"""
+
+    def __init__(self, root):
+        """
+        初始化本地文件数据源
+
+        Args:
+            root: 数据目录，每只股票一个文件：<code>.csv 或 <code>.parquet，
+                  需包含 date, open, close, high, low, volume 列
+        """
+        self.root = root
+        self.request_count = 0
+
+    def _load(self, code):
+        for ext, reader in (('.parquet', pd.read_parquet), ('.csv', pd.read_csv)):
+            path = os.path.join(self.root, f"{code}{ext}")
+            if os.path.exists(path):
+                if ext == '.csv':
+                    df = reader(path, dtype={'code': str})
+                else:
+                    df = reader(path)
+                df['date'] = pd.to_datetime(df['date'].astype(str))
+                return df.sort_values('date').reset_index(drop=True)
+        return pd.DataFrame()
+
+    def get_history_data(self, code, start_date, end_date, adjust='qfq'):
+        """
+        获取历史日K线
+
+        Args:
+            code: 股票代码
+            start_date: 开始日期 'YYYYMMDD'
+            end_date: 结束日期 'YYYYMMDD'
+            adjust: 复权方式（本地文件不区分）
+
+        Returns:
+            DataFrame: 区间内的日K线
+        """
+        self.request_count += 1
+        df = self._load(code)
+        if df.empty:
+            return df
+        mask = (df['date'] >= pd.Timestamp(start_date)) & (df['date'] <= pd.Timestamp(end_date))
+        return df[mask].reset_index(drop=True)
+
+    def save_history_data(self, code, df):
+        """
+        保存日K线到本地文件（CSV）
+
+        Args:
+            code: 股票代码
+            df: 日K线数据
+        """
+        os.makedirs(self.root, exist_ok=True)
+        df.to_csv(os.path.join(self.root, f"{code}.csv"), index=False)
@@ -0,0 +1,403 @@
+"""
+热门股票预取模块
+按页面访问次数（指数衰减）学习热门股票，后台线程按交易时段调整节奏，
+在缓存过期前预先加载热门股票的历史K线、技术指标和实时行情，
+用户第一次打开热门股票时直接命中缓存；预取请求与批量任务共用数据源令牌桶，
+令牌不足时让出，不挤占前台请求
+"""
+
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from ..utils.config import get_config, resolve_path
+from ..utils.trading_calendar import get_trading_calendar
+from .batch_fetcher import get_rate_limiter
+from .cache import get_cache
+
+
+# 各交易时段的调度间隔（秒），可在 config.yaml 的 prefetch.intervals 中覆盖
+DEFAULT_INTERVALS = {
+    'pre_open': 60,
+    'call_auction': 5,
+    'continuous': 5,
+    'lunch': 60,
+    'post_close': 300,
+    'closed': 900,
+}
+
+# 需要预取实时行情的交易时段
+QUOTE_PHASES = ('call_auction', 'continuous')
+
+# 与页面默认参数一致的预取窗口：交易决策回看120个交易日，个股分析回看365天
+DEFAULT_WINDOWS = [
+    {'sessions': 120, 'indicators': ['MA', 'MACD', 'RSI']},
+    {'days': 365, 'indicators': ['MA', 'MACD']},
+]
+
+DEFAULT_SEEDS = ['000001', '600519', '000002', '600000']
+
+
+def lookback_window(sessions=None, days=None, now=None):
+    """
+    页面使用的历史K线区间
+
+    Args:
+        sessions: 回看交易日数（截至最近一个交易日）
+        days: 回看自然日数
+        now: 当前时间，默认现在
+
+    Returns:
+        tuple: (start_date, end_date)，'YYYYMMDD'
+    """
+    now = now or datetime.now()
+    if sessions:
+        calendar = get_trading_calendar()
+        start = calendar.shift(calendar.previous_trading_day(now), -(sessions - 1))
+    else:
+        start = now - timedelta(days=days)
+    return start.strftime('%Y%m%d'), now.strftime('%Y%m%d')
+
+
+def indicator_key(code, start_date, end_date, indicators, hist_data, adjust='qfq'):
+    """
+    技术指标的缓存键（指标按固定顺序排列）
+
+    键中包含K线数据的指纹（行数、首尾日期和收盘价）：同一区间的K线来自不同数据源或已更新时，
+    不会命中按其他K线计算的指标
+    """
+    from ..analysis.technical import INDICATOR_STEPS
+
+    first, last = hist_data.iloc[0], hist_data.iloc[-1]
+    fingerprint = (len(hist_data), str(first.get('date')), str(last.get('date')),
+                   float(first['close']), float(last['close']))
+    return (code, str(start_date), str(end_date), adjust,
+            tuple(name for name in INDICATOR_STEPS if name in indicators), fingerprint)
+
+
+def cached_indicators(code, start_date, end_date, hist_data, indicators, adjust='qfq', cache=None, refresh=False):
+    """
+    计算技术指标并缓存（同一股票、区间、指标组合和K线数据只计算一次）
+
+    缓存只保存指标列，返回时拼接到传入的K线上
+
+    Args:
+        code: 股票代码
+        start_date: 开始日期 'YYYYMMDD'
+        end_date: 结束日期 'YYYYMMDD'
+        hist_data: 该区间的历史K线
+        indicators: 指标名称列表，见 analysis.technical.INDICATOR_STEPS
+        adjust: 复权方式
+        cache: DataCache，默认共享缓存
+        refresh: 重新计算并覆盖缓存（预取用）
+
+    Returns:
+        DataFrame: 包含技术指标的数据
+    """
+    from ..analysis.technical import calculate_indicators
+
+    if hist_data is None or hist_data.empty:
+        return hist_data
+    key = indicator_key(code, start_date, end_date, indicators, hist_data, adjust)
+    names = key[4]
+    if not names:
+        return hist_data
+    cache = cache if cache is not None else get_cache()
+    if cache is None:
+        return calculate_indicators(hist_data, names)
+
+    def _load():
+        df = calculate_indicators(hist_data, names)
+        return df[[col for col in df.columns if col not in hist_data.columns]]
+
+    if refresh:
+        columns = _load()
+        cache.set('indicators', key, columns)
+    else:
+        columns = cache.get_or_load('indicators', key, _load)
+    return hist_data.assign(**{col: columns[col].to_numpy() for col in columns.columns})
+
+
+class AccessTracker:
+    """按时间衰减的股票访问计数"""
+
+    def __init__(self, half_life_hours=72, path=None):
+        """
+        初始化访问计数
+
+        Args:
+            half_life_hours: 计数衰减一半的小时数，近期访问权重更高
+            path: JSON文件路径（读取并定期写回），为 None 时只在内存中
+        """
+        self.decay = math.log(2) / (half_life_hours * 3600)
+        self.path = path
+        self._scores = {}  # code -> (score, updated_at)
+        self._lock = threading.Lock()
+        self._dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._scores = {code: tuple(value) for code, value in json.load(f).items()}
+            except (OSError, ValueError) as e:
+                print(f"读取访问计数失败: {e}")
+
+    def _decayed(self, score, updated_at, now):
+        return score * math.exp(-self.decay * (now - updated_at))
+
+    def record(self, code, weight=1.0, now=None):
+        """记录一次访问"""
+        now = now or time.time()
+        with self._lock:
+            score, updated_at = self._scores.get(code, (0.0, now))
+            self._scores[code] = (self._decayed(score, updated_at, now) + weight, now)
+            self._dirty = True
+
+    def hot(self, n, now=None):
+        """
+        访问最多的股票
+
+        Returns:
+            list: 代码，按衰减后的访问计数降序
+        """
+        now = now or time.time()
+        with self._lock:
+            scores = {code: self._decayed(score, updated_at, now)
+                      for code, (score, updated_at) in self._scores.items()}
+        return sorted(scores, key=lambda code: -scores[code])[:n]
+
+    def save(self, min_score=0.01):
+        """写回JSON文件（丢弃已衰减到可忽略的股票）"""
+        if not self.path or not self._dirty:
+            return
+        now = time.time()
+        with self._lock:
+            scores = {code: (score, updated_at) for code, (score, updated_at) in self._scores.items()
+                      if self._decayed(score, updated_at, now) >= min_score}
+            self._scores = scores
+            self._dirty = False
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(scores, f)
+        os.replace(tmp_path, self.path)
+
+
+class PrefetchScheduler:
+    """热门股票后台预取"""
+
+    def __init__(self, source=None, tracker=None, hot_size=None, seeds=None, windows=None,
+                 intervals=None, limiter=None, max_tasks=None):
+        """
+        初始化预取调度
+
+        Args:
+            source: 数据源，默认 AKShareData（需启用缓存，实现支持 refresh 参数的 get_history_data、
+                    get_realtime_quotes，以及 cache_remaining）
+            tracker: AccessTracker，默认按 config.yaml 的 prefetch 配置创建
+            hot_size: 预取的热门股票数
+            seeds: 访问记录不足时补充的股票
+            windows: 预取的历史区间及指标 [{'sessions': N 或 'days': N, 'indicators': [...]}, ...]
+            intervals: {交易时段: 调度间隔秒数}
+            limiter: 令牌桶，默认与 AKShare 批量任务共用
+            max_tasks: 每轮最多发起的数据源请求数
+        """
+        if source is None:
+            from .akshare_data import AKShareData
+            source = AKShareData()
+        self.source = source
+        self.tracker = tracker if tracker is not None else AccessTracker(
+            get_config('prefetch', 'half_life_hours', default=72),
+            resolve_path(get_config('prefetch', 'state_file', default='data/hot_symbols.json')))
+        self.hot_size = hot_size or get_config('prefetch', 'hot_size', default=30)
+        self.seeds = list(seeds if seeds is not None else get_config('prefetch', 'seeds', default=DEFAULT_SEEDS))
+        self.windows = windows or get_config('prefetch', 'windows', default=DEFAULT_WINDOWS)
+        self.intervals = {**DEFAULT_INTERVALS, **(intervals or get_config('prefetch', 'intervals', default={}))}
+        self.limiter = limiter if limiter is not None else get_rate_limiter('akshare')
+        self.max_tasks = max_tasks or get_config('prefetch', 'max_tasks', default=20)
+
+        self.retry_after = get_config('prefetch', 'retry_after', default=600)
+        self._failed = {}  # 缓存键 -> 上次加载失败的时间
+
+        self.stats = {'runs': 0, 'history': 0, 'indicators': 0, 'quotes': 0, 'throttled': 0, 'errors': 0}
+        self.last_run = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------------
+    # 热门股票
+    # ------------------------------------------------------------------
+
+    def record(self, code):
+        """记录页面访问"""
+        self.tracker.record(code)
+
+    def hot_codes(self, n=None):
+        """热门股票：访问计数最高的股票，不足时用种子股票补齐"""
+        n = n or self.hot_size
+        codes = self.tracker.hot(n)
+        codes += [code for code in self.seeds if code not in codes]
+        return codes[:n]
+
+    # ------------------------------------------------------------------
+    # 调度
+    # ------------------------------------------------------------------
+
+    def interval(self, now=None):
+        """当前交易时段的调度间隔（秒）"""
+        return self.intervals[get_trading_calendar().market_phase(now)]
+
+    def _acquire(self):
+        if self.limiter.try_acquire():
+            return True
+        self.stats['throttled'] += 1
+        return False
+
+    def run_once(self, now=None):
+        """
+        执行一轮预取：缓存剩余有效时间不足一个调度间隔的条目重新加载
+
+        先加载再覆盖缓存条目，加载失败时原条目继续有效，前台请求不会因预取而未命中
+
+        Args:
+            now: 当前时间，默认现在
+
+        Returns:
+            int: 本轮发起的数据源请求数
+        """
+        now = now or datetime.now()
+        phase = get_trading_calendar().market_phase(now)
+        lead = self.intervals[phase] * 2
+        budget = self.max_tasks
+        self.stats['runs'] += 1
+        codes = self.hot_codes()
+
+        # 实时行情：一次全市场请求覆盖所有热门股票
+        if phase in QUOTE_PHASES and self.source.cache_remaining('realtime_quote', 'spot') < lead:
+            if self._acquire():
+                budget -= 1
+                self._load(lambda: self.source.get_realtime_quotes(codes, refresh=True), 'quotes')
+
+        # 历史K线和技术指标：按热门程度依次加载，令牌或本轮配额用完即停，下一轮继续
+        for code in codes:
+            for window in self.windows:
+                if budget <= 0:
+                    break
+                start, end = lookback_window(window.get('sessions'), window.get('days'), now)
+                key = (code, start, end, 'qfq')
+                if self.source.cache_remaining('history', key) >= lead:
+                    continue
+                if time.time() - self._failed.get(key, 0) < self.retry_after:
+                    continue
+                if not self._acquire():
+                    budget = 0
+                    break
+                budget -= 1
+                hist_data = self._load(lambda: self.source.get_history_data(code, start, end, refresh=True),
+                                       'history')
+                if hist_data is None or hist_data.empty:
+                    # 停牌、代码无效或数据源故障：一段时间内不再重试
+                    self._failed[key] = time.time()
+                    continue
+                self._failed.pop(key, None)
+                if window.get('indicators'):
+                    # 指标随历史K线一起刷新，不占用数据源请求
+                    self._load(lambda: cached_indicators(code, start, end, hist_data, window['indicators'],
+                                                         cache=self.source.cache, refresh=True), 'indicators')
+
+        self.tracker.save()
+        self.last_run = now
+        return self.max_tasks - budget
+
+    def _load(self, loader, kind):
+        try:
+            result = loader()
+            self.stats[kind] += 1
+            return result
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"预取失败: {e}")
+            return None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"预取调度出错: {e}")
+            self._stop.wait(self.interval())
+
+    def start(self):
+        """启动后台线程（已启动时不重复启动）"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='prefetch', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """停止后台线程并保存访问计数"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.tracker.save()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_prefetcher(start=True):
+    """
+    获取进程内共享的预取调度（按 config.yaml 的 prefetch 配置创建）
+
+    Args:
+        start: 是否确保后台线程已启动
+
+    Returns:
+        PrefetchScheduler: prefetch.enabled 为 false 或未启用缓存时返回 None
+    """
+    global _default_scheduler
+    if not get_config('prefetch', 'enabled', default=True) or get_cache() is None:
+        return None
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = PrefetchScheduler()
+        if start:
+            _default_scheduler.start()
+    return _default_scheduler
+
+
+if __name__ == "__main__":
+    # 测试代码：用合成数据源演示一轮预取后页面请求直接命中缓存
+    import pandas as pd
+
+    from .cache import DataCache
+    from .akshare_data import AKShareData
+    from .batch_fetcher import TokenBucket
+    from .replay_data import generate_synthetic_data
+
+    cache = DataCache()
+    import tempfile
+
+    replay = generate_synthetic_data(tempfile.mkdtemp(), ['600519', '300750', '000858', '000001'], '20230101', '20240628')
+    source = AKShareData(source=replay, use_store=False, cache=cache)
+    scheduler = PrefetchScheduler(source, tracker=AccessTracker(), limiter=TokenBucket(50, 50))
+    for code in ['600519'] * 5 + ['300750'] * 3 + ['000858']:
+        scheduler.record(code)
+    print(f"热门股票: {scheduler.hot_codes(6)}")
+
+    now = pd.Timestamp('2024-06-28 16:00')
+    print(f"交易时段: {get_trading_calendar().market_phase(now)}，调度间隔 {scheduler.interval(now)}s")
+    print(f"本轮请求: {scheduler.run_once(now)}，{scheduler.stats}")
+
+    start, end = lookback_window(sessions=120, now=now)
+    started = time.perf_counter()
+    source.get_history_data('600519', start, end)
+    print(f"页面请求耗时 {(time.perf_counter() - started) * 1000:.2f}ms，命中率 {cache.stats()['by_type']}")
@@ -0,0 +1,413 @@
+"""
+回放数据源模块
+从本地文件提供录制的或合成的行情数据，接口与 AKShareData / TuShareData 一致，
+可注入固定延迟模拟网络请求，并支持按N倍速回放逐笔成交，用于离线、可复现的性能测试
+
+目录结构:
+    root/
+    ├── history/<code>.csv|parquet     # 日K线
+    ├── daily_basic/<code>.csv         # 每日指标
+    ├── ticks/<YYYYMMDD>.csv           # 逐笔成交: time, code, price, volume
+    ├── ticks/<YYYYMMDD>.tick          # 或 TickStore 录制的全市场快照（累计成交量转换为逐笔成交量）
+    ├── stock_list.csv                 # code, name
+    └── spot.csv                       # 实时行情快照（列名同 AKShareData）
+"""
+
+import os
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from ..utils.helpers import get_exchange_from_code
+from ..utils.trading_calendar import get_trading_calendar
+from .local_source import LocalFileSource
+from .tick_store import TickStore
+
+
+class ReplayDataSource:
+    """回放数据源"""
+
+    def __init__(self, root, latency=0.0, jitter=0.0, seed=0):
+        """
+        初始化回放数据源
+
+        Args:
+            root: 数据目录
+            latency: 每次调用注入的延迟（秒）
+            jitter: 延迟的随机波动上限（秒），由 seed 决定，结果可复现
+            seed: 随机种子
+        """
+        self.root = root
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._history = LocalFileSource(os.path.join(root, 'history'))
+        self._tables = {}
+
+        self.request_count = 0
+        self._replay = None
+
+    def _delay(self):
+        """模拟一次网络请求"""
+        self.request_count += 1
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _table(self, name, dtype=None):
+        """读取并缓存根目录下的表"""
+        if name not in self._tables:
+            path = os.path.join(self.root, f"{name}.csv")
+            self._tables[name] = (pd.read_csv(path, dtype=dtype) if os.path.exists(path)
+                                  else pd.DataFrame())
+        return self._tables[name]
+
+    def is_available(self):
+        """是否有可回放的数据"""
+        return os.path.isdir(self.root)
+
+    # ------------------------------------------------------------------
+    # 与 AKShareData / TuShareData 相同的接口
+    # ------------------------------------------------------------------
+
+    def get_history_data(self, code, start_date, end_date, adjust='qfq'):
+        """
+        获取历史日K线
+
+        Args:
+            code: 股票代码
+            start_date: 开始日期 'YYYYMMDD'
+            end_date: 结束日期 'YYYYMMDD'
+            adjust: 复权方式（回放数据不区分）
+
+        Returns:
+            DataFrame: 包含 date, open, close, high, low, volume 等列
+        """
+        self._delay()
+        return self._history.get_history_data(code, start_date, end_date, adjust)
+
+    def get_stock_list(self, exchange=None):
+        """
+        获取股票列表
+
+        Args:
+            exchange: '深圳交易所' / '上海交易所'，默认全部
+
+        Returns:
+            DataFrame: 包含 code, name 列
+        """
+        self._delay()
+        df = self._table('stock_list', dtype={'code': str})
+        if exchange and not df.empty:
+            df = df[df['code'].map(get_exchange_from_code) == exchange]
+        return df.reset_index(drop=True)
+
+    def _snapshot(self):
+        """当前行情快照：回放进行中时由逐笔成交生成，否则读取 spot.csv"""
+        if self._replay is not None:
+            return self._replay_snapshot()
+        spot = self._table('spot', dtype={'code': str})
+        if not spot.empty:
+            spot = spot.copy()
+            spot.index = pd.Index(spot['code'].values)
+        return spot
+
+    def get_realtime_quotes(self, codes):
+        """
+        批量获取实时行情
+
+        Args:
+            codes: 股票代码列表
+
+        Returns:
+            DataFrame: 以代码为索引，快照中没有的代码不在结果中
+        """
+        self._delay()
+        spot = self._snapshot()
+        if spot.empty:
+            return spot
+        return spot.loc[[code for code in dict.fromkeys(codes) if code in spot.index]]
+
+    def get_realtime_quote(self, code):
+        """
+        获取单只股票实时行情
+
+        Returns:
+            DataFrame: 一行行情数据，包含 price 列
+        """
+        return self.get_realtime_quotes([code]).reset_index(drop=True)
+
+    def get_market_overview(self):
+        """
+        获取市场涨跌概况
+
+        Returns:
+            DataFrame: 包含 type, count 列（上涨/下跌/平盘）
+        """
+        self._delay()
+        spot = self._snapshot()
+        if spot.empty:
+            return pd.DataFrame()
+        change = pd.to_numeric(spot['pct_change'], errors='coerce').dropna()
+        return pd.DataFrame({
+            'type': ['上涨', '下跌', '平盘'],
+            'count': [(change > 0).sum(), (change < 0).sum(), (change == 0).sum()]
+        })
+
+    def get_daily_basic(self, code, start_date, end_date):
+        """
+        获取每日指标
+
+        Returns:
+            DataFrame: 回放目录 daily_basic/<code>.csv 中区间内的数据
+        """
+        self._delay()
+        path = os.path.join(self.root, 'daily_basic', f"{code}.csv")
+        if not os.path.exists(path):
+            return pd.DataFrame()
+        df = pd.read_csv(path, dtype={'ts_code': str, 'trade_date': str})
+        dates = pd.to_datetime(df['trade_date'])
+        mask = (dates >= pd.Timestamp(start_date)) & (dates <= pd.Timestamp(end_date))
+        return df[mask].reset_index(drop=True)
+
+    # ------------------------------------------------------------------
+    # 逐笔回放
+    # ------------------------------------------------------------------
+
+    def load_ticks(self, date):
+        """
+        读取某日逐笔成交
+
+        Returns:
+            DataFrame: time, code, price, volume，按时间升序
+        """
+        tick_dir = os.path.join(self.root, 'ticks')
+        if os.path.exists(os.path.join(tick_dir, f"{pd.Timestamp(date):%Y%m%d}.tick")):
+            ticks = TickStore(tick_dir).read_day(date)
+            ticks['code'] = ticks['code'].astype(str)
+            ticks['volume'] = ticks.groupby('code')['volume'].diff().fillna(ticks['volume'])
+            ticks = ticks[['time', 'code', 'price', 'volume']]
+            return ticks.sort_values('time', kind='stable').reset_index(drop=True)
+
+        path = os.path.join(tick_dir, f"{pd.Timestamp(date):%Y%m%d}.csv")
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=['time', 'code', 'price', 'volume'])
+        ticks = pd.read_csv(path, dtype={'code': str})
+        ticks['time'] = pd.to_datetime(ticks['time'])
+        return ticks.sort_values('time', kind='stable').reset_index(drop=True)
+
+    def start_replay(self, date, speed=1.0):
+        """
+        开始按N倍速回放某日逐笔成交，之后的实时行情按回放时钟生成
+
+        Args:
+            date: 交易日
+            speed: 回放倍速，如 60 表示1秒回放1分钟
+        """
+        ticks = self.load_ticks(date)
+        if ticks.empty:
+            raise ValueError(f"没有 {date} 的逐笔数据")
+        prev = {}
+        for code in ticks['code'].unique():
+            hist = self._history.get_history_data(code, '19900101', pd.Timestamp(date) - pd.Timedelta(days=1))
+            if not hist.empty:
+                prev[code] = hist['close'].iloc[-1]
+        self._replay = {
+            'ticks': ticks,
+            'times': ticks['time'].values,
+            'start': ticks['time'].iloc[0],
+            'wall_start': time.monotonic(),
+            'speed': float(speed),
+            'pre_close': prev,
+        }
+
+    def stop_replay(self):
+        """停止回放，实时行情恢复读取 spot.csv"""
+        self._replay = None
+
+    def replay_clock(self):
+        """当前回放时间"""
+        if self._replay is None:
+            return None
+        elapsed = (time.monotonic() - self._replay['wall_start']) * self._replay['speed']
+        return self._replay['start'] + pd.Timedelta(seconds=elapsed)
+
+    def _replay_snapshot(self):
+        """按回放时钟汇总已发生的逐笔成交"""
+        now = np.datetime64(self.replay_clock())
+        count = int(np.searchsorted(self._replay['times'], now, side='right'))
+        seen = self._replay['ticks'].iloc[:count]
+        if seen.empty:
+            return pd.DataFrame()
+        grouped = seen.groupby('code', sort=False)
+        snap = pd.DataFrame({
+            'price': grouped['price'].last(),
+            'open': grouped['price'].first(),
+            'high': grouped['price'].max(),
+            'low': grouped['price'].min(),
+            'volume': grouped['volume'].sum(),
+        })
+        pre_close = pd.Series(self._replay['pre_close'], dtype=float).reindex(snap.index)
+        snap['pre_close'] = pre_close.fillna(snap['open'])
+        snap['change'] = snap['price'] - snap['pre_close']
+        snap['pct_change'] = snap['change'] / snap['pre_close'] * 100
+        snap.insert(0, 'code', snap.index)
+        return snap
+
+    def iter_ticks(self, date, speed=1.0):
+        """
+        按N倍速逐条产出某日逐笔成交（按成交时间间隔等待）
+
+        Args:
+            date: 交易日
+            speed: 回放倍速，<=0 表示不等待
+
+        Yields:
+            Series: 一条逐笔成交
+        """
+        ticks = self.load_ticks(date)
+        if ticks.empty:
+            return
+        start = ticks['time'].iloc[0]
+        wall_start = time.monotonic()
+        for _, tick in ticks.iterrows():
+            if speed > 0:
+                wait = (tick['time'] - start).total_seconds() / speed - (time.monotonic() - wall_start)
+                if wait > 0:
+                    time.sleep(wait)
+            yield tick
+
+    # ------------------------------------------------------------------
+    # 录制
+    # ------------------------------------------------------------------
+
+    def record(self, source, codes, start_date, end_date, adjust='qfq'):
+        """
+        从实时数据源录制回放数据
+
+        Args:
+            source: AKShareData / TuShareData 等数据源
+            codes: 股票代码列表
+            start_date: 开始日期 'YYYYMMDD'
+            end_date: 结束日期 'YYYYMMDD'
+            adjust: 复权方式
+        """
+        for code in codes:
+            hist = source.get_history_data(code, start_date, end_date, adjust)
+            if not hist.empty:
+                self._history.save_history_data(code, hist)
+            if hasattr(source, 'get_daily_basic'):
+                basic = source.get_daily_basic(code, start_date, end_date)
+                if basic is not None and not basic.empty:
+                    os.makedirs(os.path.join(self.root, 'daily_basic'), exist_ok=True)
+                    basic.to_csv(os.path.join(self.root, 'daily_basic', f"{code}.csv"), index=False)
+
+        if hasattr(source, 'get_stock_list'):
+            stock_list = source.get_stock_list()
+            if not stock_list.empty:
+                stock_list.to_csv(os.path.join(self.root, 'stock_list.csv'), index=False)
+        if hasattr(source, 'get_realtime_quotes'):
+            spot = source.get_realtime_quotes(codes)
+            if not spot.empty:
+                spot.to_csv(os.path.join(self.root, 'spot.csv'), index=False)
+        self._tables = {}
+
+
+def _synthetic_sessions(start_date, end_date):
+    """合成数据的交易日：交易日历范围内按交易日，范围外按工作日"""
+    calendar = get_trading_calendar()
+    days = pd.bdate_range(pd.Timestamp(start_date).normalize(), pd.Timestamp(end_date).normalize())
+    covered = days[np.asarray(calendar.covers(days), dtype=bool)] if len(days) else days
+    if covered.empty:
+        return days
+    return days[days < covered[0]].append(calendar.sessions(covered[0], covered[-1])).append(days[days > covered[-1]])
+
+
+def generate_synthetic_data(root, codes, start_date, end_date, seed=0, tick_interval=3):
+    """
+    生成合成回放数据（按交易日历生成几何布朗运动日K线、最后一日的逐笔成交、行情快照；
+    交易日历范围外的日期按工作日生成）
+
+    Args:
+        root: 输出目录
+        codes: 股票代码列表
+        start_date: 开始日期
+        end_date: 结束日期
+        seed: 随机种子，相同参数生成相同数据
+        tick_interval: 逐笔成交间隔（秒）
+
+    Returns:
+        ReplayDataSource: 指向生成目录的数据源
+    """
+    rng = np.random.default_rng(seed)
+    dates = _synthetic_sessions(start_date, end_date)
+    history = LocalFileSource(os.path.join(root, 'history'))
+
+    spot_rows, tick_frames, names, basics = [], [], [], []
+    session = pd.date_range(f"{dates[-1]:%Y-%m-%d} 09:30", f"{dates[-1]:%Y-%m-%d} 11:30",
+                            freq=f"{tick_interval}s").append(
+              pd.date_range(f"{dates[-1]:%Y-%m-%d} 13:00", f"{dates[-1]:%Y-%m-%d} 15:00",
+                            freq=f"{tick_interval}s"))
+    for code in codes:
+        returns = rng.normal(0.0003, 0.02, len(dates))
+        close = 10 * np.exp(np.cumsum(returns))
+        open_ = close * np.exp(rng.normal(0, 0.005, len(dates)))
+        high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.02, len(dates)))
+        low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.02, len(dates)))
+        volume = rng.integers(10_000, 1_000_000, len(dates)).astype(float)
+        df = pd.DataFrame({'date': dates, 'code': code, 'open': open_.round(2), 'close': close.round(2),
+                           'high': high.round(2), 'low': low.round(2), 'volume': volume,
+                           'amount': (volume * close * 100).round(2)})
+        df['pct_change'] = (df['close'].pct_change() * 100).round(2)
+        history.save_history_data(code, df)
+
+        last = df.iloc[-1]
+        pre_close = df['close'].iloc[-2] if len(df) > 1 else last['open']
+        spot_rows.append({'code': code, 'name': f"合成{code}", 'price': last['close'],
+                          'pct_change': (last['close'] / pre_close - 1) * 100,
+                          'change': last['close'] - pre_close, 'volume': last['volume'],
+                          'amount': last['amount'], 'open': last['open'], 'high': last['high'],
+                          'low': last['low'], 'pre_close': pre_close})
+        names.append({'code': code, 'name': f"合成{code}"})
+        basics.append((code, pd.DataFrame({
+            'ts_code': code, 'trade_date': dates.strftime('%Y%m%d'),
+            'close': df['close'], 'pe': rng.uniform(5, 50), 'pb': rng.uniform(0.5, 8),
+            'turnover_rate': rng.uniform(0.1, 5, len(dates)).round(2),
+        })))
+
+        path = np.cumprod(np.exp(rng.normal(0, 0.0005, len(session))))
+        tick_frames.append(pd.DataFrame({
+            'time': session, 'code': code,
+            'price': (pre_close * path).round(2),
+            'volume': rng.integers(1, 50, len(session)) * 100,
+        }))
+
+    os.makedirs(os.path.join(root, 'ticks'), exist_ok=True)
+    os.makedirs(os.path.join(root, 'daily_basic'), exist_ok=True)
+    pd.concat(tick_frames).sort_values('time', kind='stable').to_csv(
+        os.path.join(root, 'ticks', f"{dates[-1]:%Y%m%d}.csv"), index=False)
+    pd.DataFrame(spot_rows).to_csv(os.path.join(root, 'spot.csv'), index=False)
+    pd.DataFrame(names).to_csv(os.path.join(root, 'stock_list.csv'), index=False)
+    for code, basic in basics:
+        basic.to_csv(os.path.join(root, 'daily_basic', f"{code}.csv"), index=False)
+    return ReplayDataSource(root)
+
+
+if __name__ == "__main__":
+    # 测试代码：生成合成数据并以600倍速回放
+    import tempfile
+
+    root = tempfile.mkdtemp()
+    replay = generate_synthetic_data(root, ['000001', '600519'], '20240101', '20240630')
+    replay.latency = 0.01
+
+    hist = replay.get_history_data('000001', '20240101', '20240630')
+    print(f"历史数据 {len(hist)} 条, 请求次数 {replay.request_count}")
+    print(replay.get_market_overview())
+
+    replay.start_replay('20240628', speed=600)
+    for _ in range(3):
+        time.sleep(0.5)
+        print(replay.replay_clock(), replay.get_realtime_quotes(['000001', '600519'])[['price', 'pct_change']].to_dict())
@@ -0,0 +1,121 @@
+"""
+请求合并模块（single-flight）
+同一时刻对同一键的多个请求只执行一次，其余调用等待并共享结果，
+避免多个会话同时打开热门股票时重复请求数据源
+"""
+
+import threading
+
+import pandas as pd
+
+
+class _Call:
+    """一次进行中的请求"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """请求合并器（线程安全）"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _stat(self, call_type):
+        if call_type not in self._stats:
+            self._stats[call_type] = {'calls': 0, 'executions': 0, 'coalesced': 0}
+        return self._stats[call_type]
+
+    def do(self, key, func, call_type=None):
+        """
+        执行请求，同一键已有请求在进行时等待其结果
+
+        Args:
+            key: 请求键（可哈希）
+            func: 无参请求函数
+            call_type: 调用类型，用于分类统计
+
+        Returns:
+            请求结果；共享的 DataFrame 返回副本。请求抛出的异常会传给所有等待方
+        """
+        with self._lock:
+            stat = self._stat(call_type)
+            stat['calls'] += 1
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+                stat['executions'] += 1
+            else:
+                call.waiters += 1
+                leader = False
+                stat['coalesced'] += 1
+
+        if leader:
+            try:
+                call.result = func()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        if not leader and isinstance(call.result, (pd.DataFrame, pd.Series)):
+            return call.result.copy()
+        return call.result
+
+    def stats(self):
+        """
+        合并统计
+
+        Returns:
+            dict: 总调用数、实际执行数、被合并数、进行中请求数及各调用类型明细
+        """
+        with self._lock:
+            totals = {'calls': 0, 'executions': 0, 'coalesced': 0}
+            for stat in self._stats.values():
+                for name in totals:
+                    totals[name] += stat[name]
+            return {
+                **totals,
+                'in_flight': len(self._calls),
+                'by_type': {call_type: dict(stat) for call_type, stat in self._stats.items()}
+            }
+
+
+_default_flight = SingleFlight()
+
+
+def get_singleflight():
+    """获取进程内共享的请求合并器（所有会话共用）"""
+    return _default_flight
+
+
+if __name__ == "__main__":
+    # 测试代码：10个线程同时请求同一键，只执行一次
+    import time
+
+    flight = SingleFlight()
+
+    def slow_fetch():
+        time.sleep(0.2)
+        return pd.DataFrame({'close': [1.0, 2.0]})
+
+    threads = [threading.Thread(target=flight.do, args=(('history', '000001'), slow_fetch, 'history'))
+               for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(flight.stats())
@@ -0,0 +1,377 @@
+"""
+股票代码表模块
+保存全市场股票的代码、名称、拼音首字母、交易所、板块、行业、上市日期，
+加载后建立内存索引：代码/名称/拼音的精确和前缀查找为二分查找，
+模糊查找先做子串匹配再做相似度匹配；整列代码到属性的映射为向量化索引
+"""
+
+import difflib
+import os
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from ..utils.config import get_config, resolve_path
+from ..utils.helpers import get_exchange_from_code, get_stock_board
+
+try:
+    from pypinyin import lazy_pinyin, Style
+except ImportError:
+    lazy_pinyin = None
+
+
+SYMBOL_COLUMNS = ['code', 'name', 'pinyin', 'exchange', 'board', 'industry', 'list_date']
+
+
+def pinyin_initials(name):
+    """
+    名称的拼音首字母（小写），如 '平安银行' -> 'payh'
+
+    未安装 pypinyin 时返回空字符串
+    """
+    if lazy_pinyin is None or not isinstance(name, str):
+        return ''
+    return ''.join(lazy_pinyin(name, style=Style.FIRST_LETTER, errors='default')).lower()
+
+
+class _SortedKeys:
+    """排序后的键数组，支持二分前缀查找"""
+
+    def __init__(self, keys):
+        self.keys_by_row = list(keys)
+        keys = np.asarray(keys, dtype=object)
+        self.order = np.argsort(keys, kind='stable')
+        self.keys = keys[self.order].tolist()
+
+    def exact(self, key):
+        left = _bisect(self.keys, key)
+        right = _bisect(self.keys, key + '\0')
+        return self.order[left:right]
+
+    def prefix(self, key):
+        left = _bisect(self.keys, key)
+        right = _bisect(self.keys, key + '\uffff')
+        return self.order[left:right]
+
+
+def _bisect(keys, key):
+    lo, hi = 0, len(keys)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if keys[mid] < key:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _char_index(keys):
+    """字符 -> 包含该字符的行号数组（模糊匹配的候选集）"""
+    index = {}
+    for row, key in enumerate(keys):
+        for char in set(key):
+            index.setdefault(char, []).append(row)
+    return {char: np.asarray(rows, dtype=np.int64) for char, rows in index.items()}
+
+
+class SymbolMaster:
+    """股票代码表"""
+
+    def __init__(self, path=None, table=None):
+        """
+        初始化代码表
+
+        Args:
+            path: CSV文件路径（读取并在刷新后写回），为 None 时只在内存中
+            table: 初始数据，DataFrame（至少包含 code, name 列）
+        """
+        self.path = path
+        if table is None and path and os.path.exists(path):
+            table = pd.read_csv(path, dtype=str, keep_default_na=False)
+        self._set_table(table if table is not None else pd.DataFrame(columns=SYMBOL_COLUMNS))
+
+    def _set_table(self, table):
+        """补齐派生列并重建索引"""
+        table = table.copy()
+        for col in SYMBOL_COLUMNS:
+            if col not in table.columns:
+                table[col] = ''
+        table = table[SYMBOL_COLUMNS].fillna('').astype(str)
+        table = table.drop_duplicates('code', keep='last').sort_values('code').reset_index(drop=True)
+
+        need_pinyin = table['pinyin'] == ''
+        if need_pinyin.any() and lazy_pinyin is not None:
+            table.loc[need_pinyin, 'pinyin'] = table.loc[need_pinyin, 'name'].map(pinyin_initials)
+        table.loc[table['exchange'] == '', 'exchange'] = table['code'].map(get_exchange_from_code)
+        table.loc[table['board'] == '', 'board'] = table['code'].map(get_stock_board)
+
+        self.table = table
+        self._code_index = pd.Index(table['code'])
+        self._codes = table['code'].tolist()
+        self._positions = {code: i for i, code in enumerate(self._codes)}
+        self._names = _SortedKeys(table['name'].tolist())
+        self._pinyin = _SortedKeys(table['pinyin'].tolist())
+        self._name_chars = _char_index(table['name'].tolist())
+        self._pinyin_chars = _char_index(table['pinyin'].tolist())
+        # 名称和拼音拼成一个字符串，子串查找在C层完成
+        self._blob = '\n'.join(f"{n}\t{p}" for n, p in zip(table['name'], table['pinyin']))
+        self._line_starts = np.cumsum([0] + [len(n) + len(p) + 2 for n, p in
+                                             zip(table['name'], table['pinyin'])])[:-1]
+
+    def __len__(self):
+        return len(self.table)
+
+    # ------------------------------------------------------------------
+    # 查找
+    # ------------------------------------------------------------------
+
+    def get(self, code):
+        """
+        按代码获取股票信息
+
+        Returns:
+            dict: 代码表中的一行，不存在时返回 None
+        """
+        position = self._positions.get(code)
+        return None if position is None else self.table.iloc[position].to_dict()
+
+    def name_of(self, code, default='未知股票'):
+        """按代码获取名称"""
+        position = self._positions.get(code)
+        return default if position is None else self.table['name'].iat[position]
+
+    def map(self, codes, attribute='name', default=''):
+        """
+        整列代码映射为属性（向量化）
+
+        Args:
+            codes: 代码序列
+            attribute: 代码表中的列名
+            default: 不存在的代码的值
+
+        Returns:
+            ndarray: 与 codes 等长
+        """
+        positions = self._code_index.get_indexer(pd.Index(codes))
+        values = self.table[attribute].to_numpy(dtype=object)
+        result = np.full(len(positions), default, dtype=object)
+        found = positions >= 0
+        result[found] = values[positions[found]]
+        return result
+
+    def _substring(self, query, limit):
+        """在名称和拼音中查找子串"""
+        hits = []
+        start = self._blob.find(query)
+        while start >= 0 and len(hits) < limit:
+            row = int(np.searchsorted(self._line_starts, start, side='right')) - 1
+            hits.append(row)
+            next_line = self._blob.find('\n', start)
+            if next_line < 0:
+                break
+            start = self._blob.find(query, next_line + 1)
+        return hits
+
+    def _fuzzy(self, query, keys, char_index, limit, cutoff=0.5):
+        """相似度匹配：先按共同字符数选出候选，再计算相似度"""
+        rows = [char_index[char] for char in set(query) if char in char_index]
+        if not rows:
+            return []
+        counts = np.bincount(np.concatenate(rows), minlength=len(keys))
+        top = np.argsort(-counts, kind='stable')[:limit * 5]
+        scored = []
+        for row in top[counts[top] > 0]:
+            score = difflib.SequenceMatcher(None, query, keys[row]).ratio()
+            if score >= cutoff:
+                scored.append((-score, int(row)))
+        return [row for _, row in sorted(scored)[:limit]]
+
+    def search_rows(self, query, limit=10, fuzzy=True):
+        """
+        搜索股票，返回代码表行号：代码、名称、拼音首字母的精确 > 前缀 > 子串 > 相似度匹配
+
+        Args:
+            query: 查询文本，如 '600519'、'茅台'、'gzmt'
+            limit: 最多返回条数
+            fuzzy: 前几种匹配不足 limit 条时是否做相似度匹配
+
+        Returns:
+            list: 行号，按匹配程度排序
+        """
+        query = str(query).strip()
+        if not query or not self._codes:
+            return []
+        lower = query.lower()
+
+        ranked = []
+        seen = set()
+
+        def add(rows):
+            for row in rows:
+                row = int(row)
+                if row not in seen:
+                    seen.add(row)
+                    ranked.append(row)
+
+        if query in self._positions:
+            add([self._positions[query]])
+        add(self._names.exact(query))
+        add(self._pinyin.exact(lower))
+        if query.isdigit():
+            left = _bisect(self._codes, query)
+            right = _bisect(self._codes, query + '\uffff')
+            add(range(left, min(right, left + limit)))
+        add(self._names.prefix(query)[:limit])
+        add(self._pinyin.prefix(lower)[:limit])
+        if len(ranked) < limit:
+            add(self._substring(lower if query.isascii() else query, limit))
+        if fuzzy and len(ranked) < limit and not query.isdigit():
+            if query.isascii():
+                add(self._fuzzy(lower, self._pinyin.keys_by_row, self._pinyin_chars, limit))
+            else:
+                add(self._fuzzy(query, self._names.keys_by_row, self._name_chars, limit))
+        return ranked[:limit]
+
+    def search(self, query, limit=10, fuzzy=True):
+        """
+        搜索股票（参数见 search_rows）
+
+        Returns:
+            DataFrame: 匹配的代码表行，按匹配程度排序
+        """
+        return self.table.take(self.search_rows(query, limit, fuzzy)).reset_index(drop=True)
+
+    def resolve(self, query):
+        """
+        把用户输入（代码、名称或拼音）解析为代码
+
+        Returns:
+            str: 最匹配的代码；6位数字直接返回；无匹配时原样返回
+        """
+        query = str(query).strip()
+        if len(query) == 6 and query.isdigit():
+            return query
+        rows = self.search_rows(query, limit=1)
+        return self._codes[rows[0]] if rows else query
+
+    # ------------------------------------------------------------------
+    # 刷新
+    # ------------------------------------------------------------------
+
+    def refresh(self, stock_list):
+        """
+        增量刷新：新增代码、更新改名或补充的字段，只为变化的行重新计算拼音
+
+        Args:
+            stock_list: 数据源返回的股票列表（至少包含 code, name 列，可含 industry, list_date）
+
+        Returns:
+            dict: {'added': 新增数, 'updated': 更新数}
+        """
+        if stock_list is None or stock_list.empty:
+            return {'added': 0, 'updated': 0}
+
+        incoming = stock_list.rename(columns={'symbol': 'code'}).copy()
+        incoming['code'] = incoming['code'].astype(str).str[-6:]
+        incoming = incoming[[c for c in SYMBOL_COLUMNS if c in incoming.columns]].fillna('').astype(str)
+        incoming = incoming.drop_duplicates('code', keep='last').set_index('code')
+
+        current = self.table.set_index('code')
+        added = incoming.index.difference(current.index)
+        common = incoming.index.intersection(current.index)
+
+        updated_codes = set()
+        for col in incoming.columns:
+            new_values = incoming.loc[common, col]
+            changed = (new_values != '') & (new_values != current.loc[common, col])
+            if changed.any():
+                changed_codes = changed.index[changed]
+                current.loc[changed_codes, col] = new_values[changed]
+                if col == 'name':
+                    current.loc[changed_codes, 'pinyin'] = ''
+                updated_codes.update(changed_codes)
+
+        if len(added) or updated_codes:
+            self._set_table(pd.concat([current, incoming.loc[added]]).reset_index())
+            self.save()
+        else:
+            self.touch()
+        return {'added': len(added), 'updated': len(updated_codes)}
+
+    def touch(self):
+        """刷新后没有变化：更新文件修改时间，记为今天已核对（age_days 据此判断是否过期）"""
+        if self.path and os.path.exists(self.path):
+            os.utime(self.path)
+
+    def save(self):
+        """写回CSV文件"""
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        self.table.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, self.path)
+
+    def age_days(self):
+        """文件距上次更新的天数，没有文件时为 None"""
+        if not self.path or not os.path.exists(self.path):
+            return None
+        return (datetime.now().timestamp() - os.path.getmtime(self.path)) / 86400
+
+
+_default_master = None
+_last_refresh = 0.0
+
+
+def get_symbol_master(refresh=False):
+    """
+    获取共享的代码表（文件路径读取 config.yaml 中 storage.symbol_file）
+
+    Args:
+        refresh: 代码表为空或已超过一天未更新时，是否从股票池（未启用本地存储时直接从AKShare/TuShare）刷新
+                 （失败后1小时内不重试）
+
+    Returns:
+        SymbolMaster
+    """
+    global _default_master, _last_refresh
+    if _default_master is None:
+        path = resolve_path(get_config('storage', 'symbol_file', default='data/symbols.csv'))
+        _default_master = SymbolMaster(path)
+    age = _default_master.age_days()
+    stale = len(_default_master) == 0 or age is None or age > 1
+    if refresh and stale and datetime.now().timestamp() - _last_refresh > 3600:
+        _last_refresh = datetime.now().timestamp()
+        from .universe_store import get_universe_store
+
+        # 与各页面共用每日股票池快照，不再单独请求数据源
+        universe = get_universe_store(refresh=True)
+        if universe is not None and len(universe):
+            listed = universe.load()
+            _default_master.refresh(listed.assign(list_date=listed['list_date'].dt.strftime('%Y%m%d').fillna('')))
+        else:
+            from .akshare_data import AKShareData
+            from .tushare_data import TuShareData
+
+            _default_master.refresh(AKShareData().get_stock_list())
+            tushare = TuShareData()
+            if tushare.is_available():
+                _default_master.refresh(tushare.get_stock_list())
+    return _default_master
+
+
+if __name__ == "__main__":
+    # 测试代码
+    import time
+
+    master = SymbolMaster(table=pd.DataFrame({
+        'code': ['000001', '000002', '600000', '600519', '000858', '300750'],
+        'name': ['平安银行', '万科A', '浦发银行', '贵州茅台', '五粮液', '宁德时代'],
+    }))
+    for q in ['600519', '茅台', 'payh', '60', '银行', '贵州毛台']:
+        started = time.perf_counter()
+        hits = master.search(q)
+        print(f"{q}: {list(hits['name'])} ({(time.perf_counter() - started) * 1000:.3f}ms)")
+    print(master.map(['600519', '999999', '000001'], 'board', default='-'))
@@ -0,0 +1,377 @@
+"""
+行情快照存储模块
+全市场实时快照（每几秒一次）按交易日压缩存储：
+每只股票一个数据块，时间为毫秒差分、价格为分（int32）差分、累计成交量/成交额为差分，
+按字节重排后 zlib 压缩；文件末尾为代码 -> 数据块偏移的索引，可以只解压需要的股票
+
+文件格式 <YYYYMMDD>.tick:
+    b'TICK' + 版本号(uint32)
+    数据块 ...                         # 每只股票: time | price | volume | amount 各列字节重排后拼接压缩
+    索引                               # 结构化数组: code, offset, length, rows
+    索引偏移(uint64) + 股票数(uint64) + b'TICK'
+
+录制时快照先按批写入 <YYYYMMDD>.part/ 目录（进程中断后可继续），收盘后合并为 .tick 文件
+"""
+
+import os
+import shutil
+import struct
+import time
+import uuid
+import zlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from ..utils.config import get_config, resolve_path
+
+
+MAGIC = b'TICK'
+VERSION = 1
+FOOTER = struct.Struct('<QQ4s')
+
+# 列名、存储dtype
+TICK_COLUMNS = [('time', np.int32), ('price', np.int32), ('volume', np.int64), ('amount', np.int64)]
+
+INDEX_DTYPE = np.dtype([('code', 'S8'), ('offset', '<i8'), ('length', '<i8'), ('rows', '<i8')])
+
+
+def _shuffle(values):
+    """按字节重排：所有值的第1字节、第2字节……依次排列，差分后的高位字节几乎全为0，压缩率更高"""
+    return values.view(np.uint8).reshape(-1, values.itemsize).T.tobytes()
+
+
+def _unshuffle(buffer, dtype, rows):
+    dtype = np.dtype(dtype)
+    raw = np.frombuffer(buffer, dtype=np.uint8).reshape(dtype.itemsize, rows)
+    return np.ascontiguousarray(raw.T).view(dtype).reshape(rows)
+
+
+def _delta(values, starts):
+    """分组差分：每组第一个值保留绝对值"""
+    delta = np.empty_like(values)
+    if len(values):
+        delta[0] = values[0]
+        np.subtract(values[1:], values[:-1], out=delta[1:])
+        delta[starts] = values[starts]
+    return delta
+
+
+def _encode_snapshot(snapshot, timestamp):
+    """快照 DataFrame -> (代码数组, 整数列)，剔除没有价格的行（停牌）"""
+    snapshot = snapshot[snapshot['price'].notna() & (snapshot['price'] > 0)]
+    snapshot = snapshot.drop_duplicates('code', keep='last')
+    ms = (timestamp - timestamp.normalize()) // pd.Timedelta(milliseconds=1)
+    rows = len(snapshot)
+    volume = snapshot['volume'] if 'volume' in snapshot.columns else pd.Series(0, index=snapshot.index)
+    amount = snapshot['amount'] if 'amount' in snapshot.columns else pd.Series(0, index=snapshot.index)
+    return (snapshot['code'].astype(str).to_numpy(),
+            {'time': np.full(rows, ms, dtype=np.int32),
+             'price': np.rint(snapshot['price'].to_numpy(dtype=float) * 100).astype(np.int32),
+             'volume': np.rint(volume.fillna(0).to_numpy(dtype=float)).astype(np.int64),
+             'amount': np.rint(amount.fillna(0).to_numpy(dtype=float)).astype(np.int64)})
+
+
+class TickStore:
+    """行情快照存储"""
+
+    def __init__(self, root, level=3):
+        """
+        初始化快照存储
+
+        Args:
+            root: 存储目录
+            level: zlib 压缩级别（3 以上文件只小几个百分点，写入慢一倍）
+        """
+        self.root = root
+        self.level = level
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, date):
+        return os.path.join(self.root, f"{pd.Timestamp(date):%Y%m%d}.tick")
+
+    def days(self):
+        """已存储的交易日"""
+        names = [name[:8] for name in os.listdir(self.root) if name.endswith('.tick')]
+        return pd.DatetimeIndex(sorted(pd.to_datetime(names, format='%Y%m%d')))
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def write_day(self, date, ticks):
+        """
+        写入一个交易日的快照（覆盖已有文件）
+
+        Args:
+            date: 交易日
+            ticks: DataFrame，time(时间戳), code, price(元), volume(累计成交量), amount(累计成交额)
+
+        Returns:
+            int: 文件字节数
+        """
+        codes = ticks['code'].astype(str).to_numpy()
+        ms = (pd.to_datetime(ticks['time']) - pd.Timestamp(date).normalize()) // pd.Timedelta(milliseconds=1)
+        columns = {
+            'time': ms.to_numpy(dtype=np.int64).astype(np.int32),
+            'price': np.rint(ticks['price'].to_numpy(dtype=float) * 100).astype(np.int32),
+            'volume': np.rint(ticks['volume'].to_numpy(dtype=float)).astype(np.int64),
+            'amount': np.rint(ticks['amount'].to_numpy(dtype=float)).astype(np.int64)
+            if 'amount' in ticks.columns else np.zeros(len(ticks), dtype=np.int64),
+        }
+        return self._write(date, codes, columns)
+
+    def _write(self, date, codes, columns):
+        # 按整数代码排序，比直接对字符串排序快一个数量级
+        code_ids, uniques = pd.factorize(codes, sort=True)
+        order = np.lexsort((columns['time'], code_ids))
+        code_ids = code_ids[order]
+        columns = {name: values[order] for name, values in columns.items()}
+        starts = np.searchsorted(code_ids, np.arange(len(uniques)))
+        ends = np.r_[starts[1:], len(code_ids)]
+        deltas = {name: _delta(values, starts) for name, values in columns.items()}
+
+        path = self._path(date)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        index = np.zeros(len(starts), dtype=INDEX_DTYPE)
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC + struct.pack('<I', VERSION))
+            for i, (start, end) in enumerate(zip(starts, ends)):
+                block = zlib.compress(b''.join(_shuffle(deltas[name][start:end]) for name, _ in TICK_COLUMNS),
+                                      self.level)
+                index[i] = (str(uniques[i]).encode(), f.tell(), len(block), end - start)
+                f.write(block)
+            index_offset = f.tell()
+            f.write(index.tobytes())
+            f.write(FOOTER.pack(index_offset, len(index), MAGIC))
+        os.replace(tmp_path, path)
+        return os.path.getsize(path)
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def index(self, date):
+        """
+        读取某日的代码索引
+
+        Returns:
+            ndarray: 结构化数组 code, offset, length, rows；没有数据时为空
+        """
+        path = self._path(date)
+        if not os.path.exists(path):
+            return np.zeros(0, dtype=INDEX_DTYPE)
+        with open(path, 'rb') as f:
+            f.seek(-FOOTER.size, os.SEEK_END)
+            index_offset, count, magic = FOOTER.unpack(f.read(FOOTER.size))
+            if magic != MAGIC:
+                raise ValueError(f"不是有效的快照文件: {path}")
+            f.seek(index_offset)
+            return np.frombuffer(f.read(count * INDEX_DTYPE.itemsize), dtype=INDEX_DTYPE)
+
+    def codes(self, date):
+        """某日有快照的股票代码"""
+        return [code.decode() for code in self.index(date)['code']]
+
+    def read_day(self, date, codes=None):
+        """
+        读取某日快照
+
+        Args:
+            date: 交易日
+            codes: 只读取这些股票，默认全部
+
+        Returns:
+            DataFrame: time, code, price(元), volume(累计), amount(累计)，按 代码、时间 排序
+        """
+        index = self.index(date)
+        if codes is not None:
+            index = index[np.isin(index['code'], np.array([str(c).encode() for c in codes], dtype='S8'))]
+        if len(index) == 0:
+            return pd.DataFrame(columns=['time', 'code', 'price', 'volume', 'amount'])
+
+        rows = index['rows']
+        total = int(rows.sum())
+        deltas = {name: np.empty(total, dtype=dtype) for name, dtype in TICK_COLUMNS}
+        position = 0
+        with open(self._path(date), 'rb') as f:
+            for offset, length, n in zip(index['offset'], index['length'], rows):
+                f.seek(offset)
+                block = zlib.decompress(f.read(length))
+                cursor = 0
+                for name, dtype in TICK_COLUMNS:
+                    size = np.dtype(dtype).itemsize * n
+                    deltas[name][position:position + n] = _unshuffle(block[cursor:cursor + size], dtype, n)
+                    cursor += size
+                position += n
+
+        # 分段累加：整列一次 cumsum，再减去每段之前的累计值
+        starts = np.r_[0, np.cumsum(rows)[:-1]]
+        result = {}
+        for name, dtype in TICK_COLUMNS:
+            total_sum = np.cumsum(deltas[name], dtype=np.int64)
+            base = np.r_[0, total_sum[starts[1:] - 1]]
+            result[name] = total_sum - np.repeat(base, rows)
+
+        day = np.datetime64(pd.Timestamp(date).normalize(), 'ms')
+        return pd.DataFrame({
+            'time': day + result['time'].astype('timedelta64[ms]'),
+            'code': pd.Categorical.from_codes(np.repeat(np.arange(len(index)), rows),
+                                              [code.decode() for code in index['code']]),
+            'price': result['price'] / 100,
+            'volume': result['volume'],
+            'amount': result['amount'],
+        })
+
+    def read_symbol(self, date, code):
+        """读取某日单只股票的快照（只解压该股票的数据块）"""
+        return self.read_day(date, [code])
+
+
+class TickRecorder:
+    """按时间间隔录制全市场快照，分批落盘，收盘后合并为 .tick 文件"""
+
+    def __init__(self, store, date=None, batch_rows=2_000_000, skip_unchanged=True):
+        """
+        初始化录制器
+
+        Args:
+            store: TickStore
+            date: 交易日，默认今天
+            batch_rows: 内存中累积多少行后写入一个批次文件
+            skip_unchanged: 价格和累计成交量都没变的股票不记录
+        """
+        self.store = store
+        self.date = pd.Timestamp(date or datetime.now()).normalize()
+        self.batch_rows = batch_rows
+        self.skip_unchanged = skip_unchanged
+        self.part_dir = os.path.join(store.root, f"{self.date:%Y%m%d}.part")
+        os.makedirs(self.part_dir, exist_ok=True)
+        self._codes, self._columns = [], []
+        self._rows = 0
+        self._last = pd.DataFrame(columns=['price', 'volume'], dtype=float)
+        self.snapshots = 0
+
+    def append(self, snapshot, timestamp=None):
+        """
+        追加一次快照
+
+        Args:
+            snapshot: DataFrame，code, price, volume(累计), amount(累计)，如 AKShare 实时行情
+            timestamp: 快照时间，默认当前时间
+        """
+        timestamp = pd.Timestamp(timestamp or datetime.now())
+        codes, columns = _encode_snapshot(snapshot, timestamp)
+        if self.skip_unchanged:
+            last = self._last.reindex(codes)
+            changed = ~((last['price'].to_numpy() == columns['price'])
+                        & (last['volume'].to_numpy() == columns['volume']))
+            codes = codes[changed]
+            columns = {name: values[changed] for name, values in columns.items()}
+            if len(codes):
+                update = pd.DataFrame({'price': columns['price'], 'volume': columns['volume']}, index=codes)
+                self._last = update.combine_first(self._last)
+        self.snapshots += 1
+        if len(codes):
+            self._codes.append(codes)
+            self._columns.append(columns)
+            self._rows += len(codes)
+        if self._rows >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        """把内存中的快照写入批次文件"""
+        if not self._rows:
+            return
+        arrays = {name: np.concatenate([c[name] for c in self._columns]) for name, _ in TICK_COLUMNS}
+        arrays['code'] = np.concatenate(self._codes).astype('S8')
+        path = os.path.join(self.part_dir, f"{time.time_ns()}.npz")
+        np.savez(path, **arrays)
+        self._codes, self._columns, self._rows = [], [], 0
+
+    def close(self):
+        """
+        合并所有批次文件为当日 .tick 文件并删除批次目录
+
+        Returns:
+            int: 文件字节数
+        """
+        self.flush()
+        parts = sorted(name for name in os.listdir(self.part_dir) if name.endswith('.npz'))
+        if not parts:
+            shutil.rmtree(self.part_dir, ignore_errors=True)
+            return 0
+        loaded = [np.load(os.path.join(self.part_dir, name)) for name in parts]
+        codes = np.concatenate([part['code'] for part in loaded]).astype(str)
+        columns = {name: np.concatenate([part[name] for part in loaded]) for name, _ in TICK_COLUMNS}
+        size = self.store._write(self.date, codes, columns)
+        shutil.rmtree(self.part_dir, ignore_errors=True)
+        return size
+
+    def run(self, fetch, interval=3.0, until=None):
+        """
+        循环录制直到指定时间（阻塞）
+
+        Args:
+            fetch: 返回全市场快照的函数
+            interval: 录制间隔（秒）
+            until: 结束时间，默认当日 15:00
+        """
+        until = pd.Timestamp(until) if until is not None else self.date + pd.Timedelta(hours=15)
+        while pd.Timestamp.now() < until:
+            started = time.monotonic()
+            try:
+                self.append(fetch())
+            except Exception as e:
+                print(f"录制快照失败: {e}")
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+        return self.close()
+
+
+_default_store = None
+
+
+def get_tick_store():
+    """
+    获取共享的快照存储（目录读取 config.yaml 中 storage.tick_dir）
+
+    Returns:
+        TickStore: 未启用本地存储时返回 None
+    """
+    global _default_store
+    if not get_config('storage', 'enabled', default=True):
+        return None
+    if _default_store is None:
+        _default_store = TickStore(resolve_path(get_config('storage', 'tick_dir', default='data/ticks')))
+    return _default_store
+
+
+if __name__ == "__main__":
+    # 测试代码：合成 1000 只股票、3秒一次的全天快照
+    import tempfile
+
+    rng = np.random.default_rng(0)
+    date = pd.Timestamp('2024-06-03')
+    session = pd.date_range('2024-06-03 09:30', '2024-06-03 11:30', freq='3s').append(
+        pd.date_range('2024-06-03 13:00', '2024-06-03 15:00', freq='3s'))
+    n_codes = 1000
+    codes = np.array([f"{600000 + i:06d}" for i in range(n_codes)])
+    steps = rng.choice([-1, 0, 0, 0, 1], size=(len(session), n_codes)).cumsum(axis=0)
+    price = (rng.uniform(500, 5000, n_codes) + steps) / 100
+    volume = rng.integers(0, 50, size=(len(session), n_codes)).cumsum(axis=0) * 100
+    ticks = pd.DataFrame({
+        'time': np.repeat(session.values, n_codes), 'code': np.tile(codes, len(session)),
+        'price': price.ravel(), 'volume': volume.ravel(), 'amount': (volume * price).ravel().round(),
+    })
+
+    store = TickStore(tempfile.mkdtemp())
+    started = time.perf_counter()
+    size = store.write_day(date, ticks)
+    print(f"写入 {len(ticks):,} 行 {time.perf_counter() - started:.2f}s，文件 {size / 1e6:.1f}MB "
+          f"（{size / len(ticks):.2f} 字节/行，DataFrame {ticks.memory_usage(deep=True).sum() / 1e6:.0f}MB）")
+    started = time.perf_counter()
+    back = store.read_day(date)
+    elapsed = time.perf_counter() - started
+    print(f"读取 {len(back):,} 行 {elapsed:.2f}s（{len(back) / elapsed / 1e6:.1f}M 行/秒）")
+    print(store.read_symbol(date, '600519').tail())
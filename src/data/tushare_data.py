@@ -0,0 +1,232 @@
+"""
+TuShare数据源模块
+获取股票基本信息、日线行情、每日指标
+需要TuShare Pro token（环境变量 TUSHARE_TOKEN 或 config.yaml）
+"""
+
+import os
+
+import pandas as pd
+
+from ..utils.config import get_config
+from ..utils.schema import normalize_bars
+from .adjustment import get_adjustment_engine
+
+
+def to_ts_code(code):
+    """
+    转换为TuShare代码格式
+
+    Args:
+        code: 6位股票代码
+
+    Returns:
+        str: 如 '000001.SZ'、'600000.SH'
+    """
+    if '.' in code:
+        return code
+    if code.startswith(('60', '68')):
+        return f"{code}.SH"
+    if code.startswith(('8', '4')):
+        return f"{code}.BJ"
+    return f"{code}.SZ"
+
+
+class TuShareData:
+    """TuShare数据源"""
+
+    def __init__(self, token=None, adjuster=None):
+        """
+        初始化TuShare数据源
+
+        Args:
+            token: TuShare Pro token，默认读取环境变量或配置文件
+            adjuster: 复权引擎 AdjustmentEngine，默认与AKShare共享（随本地存储启用）；
+                      未启用时只能提供不复权数据
+        """
+        self.token = (token or os.environ.get('TUSHARE_TOKEN')
+                      or get_config('data_sources', 'tushare', 'token', default=''))
+        self.adjuster = adjuster if adjuster is not None else get_adjustment_engine()
+        self.pro = None
+        if self.token:
+            try:
+                import tushare as ts
+                self.pro = ts.pro_api(self.token)
+            except ImportError:
+                print("需要安装tushare: pip install tushare")
+
+    def is_available(self):
+        """是否已配置可用"""
+        return self.pro is not None
+
+    def get_basic_info(self, code):
+        """
+        获取股票基本信息
+
+        Returns:
+            dict: 名称、行业、上市日期等
+        """
+        if not self.is_available():
+            return {}
+        try:
+            df = self.pro.stock_basic(ts_code=to_ts_code(code),
+                                      fields='ts_code,symbol,name,area,industry,market,list_date')
+            return df.iloc[0].to_dict() if not df.empty else {}
+        except Exception as e:
+            print(f"获取基本信息失败: {e}")
+            return {}
+
+    def get_stock_list(self):
+        """
+        获取上市股票列表
+
+        Returns:
+            DataFrame: code, name, industry, list_date
+        """
+        if not self.is_available():
+            return pd.DataFrame()
+        try:
+            df = self.pro.stock_basic(list_status='L', fields='symbol,name,industry,list_date')
+            return df.rename(columns={'symbol': 'code'})
+        except Exception as e:
+            print(f"获取股票列表失败: {e}")
+            return pd.DataFrame()
+
+    def get_delisted_list(self):
+        """
+        获取已退市股票列表
+
+        Returns:
+            DataFrame: code, name, industry, list_date, delist_date
+        """
+        if not self.is_available():
+            return pd.DataFrame()
+        try:
+            df = self.pro.stock_basic(list_status='D', fields='symbol,name,industry,list_date,delist_date')
+            return df.rename(columns={'symbol': 'code'})
+        except Exception as e:
+            print(f"获取退市股票列表失败: {e}")
+            return pd.DataFrame()
+
+    def get_daily_data(self, code, start_date, end_date):
+        """
+        获取日线行情（TuShare原始格式）
+
+        Returns:
+            DataFrame: ts_code, trade_date, open, high, low, close, vol, amount ...
+        """
+        if not self.is_available():
+            return pd.DataFrame()
+        try:
+            return self.pro.daily(ts_code=to_ts_code(code), start_date=start_date, end_date=end_date)
+        except Exception as e:
+            print(f"获取日线行情失败: {e}")
+            return pd.DataFrame()
+
+    def get_adjust_factors(self, code):
+        """
+        获取后复权因子表
+
+        Returns:
+            DataFrame: date, factor（按日期升序）
+        """
+        if not self.is_available():
+            return pd.DataFrame()
+        try:
+            df = self.pro.adj_factor(ts_code=to_ts_code(code))
+        except Exception as e:
+            print(f"获取复权因子失败: {e}")
+            return pd.DataFrame()
+        if df is None or df.empty:
+            return pd.DataFrame()
+        return pd.DataFrame({
+            'date': pd.to_datetime(df['trade_date'].astype(str)),
+            'factor': pd.to_numeric(df['adj_factor'], errors='coerce'),
+        }).sort_values('date', ignore_index=True)
+
+    def supports_adjust(self, adjust):
+        """能否提供该复权方式的数据（前/后复权需要复权引擎）"""
+        return adjust in (None, 'none') or self.adjuster is not None
+
+    def get_history_data(self, code, start_date, end_date, adjust='qfq'):
+        """
+        获取历史日K线（与AKShareData相同的列名）
+
+        前/后复权由不复权日线 + 复权因子计算，与AKShareData共用因子表，两个数据源的复权价格一致
+
+        Args:
+            code: 股票代码
+            start_date: 开始日期 'YYYYMMDD'
+            end_date: 结束日期 'YYYYMMDD'
+            adjust: 复权方式 'qfq'(前复权) / 'hfq'(后复权) / 'none'
+
+        Returns:
+            DataFrame: 标准列名和dtype（见 utils.schema），按日期升序，已标记为校验通过；
+                       未启用复权引擎时请求前/后复权返回空 DataFrame
+        """
+        if not self.supports_adjust(adjust):
+            print(f"未启用复权引擎，TuShare无法提供{adjust}数据")
+            return pd.DataFrame()
+        df = self.get_daily_data(code, start_date, end_date)
+        if df is None or df.empty:
+            return pd.DataFrame()
+        try:
+            df = normalize_bars(df)
+            if adjust in ('qfq', 'hfq'):
+                df = normalize_bars(self.adjuster.adjust(
+                    code, df, adjust, refresh=lambda: self.get_adjust_factors(code)))
+            return df
+        except ValueError as e:
+            print(f"日线数据格式错误: {e}")
+            return pd.DataFrame()
+
+    def get_daily_basic(self, code, start_date, end_date):
+        """
+        获取每日指标（PE、PB、换手率、市值等）
+
+        Returns:
+            DataFrame: TuShare daily_basic 数据
+        """
+        if not self.is_available():
+            return pd.DataFrame()
+        try:
+            return self.pro.daily_basic(ts_code=to_ts_code(code), start_date=start_date, end_date=end_date)
+        except Exception as e:
+            print(f"获取每日指标失败: {e}")
+            return pd.DataFrame()
+
+    def get_daily_basic_by_date(self, trade_date):
+        """
+        获取某个交易日全市场的每日指标（一次请求）
+
+        Args:
+            trade_date: 交易日 'YYYYMMDD'
+
+        Returns:
+            DataFrame: TuShare daily_basic 数据
+        """
+        if not self.is_available():
+            return pd.DataFrame()
+        try:
+            return self.pro.daily_basic(trade_date=trade_date)
+        except Exception as e:
+            print(f"获取每日指标失败: {e}")
+            return pd.DataFrame()
+
+    def get_fina_indicator(self, period):
+        """
+        获取某个报告期全市场的财务指标（含公告日 ann_date）
+
+        Args:
+            period: 报告期 'YYYYMMDD'，如 '20231231'
+
+        Returns:
+            DataFrame: TuShare fina_indicator_vip 数据
+        """
+        if not self.is_available():
+            return pd.DataFrame()
+        try:
+            return self.pro.fina_indicator_vip(period=period)
+        except Exception as e:
+            print(f"获取财务指标失败: {e}")
+            return pd.DataFrame()
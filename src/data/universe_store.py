@@ -0,0 +1,384 @@
+"""
+股票池存储模块
+每个交易日把全市场股票列表物化一次到本地，按交易所和板块分区保存为未压缩的 Arrow IPC 文件，
+读取时内存映射，进程内按快照缓存，各页面共享同一份股票池而不必每次请求数据源；
+股票池保留已退市股票及上市/退市日期，可按任一历史日期取当时在市的股票，避免幸存者偏差
+
+目录结构:
+    root/
+    ├── current.json                       # 当前快照：交易日、目录、行数
+    └── 20240628-1a2b3c4d/
+        ├── exchange=SZ/board=main.arrow   # code, name, exchange, board, industry,
+        ├── exchange=SZ/board=chinext.arrow  # list_date, delist_date, listed, is_st
+        └── ...
+
+刷新时先写新的快照目录，最后原子替换 current.json，读取方不会读到写了一半的快照。
+"""
+
+import json
+import os
+import shutil
+import uuid
+
+import pandas as pd
+
+from ..utils.config import get_config, resolve_path
+from ..utils.helpers import get_exchange_from_code, get_stock_board
+from ..utils.trading_calendar import get_trading_calendar
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+
+
+UNIVERSE_COLUMNS = ['code', 'name', 'exchange', 'board', 'industry', 'list_date', 'delist_date', 'listed', 'is_st']
+
+# 分区目录名
+EXCHANGE_KEYS = {'深圳交易所': 'SZ', '上海交易所': 'SH', '北京交易所': 'BJ'}
+BOARD_KEYS = {'深市主板': 'main', '沪市主板': 'main', '创业板': 'chinext', '科创板': 'star', '北交所': 'bse'}
+
+
+def _partition_keys(values, mapping):
+    """交易所/板块名称或分区键 -> 分区键集合，None 表示不过滤"""
+    if values is None:
+        return None
+    if isinstance(values, str):
+        values = [values]
+    return {mapping.get(value, value) for value in values}
+
+
+class UniverseStore:
+    """按交易所和板块分区的全市场股票池"""
+
+    CURRENT_FILE = 'current.json'
+
+    def __init__(self, root, keep=3):
+        """
+        初始化股票池存储
+
+        Args:
+            root: 存储根目录
+            keep: 保留的历史快照目录数（其他进程可能仍在映射旧快照）
+        """
+        if pa is None:
+            raise ImportError("股票池存储需要安装pyarrow: pip install pyarrow")
+        self.root = root
+        self.keep = keep
+        os.makedirs(root, exist_ok=True)
+        self._current = None
+        self._current_mtime = None
+        self._frames = {}
+
+    # ------------------------------------------------------------------
+    # 快照
+    # ------------------------------------------------------------------
+
+    def current(self):
+        """
+        当前快照信息（current.json 被其他进程更新后自动重新读取）
+
+        Returns:
+            dict: {'date': 'YYYYMMDD', 'dir': 目录名, 'rows': 行数, 'partitions': [...]}，没有快照时为 None
+        """
+        path = os.path.join(self.root, self.CURRENT_FILE)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if mtime != self._current_mtime:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._current = json.load(f)
+            self._current_mtime = mtime
+            self._frames = {}
+        return self._current
+
+    @property
+    def snapshot_date(self):
+        """当前快照对应的交易日，没有快照时为 None"""
+        current = self.current()
+        return pd.Timestamp(current['date']) if current else None
+
+    def is_stale(self, date=None):
+        """快照是否早于 date（默认今天）所在的最近一个交易日"""
+        snapshot_date = self.snapshot_date
+        if snapshot_date is None:
+            return True
+        return snapshot_date < get_trading_calendar().previous_trading_day(date)
+
+    def __len__(self):
+        current = self.current()
+        return current['rows'] if current else 0
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def _read_partition(self, snapshot_dir, partition):
+        """内存映射读取一个分区（未压缩的 Arrow IPC 文件零拷贝映射），按快照缓存"""
+        frame = self._frames.get(partition)
+        if frame is None:
+            path = os.path.join(self.root, snapshot_dir, partition)
+            frame = feather.read_table(path, memory_map=True).to_pandas()
+            self._frames[partition] = frame
+        return frame
+
+    def load(self, exchange=None, board=None, listed_only=True, as_of=None):
+        """
+        读取股票池
+
+        Args:
+            exchange: 交易所，'深圳交易所' / '上海交易所' / '北京交易所'（或 'SZ'/'SH'/'BJ'），可为列表
+            board: 板块，'深市主板' / '沪市主板' / '创业板' / '科创板' / '北交所'，可为列表
+            listed_only: 只返回在市股票
+            as_of: 历史日期；给出时按上市/退市日期返回该日在市的股票（listed_only 为 True 时）
+
+        Returns:
+            DataFrame: 列为 UNIVERSE_COLUMNS，按代码排序
+        """
+        current = self.current()
+        if current is None:
+            return pd.DataFrame(columns=UNIVERSE_COLUMNS)
+
+        exchanges = _partition_keys(exchange, EXCHANGE_KEYS)
+        boards = _partition_keys(board, BOARD_KEYS)
+        frames = []
+        for partition in current['partitions']:
+            exchange_key, board_key = partition[:-len('.arrow')].split('/')
+            if exchanges is not None and exchange_key.split('=', 1)[1] not in exchanges:
+                continue
+            if boards is not None and board_key.split('=', 1)[1] not in boards:
+                continue
+            frames.append(self._read_partition(current['dir'], partition))
+        if not frames:
+            return pd.DataFrame(columns=UNIVERSE_COLUMNS)
+
+        df = pd.concat(frames, ignore_index=True)
+        if board is not None:
+            # 深市主板和沪市主板共用 main 分区键
+            names = {board} if isinstance(board, str) else set(board)
+            df = df[df['board'].isin(names) | df['board'].map(BOARD_KEYS).isin(names)]
+        if listed_only:
+            if as_of is None:
+                df = df[df['listed']]
+            else:
+                as_of = pd.Timestamp(as_of)
+                df = df[~(df['list_date'] > as_of) & ~(df['delist_date'] <= as_of)]
+        return df.sort_values('code').reset_index(drop=True)
+
+    def codes(self, **kwargs):
+        """股票代码列表（参数同 load）"""
+        return self.load(**kwargs)['code'].tolist()
+
+    def summary(self):
+        """
+        各交易所/板块的股票数
+
+        Returns:
+            DataFrame: exchange, board, listed, delisted
+        """
+        df = self.load(listed_only=False)
+        if df.empty:
+            return pd.DataFrame(columns=['exchange', 'board', 'listed', 'delisted'])
+        return (df.groupby(['exchange', 'board'])['listed']
+                .agg(listed='sum', delisted=lambda s: int((~s).sum()))
+                .reset_index())
+
+    # ------------------------------------------------------------------
+    # 刷新
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _normalize(df):
+        """数据源股票列表 -> code, name, industry, list_date[, delist_date]"""
+        df = df.rename(columns={'symbol': 'code', 'ts_code': 'code'}).copy()
+        df['code'] = df['code'].astype(str).str.extract(r'(\d{6})', expand=False)
+        df = df.dropna(subset=['code'])
+        for col in ('name', 'industry'):
+            df[col] = df[col].fillna('').astype(str) if col in df.columns else ''
+        for col in ('list_date', 'delist_date'):
+            df[col] = pd.to_datetime(df[col].astype(str), format='%Y%m%d', errors='coerce') \
+                if col in df.columns else pd.NaT
+        return df.drop_duplicates('code', keep='last').set_index('code')
+
+    def refresh(self, stock_list, delisted=None, date=None, max_vanish=0.05):
+        """
+        用数据源的在市股票列表生成新快照
+
+        上一快照在市、本次列表中消失的股票标记为退市（退市日期取本次快照日），
+        delisted 中给出的退市股票使用其退市日期；重新出现的股票恢复为在市
+
+        Args:
+            stock_list: 在市股票列表，至少包含 code, name 列，可含 industry, list_date
+            delisted: 已退市股票列表，包含 code, name, delist_date 列，可选
+            date: 快照日期，默认今天所在的最近一个交易日
+            max_vanish: 消失的股票超过上一快照在市股票的该比例时视为列表不完整，不标记退市
+
+        Returns:
+            dict: {'added': 新增, 'delisted': 新退市, 'relisted': 恢复在市, 'renamed': 改名}
+        """
+        if stock_list is None or stock_list.empty:
+            raise ValueError("股票列表为空")
+        date = get_trading_calendar().previous_trading_day(date)
+        incoming = self._normalize(stock_list)
+
+        previous = self.load(listed_only=False).set_index('code')
+        table = previous[['name', 'industry', 'list_date', 'delist_date', 'listed']].copy()
+
+        if delisted is not None and not delisted.empty:
+            gone = self._normalize(delisted)
+            gone = gone[gone['delist_date'].notna()]
+            unseen = gone.index.difference(table.index)
+            table = table.reindex(table.index.union(gone.index))
+            for col in ('name', 'industry', 'list_date'):
+                table.loc[unseen, col] = gone.loc[unseen, col]
+            table.loc[gone.index, 'delist_date'] = gone['delist_date']
+            table.loc[gone.index, 'listed'] = False
+
+        was_listed = previous.index[previous['listed'].astype(bool)]
+        vanished = was_listed.difference(incoming.index)
+        vanished = vanished[table.loc[vanished, 'listed'].astype(bool).to_numpy()]
+        if len(vanished) > max_vanish * max(len(was_listed), 1) and len(vanished) > 10:
+            print(f"股票列表缺少 {len(vanished)} 只上一快照在市的股票，疑似数据源返回不完整，暂不标记退市")
+            vanished = vanished[:0]
+        table.loc[vanished, 'listed'] = False
+        table.loc[vanished, 'delist_date'] = date
+
+        added = incoming.index.difference(table.index)
+        relisted = incoming.index.intersection(previous.index[~previous['listed'].astype(bool)])
+        common = incoming.index.intersection(previous.index)
+        renamed = common[(incoming.loc[common, 'name'] != '')
+                         & (incoming.loc[common, 'name'] != previous.loc[common, 'name'])]
+
+        table = table.reindex(table.index.union(incoming.index))
+        table.loc[incoming.index, 'listed'] = True
+        table.loc[incoming.index, 'delist_date'] = pd.NaT
+        for col in ('name', 'industry'):
+            values = incoming[col]
+            values = values[values != '']
+            table.loc[values.index, col] = values
+        list_dates = incoming['list_date'].dropna()
+        table.loc[list_dates.index, 'list_date'] = list_dates
+        newly_delisted = was_listed.intersection(table.index[~table['listed'].astype(bool)])
+
+        self.write(table.reset_index(), date)
+        return {'added': len(added), 'delisted': len(newly_delisted), 'relisted': len(relisted), 'renamed': len(renamed)}
+
+    def write(self, df, date):
+        """
+        写入完整股票池快照并切换为当前快照
+
+        Args:
+            df: 包含 code, name 列，可含 industry, list_date, delist_date, listed
+            date: 快照对应的交易日
+        """
+        df = df.copy()
+        df['code'] = df['code'].astype(str)
+        for col in ('name', 'industry'):
+            df[col] = df[col].fillna('').astype(str) if col in df.columns else ''
+        for col in ('list_date', 'delist_date'):
+            df[col] = pd.to_datetime(df[col]) if col in df.columns else pd.NaT
+            df[col] = df[col].astype('datetime64[ns]')
+        df['listed'] = df['listed'].fillna(True).astype(bool) if 'listed' in df.columns else True
+        df['exchange'] = df['code'].map(get_exchange_from_code)
+        df['board'] = df['code'].map(get_stock_board)
+        df['is_st'] = df['name'].str.upper().str.contains('ST').to_numpy(dtype=bool)
+        df = df[UNIVERSE_COLUMNS].sort_values('code').reset_index(drop=True)
+
+        date = pd.Timestamp(date).strftime('%Y%m%d')
+        snapshot_dir = f"{date}-{uuid.uuid4().hex[:8]}"
+        partitions = []
+        exchange_keys = df['exchange'].map(EXCHANGE_KEYS).fillna('other')
+        board_keys = df['board'].map(BOARD_KEYS).fillna('other')
+        for (exchange_key, board_key), part in df.groupby([exchange_keys, board_keys], sort=True):
+            partition = f"exchange={exchange_key}/board={board_key}.arrow"
+            path = os.path.join(self.root, snapshot_dir, partition)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 不压缩，读取时才能零拷贝内存映射
+            feather.write_feather(pa.Table.from_pandas(part.reset_index(drop=True), preserve_index=False),
+                                  path, compression='uncompressed')
+            partitions.append(partition)
+
+        current = {'date': date, 'dir': snapshot_dir, 'rows': len(df),
+                   'listed': int(df['listed'].sum()), 'partitions': partitions}
+        path = os.path.join(self.root, self.CURRENT_FILE)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        self._cleanup(snapshot_dir)
+
+    def _cleanup(self, current_dir):
+        """删除较早的快照目录，保留最近 keep 个"""
+        snapshots = sorted(d for d in os.listdir(self.root)
+                           if os.path.isdir(os.path.join(self.root, d)) and d[:8].isdigit())
+        for name in snapshots[:-self.keep] if self.keep else snapshots:
+            if name != current_dir:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+
+_default_store = None
+_last_refresh = 0.0
+
+
+def get_universe_store(refresh=False):
+    """
+    获取共享的股票池（目录读取 config.yaml 中 storage.universe_dir）
+
+    Args:
+        refresh: 快照早于最近一个交易日时，是否从AKShare/TuShare刷新（失败后1小时内不重试）
+
+    Returns:
+        UniverseStore: 未启用本地存储时返回 None
+    """
+    global _default_store, _last_refresh
+    if not get_config('storage', 'enabled', default=True):
+        return None
+    if _default_store is None:
+        _default_store = UniverseStore(resolve_path(get_config('storage', 'universe_dir', default='data/universe')))
+    now = pd.Timestamp.now().timestamp()
+    if refresh and _default_store.is_stale() and now - _last_refresh > 3600:
+        _last_refresh = now
+        from .akshare_data import AKShareData
+        from .tushare_data import TuShareData
+
+        stock_list = AKShareData().get_stock_list()
+        delisted = None
+        tushare = TuShareData()
+        if tushare.is_available():
+            basic = tushare.get_stock_list()
+            if stock_list.empty:
+                stock_list = basic
+            elif not basic.empty:
+                stock_list = stock_list.merge(basic[['code', 'industry', 'list_date']], on='code', how='left')
+            delisted = tushare.get_delisted_list()
+        try:
+            _default_store.refresh(stock_list, delisted)
+        except Exception as e:
+            print(f"刷新股票池失败: {e}")
+    return _default_store
+
+
+if __name__ == "__main__":
+    # 测试代码：两天的快照，第二天 000005 从列表中消失，301999 新上市
+    import tempfile
+    import time
+
+    store = UniverseStore(tempfile.mkdtemp())
+    day1 = pd.DataFrame({
+        'code': ['000001', '000005', '300750', '600519', '688981', '830799'],
+        'name': ['平安银行', 'ST星源', '宁德时代', '贵州茅台', '中芯国际', '艾融软件'],
+        'list_date': ['19910403', '19901210', '20180611', '20010827', '20200716', '20191230'],
+    })
+    print(store.refresh(day1, date='2024-06-27'))
+    day2 = pd.concat([day1[day1['code'] != '000005'],
+                      pd.DataFrame({'code': ['301999'], 'name': ['新股'], 'list_date': ['20240628']})])
+    print(store.refresh(day2, date='2024-06-28'))
+
+    started = time.perf_counter()
+    universe = store.load()
+    print(f"在市 {len(universe)} 只 ({(time.perf_counter() - started) * 1000:.2f}ms)")
+    print(store.load(exchange='深圳交易所', board='创业板'))
+    print(store.load(as_of='2024-06-27')['code'].tolist())
+    print(store.summary())
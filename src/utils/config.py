@@ -0,0 +1,68 @@
+"""
+配置加载模块
+读取 config/config.yaml，进程内只解析一次
+"""
+
+import os
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_CONFIG_PATH = os.path.join(PROJECT_ROOT, 'config', 'config.yaml')
+
+_config_cache = {}
+
+
+def load_config(path=None):
+    """
+    加载配置文件
+
+    Args:
+        path: 配置文件路径，默认 config/config.yaml
+
+    Returns:
+        dict: 配置内容（文件不存在或未安装pyyaml时返回空字典）
+    """
+    path = path or DEFAULT_CONFIG_PATH
+    if path in _config_cache:
+        return _config_cache[path]
+
+    config = {}
+    try:
+        import yaml
+
+        with open(path, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+    except ImportError:
+        print("需要安装pyyaml读取配置文件")
+    except FileNotFoundError:
+        pass
+
+    _config_cache[path] = config
+    return config
+
+
+def get_config(*keys, default=None, path=None):
+    """
+    按路径读取配置项
+
+    Args:
+        *keys: 配置路径，如 get_config('cache', 'ttl')
+        default: 默认值
+        path: 配置文件路径
+
+    Returns:
+        配置值
+    """
+    value = load_config(path)
+    for key in keys:
+        if not isinstance(value, dict) or key not in value:
+            return default
+        value = value[key]
+    return value
+
+
+def resolve_path(path):
+    """将配置中的相对路径解析为相对项目根目录的绝对路径"""
+    if os.path.isabs(path):
+        return path
+    return os.path.join(PROJECT_ROOT, path)
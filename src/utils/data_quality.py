@@ -0,0 +1,257 @@
+"""
+数据质量校验模块
+在全市场面板（字段 -> 日期 × 股票矩阵）上逐项做向量化检查，不删除任何数据：
+    缺失交易日（对照交易日历）、停牌、OHLC 不一致、零成交量、超出板块涨跌幅限制的价格跳变
+结果为精简的问题表（每个问题一行）和与面板对齐的布尔掩码，
+分析器可用 'valid' 掩码屏蔽异常K线，用 'after_gap' 掩码识别跨越缺口的滚动指标
+"""
+
+import numpy as np
+import pandas as pd
+
+from .trading_calendar import get_trading_calendar
+
+
+QUALITY_FIELDS = ['open', 'high', 'low', 'close', 'volume']
+
+ISSUE_TYPES = {
+    'missing_days': '缺失交易日',
+    'suspension': '停牌',
+    'non_trading_day': '非交易日数据',
+    'missing_values': '价格或成交量为空',
+    'ohlc_inconsistent': 'OHLC不一致',
+    'zero_volume': '零成交量',
+    'limit_breach': '超出涨跌幅限制',
+}
+
+# 创业板涨跌幅限制由10%调整为20%的日期
+CHINEXT_REFORM_DATE = pd.Timestamp('2020-08-24')
+
+# 价格精度为分，涨跌停价四舍五入后的允许误差（元）
+PRICE_TOLERANCE = 0.011
+
+
+def price_limit(codes, dates, names=None):
+    """
+    各股票各交易日的涨跌幅限制
+
+    主板10%（ST 5%），创业板20%（2020-08-24 之前10%），科创板20%，北交所30%
+
+    Args:
+        codes: 股票代码
+        dates: 交易日
+        names: {代码: 名称}，用于识别ST股票
+
+    Returns:
+        ndarray: 日期 × 股票，如 0.1 表示 ±10%
+    """
+    codes = pd.Index(codes).astype(str)
+    dates = pd.DatetimeIndex(dates)
+    board_limit = np.select(
+        [codes.str.startswith(('30', '68')), codes.str.startswith(('8', '4', '92'))],
+        [0.2, 0.3], 0.1)
+    if names is not None:
+        is_st = pd.Series(names).reindex(codes).fillna('').str.upper().str.contains('ST').to_numpy()
+        board_limit = np.where(is_st & (board_limit == 0.1), 0.05, board_limit)
+    limit = np.broadcast_to(board_limit, (len(dates), len(codes))).copy()
+    chinext = np.asarray(codes.str.startswith('30'))
+    before_reform = np.asarray(dates < CHINEXT_REFORM_DATE)
+    limit[np.ix_(before_reform, chinext)] = 0.1
+    return limit
+
+
+def validate_panel(panel, names=None, list_dates=None, suspension_days=3, listing_days=5):
+    """
+    校验全市场面板
+
+    Args:
+        panel: {字段: DataFrame(日期 × 股票)}，需包含 open/high/low/close/volume，
+               可选 pct_change（数据源给出的涨跌幅，已按除权参考价计算）
+        names: {代码: 名称}，用于识别ST股票的5%限制
+        list_dates: {代码: 上市日期}，上市后前 listing_days 个交易日不检查涨跌幅（交易日历范围内）
+        suspension_days: 连续缺失达到该天数记为停牌，否则记为缺失交易日
+        listing_days: 新股不设涨跌幅限制的交易日数
+
+    Returns:
+        tuple: (issues, masks)
+            issues: DataFrame，code, date, issue, detail；缺失区间每段一行，date 为首个缺失日
+            masks: {名称: DataFrame(日期 × 股票) 布尔矩阵}，与面板对齐：
+                   present, complete, ohlc_ok, has_volume, within_limit, after_gap, valid
+    """
+    missing = [f for f in QUALITY_FIELDS if f not in panel]
+    if missing:
+        raise ValueError(f"面板缺少必要的字段: {missing}")
+
+    close_frame = panel['close'].sort_index()
+    dates, codes = close_frame.index, close_frame.columns
+
+    def align(frame):
+        return frame.reindex(index=dates, columns=codes).to_numpy(dtype=float)
+
+    open_, high, low, close, volume = (align(panel[f]) for f in QUALITY_FIELDS)
+    calendar = get_trading_calendar()
+
+    present = ~np.isnan(close)
+    complete = present & ~(np.isnan(open_) | np.isnan(high) | np.isnan(low) | np.isnan(volume))
+    with np.errstate(invalid='ignore'):
+        ohlc_ok = ((low > 0) & (high >= low)
+                   & (open_ >= low) & (open_ <= high) & (close >= low) & (close <= high))
+        has_volume = volume > 0
+
+    # 上一根K线（跳过缺失日）
+    rows = np.arange(len(dates))[:, None]
+    last_row = pd.DataFrame(np.where(present, rows, np.nan)).ffill().shift(1).to_numpy()
+    has_prev = present & ~np.isnan(last_row)
+    prev_row = np.nan_to_num(last_row, nan=0).astype(int)
+    prev_close = np.where(has_prev, np.take_along_axis(close, prev_row, axis=0), np.nan)
+
+    # 缺口：两根K线之间相隔的交易日数（交易日历范围外的日期无法判断，不做缺口和非交易日检查）
+    covered = np.asarray(calendar.covers(dates), dtype=bool)
+    ordinal = np.full(len(dates), np.nan)
+    ordinal[covered] = calendar.index_of(dates[covered])
+    ordinal = ordinal[:, None]
+    is_session = np.ones(len(dates), dtype=bool)
+    is_session[covered] = calendar.is_trading_day(dates[covered])
+    is_session = is_session[:, None]
+    gap = np.where(has_prev, ordinal - np.take_along_axis(np.broadcast_to(ordinal, close.shape), prev_row, axis=0)
+                   - 1, 0)
+    gap = np.where(is_session, np.nan_to_num(gap, nan=0), 0)
+    after_gap = gap > 0
+
+    # 涨跌幅：优先用数据源的涨跌幅反推昨收（除权除息日按除权参考价计算）
+    reference = prev_close
+    if 'pct_change' in panel:
+        pct = align(panel['pct_change'])
+        source_prev = close / (1 + pct / 100)
+        reference = np.where(np.isnan(pct), prev_close, source_prev)
+    limit = price_limit(codes, dates, names)
+    with np.errstate(invalid='ignore'):
+        breach = np.abs(close - reference) > reference * limit + PRICE_TOLERANCE
+    breach &= present
+    if list_dates is not None:
+        # 上市日期未知或早于交易日历的股票视为早已上市
+        listed = pd.to_datetime(pd.Series(list_dates).reindex(codes.astype(str)))
+        listed_covered = listed.notna().to_numpy() & np.asarray(calendar.covers(listed.fillna(calendar.start)))
+        list_ordinal = np.full(len(codes), -np.inf)
+        list_ordinal[listed_covered] = calendar.index_of(listed[listed_covered], side='next')
+        breach &= ~(ordinal < list_ordinal[None, :] + listing_days)
+    within_limit = ~breach
+
+    # 数据源补齐的停牌日：零成交量且价格不变
+    flat = (open_ == close) & (high == close) & (low == close) & (close == prev_close)
+    suspended_bar = present & ~has_volume & flat
+    zero_volume = present & ~has_volume & ~suspended_bar
+
+    masks = {
+        'present': present,
+        'complete': complete | ~present,
+        'ohlc_ok': ohlc_ok | ~present,
+        'has_volume': has_volume | ~present,
+        'within_limit': within_limit,
+        'after_gap': after_gap,
+    }
+    masks['valid'] = present & complete & ohlc_ok & has_volume & within_limit & is_session
+    masks = {name: pd.DataFrame(mask, index=dates, columns=codes) for name, mask in masks.items()}
+
+    issues = []
+
+    def add(mask, issue, detail):
+        r, c = np.nonzero(mask)
+        if len(r):
+            issues.append(pd.DataFrame({'code': np.asarray(codes)[c], 'date': dates[r], 'issue': issue,
+                                        'detail': detail(r, c) if callable(detail) else detail}))
+
+    gap_r, gap_c = np.nonzero(after_gap)
+    if len(gap_r):
+        gap_days = gap[gap_r, gap_c].astype(int)
+        first_missing = calendar.date_of(ordinal[prev_row[gap_r, gap_c], 0].astype(int) + 1)
+        last_missing = calendar.date_of(ordinal[gap_r, 0].astype(int) - 1)
+        issues.append(pd.DataFrame({
+            'code': np.asarray(codes)[gap_c],
+            'date': first_missing,
+            'issue': np.where(gap_days >= suspension_days, 'suspension', 'missing_days'),
+            'detail': (pd.Series(gap_days).astype(str) + '个交易日（至'
+                       + pd.Series(last_missing.strftime('%Y-%m-%d')) + '）').to_numpy(),
+        }))
+    add(present & ~is_session, 'non_trading_day', '交易日历中该日休市')
+    add(present & ~complete, 'missing_values', '价格或成交量为空')
+    add(present & complete & ~ohlc_ok, 'ohlc_inconsistent',
+        lambda r, c: [f"O={o:.2f} H={h:.2f} L={lo:.2f} C={cl:.2f}"
+                      for o, h, lo, cl in zip(open_[r, c], high[r, c], low[r, c], close[r, c])])
+    add(suspended_bar, 'suspension', '零成交量且价格不变')
+    add(zero_volume, 'zero_volume', '零成交量但价格变化')
+    add(breach, 'limit_breach',
+        lambda r, c: [f"{(cl / ref - 1) * 100:+.2f}%（限制±{lim * 100:.0f}%）"
+                      for cl, ref, lim in zip(close[r, c], reference[r, c], limit[r, c])])
+
+    columns = ['code', 'date', 'issue', 'detail']
+    if not issues:
+        return pd.DataFrame(columns=columns), masks
+    issues = pd.concat(issues, ignore_index=True)[columns]
+    return issues.sort_values(['code', 'date', 'issue'], kind='stable').reset_index(drop=True), masks
+
+
+def validate_bars(df, code=None, name=None, **kwargs):
+    """
+    校验单只股票的日K线
+
+    Args:
+        df: 日K线，需包含 date 列或日期索引及 open/high/low/close/volume
+        code: 股票代码，默认取 df['code']；未知时按主板10%检查涨跌幅
+        name: 股票名称，用于识别ST股票
+        **kwargs: 传给 validate_panel
+
+    Returns:
+        tuple: (issues, mask)，mask 为与 df 行对齐的布尔 DataFrame（列同 validate_panel 的掩码）
+    """
+    if code is None:
+        code = str(df['code'].iloc[0]) if 'code' in df.columns and len(df) else ''
+    data = df.set_index('date') if 'date' in df.columns else df
+    dates = pd.DatetimeIndex(data.index)
+    fields = QUALITY_FIELDS + (['pct_change'] if 'pct_change' in data.columns else [])
+    panel = {f: pd.DataFrame({code: data[f].to_numpy()}, index=dates) for f in fields}
+    # 重复日期只保留最后一行参与校验
+    panel = {f: frame[~frame.index.duplicated(keep='last')] for f, frame in panel.items()}
+    issues, masks = validate_panel(panel, names={code: name} if name else None, **kwargs)
+    mask = pd.DataFrame({key: frame[code].reindex(dates).fillna(False).to_numpy(dtype=bool)
+                         for key, frame in masks.items() if key != 'present'}, index=df.index)
+    return issues, mask
+
+
+def summarize_issues(issues):
+    """
+    问题表汇总
+
+    Returns:
+        DataFrame: 每类问题的条数和涉及股票数
+    """
+    if issues.empty:
+        return pd.DataFrame(columns=['issue', 'label', 'count', 'codes'])
+    summary = issues.groupby('issue').agg(count=('code', 'size'), codes=('code', 'nunique')).reset_index()
+    summary.insert(1, 'label', summary['issue'].map(ISSUE_TYPES))
+    return summary.sort_values('count', ascending=False).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    # 测试代码：三只股票，人为制造各类问题
+    rng = np.random.default_rng(0)
+    dates = get_trading_calendar().sessions('2024-01-02', '2024-03-29')
+    codes = ['000001', '300750', '600519']
+    close = pd.DataFrame(10 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(dates), 3)), axis=0)).round(2),
+                         index=dates, columns=codes)
+    open_ = close.shift(1).fillna(close)
+    panel = {
+        'open': open_, 'close': close,
+        'high': (np.maximum(open_, close) * 1.01).round(2), 'low': (np.minimum(open_, close) * 0.99).round(2),
+        'volume': pd.DataFrame(1e5, index=dates, columns=codes),
+    }
+    for frame in panel.values():
+        frame.iloc[20:25, 0] = np.nan                  # 000001 缺失5个交易日
+    panel['high'].iloc[30, 1] = panel['low'].iloc[30, 1] - 0.1   # 300750 OHLC 不一致
+    panel['volume'].iloc[35, 2] = 0                              # 600519 零成交量
+    panel['close'].iloc[40, 2] *= 1.3                            # 600519 收盘价异常（超出10%限制）
+
+    issues, masks = validate_panel(panel)
+    print(issues)
+    print(summarize_issues(issues))
+    print(f"有效K线: {int(masks['valid'].to_numpy().sum())} / {int(masks['present'].to_numpy().sum())}")
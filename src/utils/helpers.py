@@ -4,7 +4,7 @@
 """
 
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 import re
 
 
@@ -60,16 +60,17 @@ def validate_stock_code(code):
 
 def get_stock_name(stock_code):
     """
-    获取股票名称（简化版，实际应该从数据库查询）
+    获取股票名称（从本地股票代码表查询）
     
     Args:
         stock_code: 股票代码
         
     Returns:
-        str: 股票名称
+        str: 股票名称，代码表中没有时返回 '未知股票'
     """
-    # 这里应该从数据库或API获取
-    # 暂时返回示例名称
+    from ..data.symbol_master import get_symbol_master
+
+    # 代码表尚未下载时的常用股票
     sample_names = {
         '000001': '平安银行',
         '000002': '万科A',
@@ -77,8 +78,7 @@ def get_stock_name(stock_code):
         '600519': '贵州茅台',
         '000858': '五粮液',
     }
-    
-    return sample_names.get(stock_code, '未知股票')
+    return get_symbol_master().name_of(stock_code, default=sample_names.get(stock_code, '未知股票'))
 
 
 def get_exchange_from_code(code):
@@ -95,6 +95,8 @@ def get_exchange_from_code(code):
         return '深圳交易所'
     elif code.startswith('60') or code.startswith('68'):
         return '上海交易所'
+    elif code.startswith(('8', '4', '92')):
+        return '北京交易所'
     else:
         return '未知'
 
@@ -130,29 +132,18 @@ def format_date(date_str, format='%Y-%m-%d'):
 
 def get_recent_trading_days(days=5):
     """
-    获取最近N个交易日（模拟，实际应该从交易日历获取）
+    获取最近N个交易日（按交易日历，剔除周末和法定节假日休市日）
     
     Args:
         days: 天数
         
     Returns:
-        list: 交易日列表
+        list: 交易日列表，从近到远
     """
-    # 简化实现，实际应该从交易日历API获取
-    today = datetime.now()
-    trading_days = []
-    
-    count = 0
-    current_date = today
-    
-    while count < days:
-        # 跳过周末（这里简化处理）
-        if current_date.weekday() < 5:  # 周一到周五
-            trading_days.append(current_date.strftime('%Y-%m-%d'))
-            count += 1
-        current_date -= timedelta(days=1)
-    
-    return trading_days
+    from .trading_calendar import get_trading_calendar
+
+    trading_days = get_trading_calendar().recent(days)
+    return [d.strftime('%Y-%m-%d') for d in trading_days[::-1]]
 
 
 def parse_date_range(start_date, end_date):
@@ -226,7 +217,10 @@ def safe_div(numerator, denominator, default=0):
 
 def clean_dataframe(df):
     """
-    清理DataFrame数据
+    清理DataFrame数据（不删除行，删除会让滚动指标错位）
+    
+    日K线数据经 validate_bars 校验：新增 valid 列标记可用的K线，
+    问题表保存在 df.attrs['quality_issues']
     
     Args:
         df: 原始DataFrame
@@ -237,12 +231,17 @@ def clean_dataframe(df):
     if df.empty:
         return df
     
-    # 删除包含NaN的行
-    df = df.dropna()
-    
     # 重置索引
     df = df.reset_index(drop=True)
     
+    # 日K线：校验并标记异常K线
+    if all(col in df.columns for col in ['date', 'open', 'high', 'low', 'close', 'volume']):
+        from .data_quality import validate_bars
+        
+        issues, mask = validate_bars(df)
+        df['valid'] = mask['valid']
+        df.attrs['quality_issues'] = issues
+    
     return df
 
 
@@ -282,6 +281,8 @@ def get_stock_board(code):
         return '沪市主板'
     elif code.startswith('68'):
         return '科创板'
+    elif code.startswith(('8', '4', '92')):
+        return '北交所'
     else:
         return '未知板块'
 
@@ -0,0 +1,159 @@
+"""
+K线数据规范化模块
+把AKShare（中文列名）、TuShare（trade_date, vol, pct_chg）等数据源的日K线
+统一为标准列名、单位和固定dtype：日期只解析一次、只排序一次，
+并在 DataFrame.attrs 中标记已校验，下游分析器据此跳过重复的检查和深拷贝
+"""
+
+import pandas as pd
+
+
+SCHEMA_VERSION = 1
+
+# 数据源列名 -> 标准列名
+COLUMN_ALIASES = {
+    # AKShare
+    '日期': 'date',
+    '股票代码': 'code',
+    '开盘': 'open',
+    '收盘': 'close',
+    '最高': 'high',
+    '最低': 'low',
+    '成交量': 'volume',
+    '成交额': 'amount',
+    '振幅': 'amplitude',
+    '涨跌幅': 'pct_change',
+    '涨跌额': 'change',
+    '换手率': 'turnover_rate',
+    # TuShare
+    'trade_date': 'date',
+    'vol': 'volume',
+    'pct_chg': 'pct_change',
+}
+
+# 标准列及dtype
+COLUMN_DTYPES = {
+    'date': 'datetime64[ns]',
+    'code': 'string',
+    'open': 'float64',
+    'close': 'float64',
+    'high': 'float64',
+    'low': 'float64',
+    'volume': 'float64',
+    'amount': 'float64',
+    'amplitude': 'float64',
+    'pct_change': 'float64',
+    'change': 'float64',
+    'turnover_rate': 'float64',
+}
+
+REQUIRED_COLUMNS = ['date', 'open', 'close', 'high', 'low', 'volume']
+
+# TuShare 日线特有的列，用于识别数据源
+TUSHARE_COLUMNS = ('ts_code', 'trade_date')
+
+# TuShare 成交额单位为千元，AKShare 为元
+TUSHARE_AMOUNT_UNIT = 1000
+
+
+def _from_tushare(df):
+    """
+    TuShare 日线转为与AKShare相同的列和单位（df 为浅拷贝）
+
+    成交额千元 -> 元；ts_code -> 6位代码；由昨收计算振幅后去掉 pre_close；没有换手率时补空列
+    """
+    if 'amount' in df.columns:
+        df['amount'] = pd.to_numeric(df['amount'], errors='coerce') * TUSHARE_AMOUNT_UNIT
+    if 'ts_code' in df.columns:
+        df['code'] = df.pop('ts_code').astype(str).str.split('.').str[0].astype(str)
+    if 'pre_close' in df.columns:
+        pre_close = pd.to_numeric(df.pop('pre_close'), errors='coerce')
+        if 'amplitude' not in df.columns:
+            df['amplitude'] = (pd.to_numeric(df['high'], errors='coerce')
+                               - pd.to_numeric(df['low'], errors='coerce')) / pre_close * 100
+    if 'turnover_rate' not in df.columns:
+        df['turnover_rate'] = float('nan')
+    standard = [col for col in COLUMN_DTYPES if col in df.columns]
+    return df[standard + [col for col in df.columns if col not in COLUMN_DTYPES]]
+
+
+def normalize_bars(df):
+    """
+    规范化日K线
+
+    列名映射、dtype转换都只在需要时进行，已符合规范的列不复制；
+    日期解析、排序、去重只做一次，结果在 attrs['validated'] 中标记。
+    TuShare 日线换算为与AKShare相同的列和单位（成交额为元）。
+
+    Args:
+        df: 数据源返回的日K线
+
+    Returns:
+        DataFrame: 标准列名、按日期升序、索引为 0..n-1；空数据原样返回
+
+    Raises:
+        ValueError: 缺少必要的列
+    """
+    if df is None or df.empty:
+        return df
+    if is_validated(df):
+        return df
+
+    is_tushare = any(col in df.columns for col in TUSHARE_COLUMNS)
+    renames = {col: COLUMN_ALIASES[col] for col in df.columns
+               if col in COLUMN_ALIASES and COLUMN_ALIASES[col] not in df.columns}
+    # 浅拷贝后替换列名，不复制数据
+    df = df.copy(deep=False)
+    if renames:
+        df.columns = [renames.get(col, col) for col in df.columns]
+
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"缺少必要的列: {missing}，当前列: {list(df.columns)}")
+    if is_tushare:
+        df = _from_tushare(df)
+
+    for col, dtype in COLUMN_DTYPES.items():
+        if col not in df.columns or df[col].dtype == dtype:
+            continue
+        if col == 'date':
+            values = df[col].astype(str) if pd.api.types.is_integer_dtype(df[col]) else df[col]
+            df[col] = pd.to_datetime(values).astype(dtype)
+        elif dtype == 'string':
+            df[col] = df[col].astype(dtype)
+        else:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+
+    if not df['date'].is_monotonic_increasing or df['date'].duplicated().any():
+        df = df.sort_values('date', kind='stable').drop_duplicates('date', keep='last')
+    if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+        df = df.reset_index(drop=True)
+
+    df.attrs['validated'] = SCHEMA_VERSION
+    return df
+
+
+def is_validated(df):
+    """
+    是否为已规范化的日K线（标记存在且必要列仍在）
+
+    Args:
+        df: DataFrame
+    """
+    return (isinstance(df, pd.DataFrame)
+            and df.attrs.get('validated') == SCHEMA_VERSION
+            and all(col in df.columns for col in REQUIRED_COLUMNS))
+
+
+if __name__ == "__main__":
+    # 测试代码
+    raw = pd.DataFrame({
+        'trade_date': ['20240103', '20240102', '20240104'],
+        'open': [10.0, 9.8, 10.1], 'close': [10.1, 10.0, 10.3],
+        'high': [10.2, 10.1, 10.4], 'low': [9.9, 9.7, 10.0],
+        'vol': [1000, 1200, 900], 'pct_chg': [1.0, 2.0, 2.0],
+    })
+    df = normalize_bars(raw)
+    print(df)
+    print(df.dtypes)
+    print(f"已校验: {is_validated(df)}")
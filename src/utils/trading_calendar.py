@@ -0,0 +1,284 @@
+"""
+A股交易日历模块
+根据本地休市日文件（config/trading_holidays.csv）生成交易日序列，
+预先建立 自然日 -> 交易日序号 的稠密索引，日期与序号互查为 O(1)，
+支持向量化的"前/后N个交易日"和区间交易日计数
+"""
+
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .config import PROJECT_ROOT, get_config, resolve_path
+
+
+DEFAULT_HOLIDAYS_FILE = os.path.join(PROJECT_ROOT, 'config', 'trading_holidays.csv')
+
+# 上交所开市日，没有休市日文件时日历从此开始
+CALENDAR_START = '1990-12-19'
+
+# 交易日内的时段：(开始时刻, 时段)，时刻为当日分钟数，各时段持续到下一时段开始
+MARKET_PHASES = [
+    (0, 'pre_open'),              # 开盘前
+    (9 * 60 + 15, 'call_auction'),  # 9:15 开盘集合竞价
+    (9 * 60 + 30, 'continuous'),    # 9:30 连续竞价
+    (11 * 60 + 30, 'lunch'),        # 11:30 午间休市
+    (13 * 60, 'continuous'),        # 13:00 连续竞价
+    (14 * 60 + 57, 'call_auction'),  # 14:57 收盘集合竞价
+    (15 * 60, 'post_close'),        # 15:00 收盘后
+]
+
+
+def load_holidays(path=None):
+    """
+    读取休市日文件
+
+    Args:
+        path: CSV文件路径（date, name 列，# 开头为注释）
+
+    Returns:
+        DatetimeIndex: 休市日
+    """
+    path = path or DEFAULT_HOLIDAYS_FILE
+    if not os.path.exists(path):
+        print(f"未找到休市日文件 {path}，仅按周末计算交易日")
+        return pd.DatetimeIndex([])
+    df = pd.read_csv(path, comment='#', dtype={'date': str})
+    return pd.DatetimeIndex(pd.to_datetime(df['date'])).normalize().unique().sort_values()
+
+
+def intraday_phase(minute):
+    """
+    交易日内某一分钟所处的交易时段
+
+    Args:
+        minute: 当日分钟数，如 9:30 为 570
+
+    Returns:
+        str: MARKET_PHASES 中的时段名称
+    """
+    phase = MARKET_PHASES[0][1]
+    for start, name in MARKET_PHASES:
+        if minute < start:
+            break
+        phase = name
+    return phase
+
+
+class TradingCalendar:
+    """交易日历"""
+
+    def __init__(self, holidays=None, start=None, end=None):
+        """
+        初始化交易日历
+
+        日历从休市日文件的第一年开始，更早的日期超出日历范围（查询时抛出 ValueError），
+        避免未列出休市日的年份被当作只有周末休市；需要更早的日历时在休市日文件中补充历年休市日。
+
+        Args:
+            holidays: 休市日列表，默认读取 config/trading_holidays.csv
+            start: 日历开始日期，默认为休市日文件第一年的年初（没有休市日时为 CALENDAR_START）
+            end: 日历结束日期，默认为休市日文件最后一年的年末；
+                 文件尚未追加今年的休市日时延长到今年年末（今年按周末计算，并提示更新文件）
+        """
+        holidays = load_holidays() if holidays is None else pd.DatetimeIndex(holidays).normalize()
+        if start is None:
+            start = f"{holidays.min().year}-01-01" if len(holidays) else CALENDAR_START
+        if end is None:
+            this_year = datetime.now().year
+            last_year = holidays.max().year if len(holidays) else this_year
+            if last_year < this_year:
+                print(f"休市日文件未包含{this_year}年，{this_year}年暂按周末计算交易日，请追加休市安排")
+            end = f"{max(last_year, this_year)}-12-31"
+
+        self.start = pd.Timestamp(start).normalize()
+        self.end = pd.Timestamp(end).normalize()
+        self.holidays = holidays
+        self.days = pd.bdate_range(self.start, self.end).difference(holidays)
+
+        # 稠密索引：每个自然日对应 当日或之前最近交易日 的序号，以及是否为交易日
+        all_days = pd.date_range(self.start, self.end)
+        self._is_open = np.isin(all_days.values, self.days.values)
+        self._prev_index = np.cumsum(self._is_open) - 1
+        self._start_day = self.start.value // 86_400_000_000_000
+
+    def _offsets(self, dates):
+        """日期 -> 相对日历开始的天数（向量化）"""
+        values = pd.DatetimeIndex(np.atleast_1d(pd.to_datetime(dates))).normalize()
+        offsets = values.values.astype('datetime64[D]').astype(np.int64) - self._start_day
+        if len(offsets) and (offsets.min() < 0 or offsets.max() >= len(self._is_open)):
+            raise ValueError(f"日期超出交易日历范围 {self.start.date()} ~ {self.end.date()}"
+                             f"（更早的年份需在休市日文件中补充休市日）")
+        return offsets
+
+    def covers(self, dates):
+        """
+        日期是否在交易日历范围内（范围外的日期无法判断是否为交易日）
+
+        Args:
+            dates: 单个日期或日期序列
+
+        Returns:
+            bool 或 ndarray[bool]
+        """
+        values = pd.DatetimeIndex(np.atleast_1d(pd.to_datetime(dates))).normalize()
+        return self._unwrap(dates, np.asarray((values >= self.start) & (values <= self.end)))
+
+    @staticmethod
+    def _unwrap(dates, result):
+        return result[0] if np.ndim(dates) == 0 and not isinstance(dates, (list, tuple)) else result
+
+    def is_trading_day(self, dates):
+        """
+        是否为交易日
+
+        Args:
+            dates: 单个日期或日期序列
+
+        Returns:
+            bool 或 ndarray[bool]
+        """
+        return self._unwrap(dates, self._is_open[self._offsets(dates)])
+
+    def index_of(self, dates, side='prev'):
+        """
+        日期 -> 交易日序号
+
+        Args:
+            dates: 单个日期或日期序列
+            side: 非交易日取之前（'prev'）或之后（'next'）最近的交易日
+
+        Returns:
+            int 或 ndarray[int]
+        """
+        offsets = self._offsets(dates)
+        index = self._prev_index[offsets]
+        if side == 'next':
+            index = index + (~self._is_open[offsets])
+        elif side != 'prev':
+            raise ValueError(f"不支持的 side: {side}")
+        return self._unwrap(dates, index)
+
+    def date_of(self, index):
+        """
+        交易日序号 -> 日期
+
+        Args:
+            index: 单个序号或序号数组
+
+        Returns:
+            Timestamp 或 DatetimeIndex
+        """
+        index = np.asarray(index)
+        if index.size and (index.min() < 0 or index.max() >= len(self.days)):
+            raise ValueError("交易日序号超出交易日历范围")
+        return self.days[index] if index.ndim else self.days[int(index)]
+
+    def shift(self, dates, n):
+        """
+        前/后N个交易日（向量化）
+
+        非交易日先归到之前最近的交易日，n>0 向后，n<0 向前。
+
+        Args:
+            dates: 单个日期或日期序列
+            n: 交易日数（可为与 dates 等长的数组）
+
+        Returns:
+            Timestamp 或 DatetimeIndex
+        """
+        return self.date_of(np.asarray(self.index_of(dates, 'prev')) + np.asarray(n))
+
+    def count(self, start, end):
+        """
+        区间 [start, end] 内的交易日数（向量化）
+
+        Args:
+            start: 开始日期（单个或序列）
+            end: 结束日期（单个或序列）
+
+        Returns:
+            int 或 ndarray[int]
+        """
+        start_index = np.asarray(self.index_of(start, 'next'))
+        end_index = np.asarray(self.index_of(end, 'prev'))
+        result = np.maximum(end_index - start_index + 1, 0)
+        return result if result.ndim else int(result)
+
+    def sessions(self, start, end):
+        """
+        区间内的交易日
+
+        Returns:
+            DatetimeIndex
+        """
+        start_index = self.index_of(start, 'next')
+        end_index = self.index_of(end, 'prev')
+        return self.days[start_index:end_index + 1]
+
+    def previous_trading_day(self, date=None, include_today=True):
+        """
+        最近一个交易日
+
+        Args:
+            date: 日期，默认今天
+            include_today: 当日为交易日时是否返回当日
+        """
+        date = pd.Timestamp(date or datetime.now()).normalize()
+        if include_today:
+            return self.shift(date, 0)
+        return self.shift(date - pd.Timedelta(days=1), 0)
+
+    def market_phase(self, now=None):
+        """
+        当前所处的交易时段
+
+        Args:
+            now: 时间，默认当前时间
+
+        Returns:
+            str: 'pre_open' / 'call_auction' / 'continuous' / 'lunch' / 'post_close'，非交易日为 'closed'
+        """
+        now = pd.Timestamp(now or datetime.now())
+        if not self.is_trading_day(now.normalize()):
+            return 'closed'
+        return intraday_phase(now.hour * 60 + now.minute)
+
+    def recent(self, n, end=None):
+        """
+        截至 end（含）的最近N个交易日，按日期升序
+
+        Returns:
+            DatetimeIndex
+        """
+        end_index = self.index_of(pd.Timestamp(end or datetime.now()).normalize(), 'prev')
+        return self.days[max(end_index - n + 1, 0):end_index + 1]
+
+
+_default_calendar = None
+
+
+def get_trading_calendar():
+    """
+    获取共享的交易日历（休市日文件路径读取 config.yaml 中 calendar.holidays_file）
+
+    Returns:
+        TradingCalendar
+    """
+    global _default_calendar
+    if _default_calendar is None:
+        path = get_config('calendar', 'holidays_file', default=None)
+        _default_calendar = TradingCalendar(load_holidays(resolve_path(path) if path else None))
+    return _default_calendar
+
+
+if __name__ == "__main__":
+    # 测试代码
+    cal = get_trading_calendar()
+    print(f"2024年交易日数: {cal.count('2024-01-01', '2024-12-31')}")
+    print(f"2024-02-08 后1个交易日: {cal.shift('2024-02-08', 1).date()}")
+    print(f"2024-10-08 前5个交易日: {cal.shift('2024-10-08', -5).date()}")
+    print(f"最近5个交易日: {list(cal.recent(5).strftime('%Y-%m-%d'))}")
+    print(f"2024-06-03 10:00 交易时段: {cal.market_phase('2024-06-03 10:00')}")
@@ -0,0 +1,66 @@
+"""复权引擎：因子表获取失败时沿用本地因子表"""
+
+import pandas as pd
+import pytest
+
+from src.data.adjustment import AdjustmentEngine
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = AdjustmentEngine(str(tmp_path))
+    # 本地因子表确认日期已过期，下一次复权会尝试重新获取
+    engine.set_factors('000001', pd.DataFrame({'date': ['2024-01-02', '2024-06-06'], 'factor': [1.0, 1.05]}),
+                       checked_through='2024-06-07')
+    return engine
+
+
+@pytest.fixture
+def raw():
+    return pd.DataFrame({'date': pd.bdate_range('2024-06-03', periods=6),
+                         'close': [10.0, 10.2, 10.1, 9.7, 9.8, 9.9]})
+
+
+def expected_qfq(raw):
+    factor = [1.0 / 1.05] * 3 + [1.0] * 3
+    return raw['close'] * factor
+
+
+def test_refresh_raises_falls_back_to_stored_factors(engine, raw):
+    calls = []
+
+    def refresh():
+        calls.append(1)
+        raise ConnectionError("因子接口不可用")
+
+    first = engine.adjust('000001', raw, 'qfq', refresh=refresh)
+    second = engine.adjust('000001', raw, 'qfq', refresh=refresh)
+    pd.testing.assert_series_equal(first['close'], expected_qfq(raw), check_names=False)
+    pd.testing.assert_series_equal(second['close'], first['close'])
+    assert len(calls) == 1
+
+
+def test_refresh_returns_empty_falls_back_to_stored_factors(engine, raw):
+    calls = []
+
+    def refresh():
+        calls.append(1)
+        return pd.DataFrame()
+
+    first = engine.adjust('000001', raw, 'hfq', refresh=refresh)
+    engine.adjust('000001', raw, 'hfq', refresh=refresh)
+    assert first['close'].tolist() == pytest.approx([10.0, 10.2, 10.1, 9.7 * 1.05, 9.8 * 1.05, 9.9 * 1.05])
+    assert len(calls) == 1
+
+
+def test_refresh_retried_after_back_off(engine, raw):
+    engine.retry_after = 0
+    calls = []
+
+    def refresh():
+        calls.append(1)
+        return pd.DataFrame()
+
+    engine.adjust('000001', raw, 'qfq', refresh=refresh)
+    engine.adjust('000001', raw, 'qfq', refresh=refresh)
+    assert len(calls) == 2
@@ -0,0 +1,38 @@
+"""日K线规范化：AKShare 与 TuShare 同一根K线得到相同的列和单位"""
+
+import pandas as pd
+import pytest
+
+from src.utils.schema import normalize_bars
+
+
+def akshare_bar():
+    # stock_zh_a_hist：成交量为手，成交额为元
+    return pd.DataFrame({
+        '日期': ['2024-06-03'], '股票代码': ['000001'],
+        '开盘': [10.0], '收盘': [10.2], '最高': [10.3], '最低': [9.9],
+        '成交量': [12345.0], '成交额': [12580000.0], '振幅': [4.0],
+        '涨跌幅': [2.0], '涨跌额': [0.2], '换手率': [0.5],
+    })
+
+
+def tushare_bar():
+    # pro.daily：成交量为手，成交额为千元
+    return pd.DataFrame({
+        'ts_code': ['000001.SZ'], 'trade_date': ['20240603'],
+        'open': [10.0], 'high': [10.3], 'low': [9.9], 'close': [10.2], 'pre_close': [10.0],
+        'change': [0.2], 'pct_chg': [2.0], 'vol': [12345.0], 'amount': [12580.0],
+    })
+
+
+def test_same_bar_has_same_units():
+    ak, ts = normalize_bars(akshare_bar()), normalize_bars(tushare_bar())
+    for col in ['date', 'code', 'open', 'close', 'high', 'low', 'volume', 'amount', 'amplitude', 'pct_change', 'change']:
+        assert ts[col].iloc[0] == pytest.approx(ak[col].iloc[0]) if ak[col].dtype == 'float64' \
+            else ts[col].iloc[0] == ak[col].iloc[0]
+
+
+def test_same_schema():
+    ak, ts = normalize_bars(akshare_bar()), normalize_bars(tushare_bar())
+    assert list(ts.columns) == list(ak.columns)
+    assert (ts.dtypes == ak.dtypes).all()